@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+
+# Benchmark WikiClient throughput without network access, using recorded responses
+#
+# Record responses (requires network access):
+#   python benchmarks/bench_client.py record responses.jsonl.gz
+# Replay with simulated 50ms latency and 10MB/s bandwidth:
+#   python benchmarks/bench_client.py replay responses.jsonl.gz --latency 0.05 --bandwidth 10000000
+
+import argparse
+import asyncio
+import logging
+import os.path
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wikipedia import WikiClient, AsyncWikiClient
+from wikipedia.transport import RecordingTransport, ReplayTransport, TransportPolicy
+
+
+log = logging.getLogger('benchmarks.bench_client')
+
+
+LANG = 'en'
+
+TITLES = [
+    'Poland', 'Germany', 'France', 'Spain', 'Italy',
+    'Portugal', 'Austria', 'Belgium', 'Netherlands', 'Denmark',
+    'Sweden', 'Finland', 'Estonia', 'Latvia', 'Lithuania',
+    'Czech Republic', 'Slovakia', 'Hungary', 'Slovenia', 'Croatia',
+]
+
+CATEGORY = 'Category:Member states of the European Union'
+
+# Client configurations to compare
+CONFIGS = {
+    'default': {},
+    'json': dict(decoder='json'),
+    'extract': dict(profile='extract'),
+    'meta': dict(profile='meta'),
+}
+
+ASYNC_CONCURRENCY = [1, 4, 16]
+
+
+def bench_page(client):
+    for title in TITLES:
+        client.page(title)
+    return len(TITLES)
+
+
+def bench_pages(client):
+    return len(list(client.pages(TITLES)))
+
+
+def bench_category_members(client):
+    return len(list(client.category_members(client._get_category(CATEGORY))))
+
+
+def bench_category_pages_loaded(client):
+    # Continuation heavy: prop continuation within each generator batch
+    return len(list(client.category_pages(client._get_category(CATEGORY), profile=client._profile)))
+
+
+BENCHMARKS = [
+    bench_page,
+    bench_pages,
+    bench_category_members,
+    bench_category_pages_loaded,
+]
+
+
+async def bench_async_page(client):
+    await asyncio.gather(*[client.page(title) for title in TITLES])
+    return len(TITLES)
+
+
+def run(benchmark, transport, **config):
+    # Each run uses empty cache, so all pages are requested
+    with tempfile.TemporaryDirectory() as cache_dir:
+        client = WikiClient(
+            LANG, cache_dir=cache_dir, transport=transport,
+            policy=TransportPolicy(maxlag=None), **config,
+        )
+        started = time.perf_counter()
+        items = benchmark(client)
+        return items, time.perf_counter() - started
+
+
+def run_async(concurrency, transport):
+    async def main(cache_dir):
+        client = AsyncWikiClient(
+            LANG, concurrency=concurrency, cache_dir=cache_dir, transport=transport,
+            policy=TransportPolicy(maxlag=None),
+        )
+        started = time.perf_counter()
+        items = await bench_async_page(client)
+        elapsed = time.perf_counter() - started
+        client._executor.shutdown()
+        return items, elapsed
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        return asyncio.run(main(cache_dir))
+
+
+def report(name, config_name, items, elapsed):
+    print(f'{name:<32} {config_name:<16} {items:>6} items {elapsed:>8.3f}s {items/elapsed:>10.1f} items/s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='WikiClient record/replay benchmarks')
+    parser.add_argument('mode', choices=['record', 'replay'])
+    parser.add_argument('archive', help='recorded responses archive')
+    parser.add_argument('--latency', type=float, default=0., help='simulated latency in seconds')
+    parser.add_argument('--bandwidth', type=float, default=None, help='simulated bandwidth in bytes/s')
+    args = parser.parse_args()
+
+    if args.mode == 'record':
+        transport = RecordingTransport(args.archive)
+    else:
+        transport = ReplayTransport(args.archive, args.latency, args.bandwidth)
+
+    try:
+        for benchmark in BENCHMARKS:
+            for config_name, config in CONFIGS.items():
+                items, elapsed = run(benchmark, transport, **config)
+                report(benchmark.__name__, config_name, items, elapsed)
+        for concurrency in ASYNC_CONCURRENCY:
+            items, elapsed = run_async(concurrency, transport)
+            report(bench_async_page.__name__, f'concurrency={concurrency}', items, elapsed)
+    finally:
+        transport.close()
+
+
+if __name__ == '__main__':
+    main()
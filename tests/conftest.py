@@ -0,0 +1,29 @@
+import pytest
+
+from wikipedia import WikiClient, TransportPolicy
+
+from .fakes import FakeTransport, FakeWiki
+
+
+@pytest.fixture
+def wiki():
+    return FakeWiki()
+
+
+@pytest.fixture
+def transport(wiki):
+    return FakeTransport(wiki)
+
+
+@pytest.fixture
+def make_client(tmp_path, transport):
+    # Return clients sharing the same cache and transport
+    def make_client(**kwargs):
+        kwargs.setdefault('policy', TransportPolicy(backoff=0, jitter=0, maxlag=None))
+        return WikiClient('en', transport=transport, cache_dir=str(tmp_path / 'cache'), **kwargs)
+    return make_client
+
+
+@pytest.fixture
+def client(make_client):
+    return make_client()
@@ -0,0 +1,357 @@
+import json
+import threading
+
+import requests
+
+from wikipedia.transport import Transport
+
+
+# Fake MediaWiki API answering WikiClient's queries from in-memory pages, usage:
+#   wiki = FakeWiki()
+#   wiki.add_page(1, 'Page 1', content='...', categories=['Category:A'])
+#   client = WikiClient('en', transport=FakeTransport(wiki), cache_dir=...)
+# NOTE: Responses are in formatversion=2 shape, continued like API does, but with small limits
+
+
+def get_response(data, status=200, headers=None, url='https://en.wikipedia.org/w/api.php'):
+    response = requests.Response()
+    response.status_code = status
+    response.reason = requests.status_codes._codes[status][0].replace('_', ' ').title()
+    response.headers = requests.structures.CaseInsensitiveDict(headers or {})
+    response.url = url
+    response.request = requests.Request('GET', url).prepare()
+    response._content = json.dumps(data).encode()
+    return response
+
+
+class FakeTransport(Transport):
+
+    # Answer requests with handler(params), returning response's data or requests.Response
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def get(self, api_url, params, timeout=None):
+        params = {key: str(value) for key, value in params.items()}
+        with self._lock:
+            self.requests.append(params)
+        response = self.handler(params)
+        if isinstance(response, requests.Response):
+            return response
+        return get_response(response, url=api_url)
+
+    def queried(self, **filters):
+        # Return requests with given params
+        return [
+            params for params in self.requests
+            if all(params.get(key) == value for key, value in filters.items())
+        ]
+
+
+class FakeWiki:
+
+    # Max number of items returned at once, so results are continued
+    LIMIT = 10
+    CATEGORIES_LIMIT = 2
+    REVISIONS_LIMIT = 3
+
+    def __init__(self, lang='en'):
+        self.lang = lang
+        self.pages = {}
+        self.members = {}
+        self.redirects = {}
+        self.history = {}
+        # Responses [(status, headers), ] returned before answering next requests
+        self.failures = []
+        self._lock = threading.Lock()
+
+    def add_page(self, page_id, title, ns=0, content='', categories=(), extract=None, langlinks=None):
+        self.pages[page_id] = {
+            'pageid': page_id,
+            'ns': ns,
+            'title': title,
+            'content': content,
+            'categories': list(categories),
+            'extract': extract,
+            'langlinks': dict(langlinks or {}),
+        }
+        for category in categories:
+            self.members.setdefault(category, []).append(page_id)
+        self.add_revision(page_id, content)
+
+    def add_revision(self, page_id, content, timestamp=None):
+        history = self.history.setdefault(page_id, [])
+        revision_id = page_id*1000 + len(history) + 1
+        history.append({
+            'revid': revision_id,
+            'parentid': history[-1]['revid'] if history else 0,
+            'timestamp': timestamp or f'2024-01-01T00:{len(history):02d}:00Z',
+            'user': 'User',
+            'comment': f'Edit {len(history)+1}',
+            'size': len(content),
+            'content': content,
+        })
+        self.pages[page_id]['content'] = content
+        return revision_id
+
+    def get_page(self, title):
+        title = self.redirects.get(title, title)
+        for page in self.pages.values():
+            if page['title'] == title:
+                return page
+
+    def __call__(self, params):
+        with self._lock:
+            if self.failures:
+                status, headers = self.failures.pop(0)
+                return get_response({'error': {'code': 'failure'}}, status, headers)
+        if params.get('list') == 'allpages':
+            return self.list_all_pages(params)
+        if params.get('list') == 'categorymembers':
+            return self.list_category_members(params)
+        if params.get('list') == 'recentchanges':
+            return self.list_recent_changes(params)
+        if 'rvlimit' in params:
+            return self.query_revisions(params)
+        return self.query_pages(params)
+
+    def _continued(self, items, offset, key, params):
+        # Return (items, continue) for limited items from offset
+        offset = int(params.get(key, offset))
+        limit = self.LIMIT
+        chunk = items[offset:offset+limit]
+        if offset+limit < len(items):
+            return chunk, {key: str(offset+limit), 'continue': '-||'}
+        return chunk, None
+
+    def list_all_pages(self, params):
+        namespace = int(params.get('apnamespace', 0))
+        titles = []
+        for page in self.pages.values():
+            if page['ns'] != namespace:
+                continue
+            title = page['title'].partition(':')[2] if namespace else page['title']
+            if params.get('apfrom') and title < params['apfrom']:
+                continue
+            if params.get('apto') and title > params['apto']:
+                continue
+            titles.append((title, page))
+        titles.sort(key=lambda item: item[0])
+        chunk, continue_params = self._continued(titles, 0, 'apcontinue', params)
+        data = {
+            'batchcomplete': True,
+            'query': {
+                'allpages': [
+                    {'pageid': page['pageid'], 'ns': page['ns'], 'title': page['title']}
+                    for title, page in chunk
+                ],
+            },
+        }
+        if continue_params:
+            data['continue'] = continue_params
+        return data
+
+    def list_recent_changes(self, params):
+        # Revisions of all pages, oldest first, since rcstart (inclusive)
+        changes = sorted(
+            (
+                {
+                    'type': 'edit' if revision['parentid'] else 'new',
+                    'pageid': page_id,
+                    'revid': revision['revid'],
+                    'title': self.pages[page_id]['title'],
+                    'timestamp': revision['timestamp'],
+                }
+                for page_id, history in self.history.items()
+                for revision in history
+                if revision['timestamp'] >= params.get('rcstart', '')
+            ),
+            key=lambda change: (change['timestamp'], change['revid']),
+        )
+        chunk, continue_params = self._continued(changes, 0, 'rccontinue', params)
+        data = {
+            'batchcomplete': True,
+            'query': {
+                'recentchanges': chunk,
+            },
+        }
+        if continue_params:
+            data['continue'] = continue_params
+        return data
+
+    def _get_category_members(self, params, prefix=''):
+        # Return (members, continue) of category, prefix is used by generator's params
+        if f'{prefix}cmpageid' in params:
+            category = self.pages[int(params[f'{prefix}cmpageid'])]['title']
+        else:
+            category = params[f'{prefix}cmtitle']
+        members = [self.pages[page_id] for page_id in self.members.get(category, [])]
+        cmtypes = params.get(f'{prefix}cmtype', '').split('|')
+        if 'page' in cmtypes or 'subcat' in cmtypes:
+            members = [
+                page for page in members
+                if ('subcat' if page['ns'] == 14 else 'page') in cmtypes
+            ]
+        return self._continued(members, 0, f'{prefix}cmcontinue', params)
+
+    def list_category_members(self, params):
+        chunk, continue_params = self._get_category_members(params)
+        data = {
+            'batchcomplete': True,
+            'query': {
+                'categorymembers': [
+                    {'pageid': page['pageid'], 'ns': page['ns'], 'title': page['title']}
+                    for page in chunk
+                ],
+            },
+        }
+        if continue_params:
+            data['continue'] = continue_params
+        return data
+
+    def _search(self, params):
+        # Return (pages, continue) matching search, ranked by number of occurrences in content
+        # NOTE: Pages are returned by page id, with rank as index, same as by API
+        query = params['gsrsearch'].lower()
+        ranked = sorted(
+            (page for page in self.pages.values() if query in page['content'].lower()),
+            key=lambda page: (-page['content'].lower().count(query), page['pageid']),
+        )
+        ranked = [dict(page, index=index) for index, page in enumerate(ranked, 1)]
+        limit = params.get('gsrlimit', 'max')
+        limit = self.LIMIT if limit == 'max' else min(int(limit), self.LIMIT)
+        offset = int(params.get('gsroffset', 0))
+        chunk = sorted(ranked[offset:offset+limit], key=lambda page: page['pageid'])
+        if offset+limit < len(ranked):
+            return chunk, {'gsroffset': str(offset+limit), 'continue': 'gsroffset||'}
+        return chunk, None
+
+    def _get_queried_pages(self, params):
+        # Return (pages, redirects, normalized titles), missing pages are returned with title only
+        pages = []
+        redirects = []
+        normalizations = []
+        if params.get('generator') == 'categorymembers':
+            pages, continue_params = self._get_category_members(params, 'g')
+        elif params.get('generator') == 'search':
+            pages, continue_params = self._search(params)
+        elif 'pageids' in params:
+            for page_id in params['pageids'].split('|'):
+                pages.append(self.pages.get(int(page_id), {'pageid': int(page_id)}))
+        else:
+            for title in params['titles'].split('|'):
+                normalized = title.replace('_', ' ')
+                normalized = normalized[:1].upper() + normalized[1:]
+                if normalized != title:
+                    normalizations.append({'from': title, 'to': normalized})
+                    title = normalized
+                if title in self.redirects:
+                    redirects.append({'from': title, 'to': self.redirects[title]})
+                pages.append(self.get_page(title) or {'title': title})
+        return pages, redirects, normalizations
+
+    def render_page(self, page, props, params):
+        if not 'ns' in page:
+            data = dict(page, missing=True)
+            data.setdefault('ns', 0)
+            return data
+        data = {
+            'pageid': page['pageid'],
+            'ns': page['ns'],
+            'title': page['title'],
+        }
+        if 'index' in page:
+            data['index'] = page['index']
+        offset = int(params.get('clcontinue', 0))
+        if offset:
+            # NOTE: Only continued prop is returned by continued results
+            props = {'categories'}
+        if 'info' in props:
+            data['lastrevid'] = self.history[page['pageid']][-1]['revid']
+            data['pagelanguage'] = self.lang
+            data['length'] = len(page['content'])
+        if 'revisions' in props:
+            data['revisions'] = [{
+                'revid': data['lastrevid'],
+                'parentid': self.history[page['pageid']][-1]['parentid'],
+                'slots': {'main': {'contentmodel': 'wikitext', 'content': page['content']}},
+            }]
+        if 'extracts' in props and page['extract'] is not None:
+            data['extract'] = page['extract']
+        if 'langlinks' in props and page['langlinks']:
+            data['langlinks'] = [{'lang': lang, 'title': title} for lang, title in page['langlinks'].items()]
+        if 'categories' in props:
+            categories = page['categories'][offset:offset+self.CATEGORIES_LIMIT]
+            if categories:
+                data['categories'] = [{'ns': 14, 'title': category} for category in categories]
+        return data
+
+    def query_pages(self, params):
+        props = set(params.get('prop', '').split('|'))
+        pages, redirects, normalizations = self._get_queried_pages(params)
+        data = {
+            'query': {
+                'pages': [self.render_page(page, props, params) for page in pages],
+            },
+        }
+        if redirects:
+            data['query']['redirects'] = redirects
+        if normalizations:
+            data['query']['normalized'] = normalizations
+        offset = int(params.get('clcontinue', 0)) + self.CATEGORIES_LIMIT
+        if 'categories' in props and any(len(page.get('categories', [])) > offset for page in pages):
+            # NOTE: Props are continued first, with the same generator's batch
+            data['continue'] = {'clcontinue': str(offset), 'continue': '||'}
+            if 'gcmcontinue' in params:
+                data['continue']['gcmcontinue'] = params['gcmcontinue']
+            return data
+        data['batchcomplete'] = True
+        if params.get('generator') in {'categorymembers', 'search'}:
+            if params['generator'] == 'search':
+                continue_params = self._search(params)[1]
+            else:
+                continue_params = self._get_category_members(params, 'g')[1]
+            if continue_params:
+                data['continue'] = continue_params
+        return data
+
+    def query_revisions(self, params):
+        page, = self._get_queried_pages(params)[0]
+        history = self.history[page['pageid']]
+        start = int(params.get('rvcontinue') or params.get('rvstartid') or 0)
+        revisions = [revision for revision in history if revision['revid'] >= start]
+        chunk = revisions[:self.REVISIONS_LIMIT]
+        data = {}
+        if len(revisions) > len(chunk):
+            data['continue'] = {'rvcontinue': str(revisions[len(chunk)]['revid']), 'continue': '||'}
+        else:
+            data['batchcomplete'] = True
+        with_content = 'content' in params['rvprop'].split('|')
+        data['query'] = {
+            'pages': [{
+                'pageid': page['pageid'],
+                'ns': page['ns'],
+                'title': page['title'],
+                'revisions': [
+                    {
+                        **{key: value for key, value in revision.items() if key != 'content'},
+                        **({'slots': {'main': {'content': revision['content']}}} if with_content else {}),
+                    }
+                    for revision in chunk
+                ],
+            }],
+        }
+        return data
+
+
+def add_pages(wiki, count, categories=5):
+    # Add pages: 'Page {page_id}' with content, extract and up to categories-1 categories
+    for page_id in range(1, count+1):
+        wiki.add_page(
+            page_id, f'Page {page_id}',
+            content=f'Content of page {page_id}',
+            categories=[f'Category:{page_id} {i}' for i in range(page_id % categories)],
+            extract=f'Extract {page_id}',
+        )
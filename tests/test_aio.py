@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from wikipedia import AsyncWikiClient, TransportPolicy
+
+from .fakes import FakeTransport, add_pages
+
+
+class ConcurrencyCounter:
+
+    # Wrap handler, counting requests in flight
+
+    def __init__(self, handler, latency=.01):
+        self.handler = handler
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, params):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency)
+            return self.handler(params)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def counter(wiki):
+    return ConcurrencyCounter(wiki)
+
+
+@pytest.fixture
+def make_async_client(tmp_path, counter):
+    transport = FakeTransport(counter)
+
+    def make_async_client(**kwargs):
+        kwargs.setdefault('policy', TransportPolicy(backoff=0, jitter=0, maxlag=None))
+        client = AsyncWikiClient('en', transport=transport, cache_dir=str(tmp_path / 'cache'), **kwargs)
+        client.transport = transport
+        return client
+    return make_async_client
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def collect(items):
+    return [item async for item in items]
+
+
+def test_page(wiki, make_async_client):
+    add_pages(wiki, 3)
+
+    async def main():
+        async with make_async_client() as client:
+            return await asyncio.gather(*[client.page(page_id) for page_id in [1, 2, 3, 2]])
+
+    pages = run(main())
+    assert [page.title for page in pages] == ['Page 1', 'Page 2', 'Page 3', 'Page 2']
+    assert pages[0].content == 'Content of page 1'
+
+
+def test_pages_bounded_concurrency(wiki, counter, make_async_client):
+    add_pages(wiki, 300, categories=1)
+
+    async def main():
+        async with make_async_client(concurrency=3) as client:
+            return await collect(client.pages(range(1, 301), profile='meta'))
+
+    pages = run(main())
+    assert sorted(page.page_id for page in pages) == list(range(1, 301))
+    assert 1 < counter.max_in_flight <= 3
+
+
+def test_category_members_load(wiki, counter, make_async_client):
+    add_pages(wiki, 25, categories=1)
+    wiki.add_page(100, 'Category:Root', ns=14)
+    for page_id in range(1, 26):
+        wiki.members.setdefault('Category:Root', []).append(page_id)
+
+    async def main():
+        async with make_async_client(concurrency=4) as client:
+            category = await client.page('Category:Root', profile='meta')
+            return await collect(client.category_members(category, load=True))
+
+    pages = run(main())
+    # NOTE: Loaded pages keep members' order
+    assert [page.page_id for page in pages] == list(range(1, 26))
+    assert all(page.content == f'Content of page {page.page_id}' for page in pages)
+    assert 1 < counter.max_in_flight <= 4
+
+
+def test_category_members_profile(wiki, make_async_client):
+    add_pages(wiki, 25)
+    wiki.add_page(100, 'Category:Root', ns=14)
+    wiki.members['Category:Root'] = list(range(1, 26))
+
+    async def main():
+        async with make_async_client() as client:
+            category = await client.page(100, profile='meta')
+            requests = len(client.transport.requests)
+            pages = await collect(client.category_members(category, profile='full'))
+            return pages, client.transport.requests[requests:]
+
+    pages, requests = run(main())
+    assert [page.page_id for page in pages] == list(range(1, 26))
+    assert all(len(page.categories) == page.page_id % 5 for page in pages)
+    # Pages' data is queried with generator, not page by page
+    assert all(params['generator'] == 'categorymembers' for params in requests)
+
+
+def test_continued(wiki, make_async_client):
+    add_pages(wiki, 25, categories=1)
+    wiki.members['Category:Root'] = list(range(1, 26))
+
+    async def main():
+        async with make_async_client() as client:
+            results = await client.query_list_category_members('Category:Root')
+            return [
+                [member['pageid'] for member in results.data['query']['categorymembers']]
+                async for results in client._continued(results)
+            ]
+
+    batches = run(main())
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    assert sum(batches, []) == list(range(1, 26))
@@ -0,0 +1,81 @@
+import itertools
+import random
+
+import pytest
+
+from wikipedia.client import get_partitions, get_weighted_boundaries
+
+
+@pytest.fixture
+def titles(wiki):
+    rnd = random.Random(1)
+    titles = {'B'}
+    while len(titles) < 150:
+        titles.add(rnd.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') + ''.join(rnd.choice('abc') for _ in range(4)))
+    for page_id, title in enumerate(sorted(titles), 1):
+        wiki.add_page(page_id, title)
+        wiki.add_page(1000+page_id, f'Talk:{title}', ns=1)
+    return sorted(titles)
+
+
+def test_partitions():
+    assert get_partitions(['M', 'B']) == [(None, 'B'), ('B', 'M'), ('M', None)]
+    assert get_partitions([]) == [(None, None)]
+    assert get_weighted_boundaries([('a', 10), ('b', 10), ('c', 10), ('d', 10)], 2) == ['c']
+    assert get_weighted_boundaries([('a', 1), ('b', 10), ('c', 10), ('d', 1)], 4) == ['b', 'c', 'd']
+    assert get_weighted_boundaries([], 4) == []
+
+
+@pytest.mark.parametrize('partitions', [1, 4, 8, ['B', 'M', 'Q']])
+def test_all_pages_ordered(titles, client, partitions):
+    pages = [page.title for page in client.all_pages(partitions=partitions, workers=3, ordered=True)]
+    assert pages == titles
+
+
+def test_all_pages_unordered(titles, client):
+    pages = [page.title for page in client.all_pages(partitions=8, workers=3)]
+    assert sorted(pages) == titles
+
+
+def test_all_pages_namespace(titles, client):
+    pages = [page.title for page in client.all_pages(namespace=1, partitions=['M'], ordered=True)]
+    assert pages == [f'Talk:{title}' for title in titles]
+
+
+def test_all_pages_sampled_boundaries(wiki, transport, client):
+    rnd = random.Random(1)
+    for page_id in range(1, 200):
+        wiki.add_page(page_id, rnd.choice('АБВГДЕЖЗИК') + ''.join(rnd.choice('абв') for _ in range(6)))
+    titles = sorted(page['title'] for page in wiki.pages.values())
+
+    boundaries = client._get_all_pages_boundaries(0, 4)
+    assert len(boundaries) == 3
+    assert all('А' <= boundary <= 'К' for boundary in boundaries)
+    pages = [page.title for page in client.all_pages(partitions=4, ordered=True)]
+    assert pages == titles
+
+
+def test_all_pages_checkpoint(titles, transport, make_client):
+    pages = make_client().all_pages(partitions=4, workers=2, ordered=True, checkpoint='test')
+    first = [page.title for page in itertools.islice(pages, 45)]
+    pages.close()
+    assert first == titles[:45]
+
+    second = [page.title for page in make_client().all_pages(partitions=4, ordered=True, checkpoint='test')]
+    # NOTE: Progress is stored after each batch, so only pages of interrupted batch are listed again
+    assert set(first) | set(second) == set(titles)
+    assert len(first) + len(second) - len(titles) < transport.handler.LIMIT
+    assert second == sorted(second)
+
+    # Completed ranges are not listed again
+    requests = len(transport.requests)
+    assert list(make_client().all_pages(partitions=4, checkpoint='test')) == []
+    assert len(transport.requests) == requests
+
+
+def test_all_pages_ordered_with_profile(titles, transport, client):
+    # Some of pages are already cached
+    list(client.pages([10, 11, 50, 120], profile='meta'))
+    pages = list(client.all_pages(partitions=4, ordered=True, profile='meta'))
+    assert [page.title for page in pages] == titles
+    assert all(page.revision_id for page in pages)
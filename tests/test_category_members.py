@@ -0,0 +1,30 @@
+from .fakes import add_pages
+
+
+def test_category_members_profile(wiki, transport, client):
+    add_pages(wiki, 25)
+    wiki.add_page(100, 'Category:Root', ns=14)
+    wiki.members['Category:Root'] = list(range(1, 26))
+
+    pages = list(client.category_members(client.page(100, profile='meta'), profile='full'))
+    assert sorted(page.page_id for page in pages) == list(range(1, 26))
+    # NOTE: Props continued within generator's batch are merged
+    assert all(len(page.categories) == page.page_id % 5 for page in pages)
+    assert all(page.content == f'Content of page {page.page_id}' for page in pages)
+    assert transport.queried(generator='categorymembers', clcontinue='2', gcmcontinue='10')
+    # Pages' data is queried with generator, and cached
+    requests = transport.requests[1:]
+    assert all(params['generator'] == 'categorymembers' for params in requests)
+    continued = [params for params in requests if not 'clcontinue' in params]
+    assert [params.get('gcmcontinue') for params in continued] == [None, '10', '20']
+    assert all(client._cache.get_revision_id('en', page_id) for page_id in range(1, 26))
+
+
+def test_category_members_load(wiki, transport, client):
+    add_pages(wiki, 15, categories=1)
+    wiki.add_page(100, 'Category:Root', ns=14)
+    wiki.members['Category:Root'] = list(range(1, 16))
+
+    pages = list(client.category_members(client.page(100, profile='meta'), load=True))
+    assert [page.page_id for page in pages] == list(range(1, 16))
+    assert all(page.content == f'Content of page {page.page_id}' for page in pages)
@@ -0,0 +1,60 @@
+import itertools
+
+import pytest
+
+
+@pytest.fixture
+def tree(wiki):
+    # Category:Root -> Category:A -> Category:B -> Category:Root (cycle)
+    wiki.add_page(100, 'Category:Root', ns=14, categories=['Category:B'])
+    wiki.add_page(101, 'Category:A', ns=14, categories=['Category:Root'])
+    wiki.add_page(102, 'Category:B', ns=14, categories=['Category:Root', 'Category:A'])
+    for page_id in range(1, 26):
+        wiki.add_page(page_id, f'Page {page_id}', categories=[
+            ['Category:Root', 'Category:A', 'Category:B'][page_id % 3],
+            *(['Category:B'] if page_id % 5 == 0 else []),
+        ])
+    return wiki
+
+
+def get_members(items):
+    return {page.page_id: (depth, parent.page_id) for depth, parent, page in items}
+
+
+def test_category_tree(tree, client):
+    items = list(client.category_tree('Category:Root'))
+    members = get_members(items)
+
+    # NOTE: Each member is yielded once, even on cycles
+    assert len(items) == len(members) == 27
+    assert not 100 in members
+    assert members[101] == (1, 100)
+    assert members[102] == (1, 100)
+    assert members[3] == (1, 100)
+    assert members[1] == (2, 101)
+    assert members[2] == (2, 102)
+
+
+def test_category_tree_max_depth_and_cmtype(tree, client):
+    members = get_members(client.category_tree('Category:Root', max_depth=1))
+    assert sorted(members) == [3, 6, 9, 12, 15, 18, 21, 24, 101, 102]
+
+    members = get_members(client.category_tree('Category:Root', cmtype='subcat'))
+    assert sorted(members) == [101, 102]
+
+
+def test_category_tree_resume(tree, transport, make_client):
+    items = make_client().category_tree('Category:Root', workers=1, crawl='test')
+    first = get_members(itertools.islice(items, 12))
+    items.close()
+
+    second = get_members(make_client().category_tree('Category:Root', workers=1, crawl='test'))
+    assert len(first) == 12
+    assert set(first) | set(second) == set(range(1, 26)) | {101, 102}
+    # Root category was not expanded again
+    assert len(transport.queried(generator='categorymembers', gcmpageid='100')) == 1
+
+    # Completed crawl is not expanded again
+    requests = len(transport.requests)
+    assert list(make_client().category_tree(100, crawl='test')) == []
+    assert len(transport.requests) == requests
@@ -0,0 +1,113 @@
+import pytest
+
+from .fakes import add_pages
+
+
+def test_pages_continued_props_are_merged(wiki, transport, client):
+    add_pages(wiki, 12)
+    pages = {page.page_id: page for page in client.pages(range(1, 13), profile='full')}
+
+    assert sorted(pages) == list(range(1, 13))
+    for page_id, page in pages.items():
+        assert page.title == f'Page {page_id}'
+        assert [category.title for category in page.categories] == [
+            f'Category:{page_id} {i}' for i in range(page_id % 5)
+        ]
+        assert page.extract == f'Extract {page_id}'
+        assert page.content == f'Content of page {page_id}'
+    continued = transport.queried(clcontinue='2')
+    assert continued
+    # NOTE: Continue values are merged with the original request's params
+    assert continued[0]['pageids'] == '|'.join(str(page_id) for page_id in range(1, 13))
+    assert continued[0]['prop'] == transport.requests[0]['prop']
+
+
+def test_pages_are_cached(wiki, transport, make_client):
+    add_pages(wiki, 3)
+    list(make_client().pages([1, 2, 3], profile='content'))
+    requests = len(transport.requests)
+
+    pages = list(make_client().pages([1, 2, 3], profile='content'))
+    assert sorted(page.page_id for page in pages) == [1, 2, 3]
+    assert len(transport.requests) == requests
+    # Missing props are fetched again
+    pages = list(make_client().pages([1, 2, 3], profile='extract'))
+    assert sorted(page.extract for page in pages) == ['Extract 1', 'Extract 2', 'Extract 3']
+    assert len(transport.requests) > requests
+
+
+def test_pages_batches(wiki, transport, client):
+    add_pages(wiki, 120, categories=1)
+    pages = list(client.pages(range(1, 121), profile='meta'))
+
+    assert sorted(page.page_id for page in pages) == list(range(1, 121))
+    batches = [params['pageids'].split('|') for params in transport.requests]
+    assert [len(batch) for batch in batches] == [50, 50, 20]
+
+
+def test_pages_redirects_and_missing(wiki, client):
+    add_pages(wiki, 2)
+    wiki.redirects['Alias'] = 'Page 2'
+    pages = {page.title: page for page in client.pages(['Page 1', 'Alias', 'Nope'], profile='meta')}
+
+    assert pages['Page 2'].aliases == ['Alias']
+    assert pages['Nope'].is_missing
+    assert client._cache.get_page_id('en', 'Alias') == 2
+
+
+def test_aliases_are_cache_hits(wiki, transport, make_client):
+    add_pages(wiki, 2)
+    wiki.redirects['Alias'] = 'Page 2'
+    page = make_client().page('alias', profile='meta')
+    assert page.title == 'Page 2'
+    assert sorted(page.aliases) == ['Alias', 'alias']
+
+    requests = len(transport.requests)
+    client = make_client()
+    for title in ['alias', 'Alias', 'Page_2', 'Page 2']:
+        assert client.page(title, profile='meta').page_id == 2
+    assert len(transport.requests) == requests
+
+
+@pytest.fixture
+def page_reads(client, monkeypatch):
+    # Count pages' data read from cache
+    reads = []
+    get_page = client._cache.page_db.get_page
+
+    def counted(lang, page_id):
+        reads.append(page_id)
+        return get_page(lang, page_id)
+    monkeypatch.setattr(client._cache.page_db, 'get_page', counted)
+    return reads
+
+
+def test_pages_cache_read_once(wiki, client, page_reads):
+    add_pages(wiki, 3)
+    list(client.pages([1, 2], profile='meta'))
+    page_reads.clear()
+
+    pages = list(client.pages([1, 2, 3], profile='extract'))
+    assert sorted(page.page_id for page in pages) == [1, 2, 3]
+    assert sorted(page_reads) == [1, 2, 3]
+    # Cached props are kept
+    assert all('pageprops' in page.props for page in pages if page.page_id < 3)
+
+
+def test_refresh_pages_with_cached_props(wiki, transport, client, page_reads):
+    add_pages(wiki, 4)
+    list(client.pages([1, 2], profile='extract'))
+    list(client.pages([3, 4], profile='content'))
+    for page_id in [1, 3]:
+        wiki.add_revision(page_id, f'New content of page {page_id}')
+    requests = len(transport.requests)
+    page_reads.clear()
+
+    pages = {page.page_id: page for page in client.refresh_pages()}
+    assert sorted(pages) == [1, 3]
+    assert pages[1].extract == 'Extract 1'
+    assert pages[3].content == 'New content of page 3'
+    refreshed = transport.requests[requests+1:]
+    assert sorted(params['prop'] for params in refreshed) == ['extracts|info', 'info|revisions']
+    # NOTE: Props are read from cache's meta, not from pages' data
+    assert page_reads == []
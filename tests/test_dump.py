@@ -0,0 +1,85 @@
+import bz2
+import os.path
+
+import pytest
+
+from wikipedia import dump
+from wikipedia.cache import WikiCache
+from wikipedia.cache.db import PageMetaDB
+from wikipedia.dump import ingest_dump, iter_dump
+
+
+DUMP_FN = os.path.join(os.path.dirname(__file__), 'fixtures', 'dump.xml')
+
+
+@pytest.fixture
+def dump_fn(tmp_path):
+    # Compressed copy of dump fixture
+    fn = str(tmp_path / 'dump.xml.bz2')
+    with open(DUMP_FN, 'rb') as f, bz2.open(fn, 'wb') as compressed:
+        compressed.write(f.read())
+    return fn
+
+
+def test_iter_dump():
+    with open(DUMP_FN, 'rb') as f:
+        pages = list(iter_dump(f, namespaces={0}))
+    assert [data['title'] for data in pages] == ['Alpha', 'A', 'First letter', 'Beta', 'Gamma']
+    alpha, redirect = pages[:2]
+    assert alpha['pagelanguage'] == 'en'
+    assert alpha['revisions'][0]['slots']['main']['content'] == "'''Alpha''' is the first letter."
+    assert not 'redirect' in alpha
+    assert redirect['redirect'] is True
+    assert redirect['_redirect'] == 'Alpha'
+
+
+def test_ingest_dump(tmp_path, dump_fn):
+    cache_dir = str(tmp_path / 'cache')
+    progress = []
+    ingested = ingest_dump(dump_fn, cache_dir=cache_dir, workers=1, batch_size=1, namespaces={0},
+                           progress=progress.append)
+    assert ingested == 2
+    assert progress[-1] == 2
+
+    cache = WikiCache(cache_dir=cache_dir)
+    page = cache.get('en', 4, None)
+    assert page.title == 'Beta'
+    assert page.revision_id == 104
+    assert page.content == "'''Beta''' & its history."
+    assert page.props == ['info', 'revisions']
+    assert cache.get_props('en', 4) == ['info', 'revisions']
+    # Talk pages are filtered out by namespaces
+    assert cache.get('en', 5, None) is None
+
+    # Redirects are stored as aliases of their targets, not as pages
+    assert cache.get('en', 2, None) is None
+    assert cache.get_page_id('en', 'A') == 1
+    assert cache.get_page_id('en', 'First letter') == 1
+    assert cache.get('en', None, 'First letter').title == 'Alpha'
+    assert cache.get_page_id('en', 'Gamma') is None
+
+
+@pytest.mark.parametrize('meta_db', ['sqlite', 'dbm'])
+def test_ingest_dump_spilled_redirects(tmp_path, dump_fn, monkeypatch, meta_db):
+    # Redirects are stored as unresolved aliases in meta DB, before their targets are ingested
+    monkeypatch.setattr(dump, 'REDIRECTS_BATCH_SIZE', 1)
+    cache_dir = str(tmp_path / 'cache')
+    ingest_dump(dump_fn, cache_dir=cache_dir, workers=1, batch_size=1, namespaces={0}, meta_db=meta_db)
+
+    cache = WikiCache(cache_dir=cache_dir, meta_db=meta_db)
+    # NOTE: dbm backend returns page ids as strings
+    assert int(cache.get_page_id('en', 'A')) == 1
+    assert int(cache.get_page_id('en', 'First letter')) == 1
+    assert cache.get_page_id('en', 'Gamma') is None
+    # Redirects with unknown targets are not kept
+    meta_db = PageMetaDB.get_backend(meta_db)(cache_dir=cache_dir)
+    assert meta_db.get_unresolved_aliases(100, 10) == []
+
+
+def test_ingested_pages_are_cache_hits(tmp_path, dump_fn, transport, make_client):
+    ingest_dump(dump_fn, cache_dir=str(tmp_path / 'cache'), workers=1)
+    client = make_client(profile='content')
+    page = client.page('A')
+    assert page.title == 'Alpha'
+    assert page.content == "'''Alpha''' is the first letter."
+    assert transport.requests == []
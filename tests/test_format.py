@@ -0,0 +1,76 @@
+import json
+import os.path
+
+from wikipedia.client import get_query_pages
+from wikipedia.page import WikiPage, WikiRevision, get_page_data
+
+from .fakes import add_pages
+
+
+LEGACY_PAGE = {
+    'pageid': 1,
+    'ns': 0,
+    'title': 'Page 1',
+    'lastrevid': 1001,
+    'pagelanguage': 'en',
+    'redirect': '',
+    'revisions': [{
+        'revid': 1001,
+        'slots': {'main': {'contentmodel': 'wikitext', '*': 'Legacy content'}},
+    }],
+    'langlinks': [{'lang': 'pl', '*': 'Strona 1'}],
+    'categoryinfo': {'size': 0, 'hidden': ''},
+    '_props': ['info', 'revisions', 'langlinks'],
+}
+
+
+def test_legacy_page():
+    page = WikiPage(LEGACY_PAGE)
+    assert page.content == 'Legacy content'
+    assert page.langlinks == {'pl': 'Strona 1'}
+    assert not page.is_missing
+    assert WikiPage({'title': 'Missing', 'missing': ''}).is_missing
+    assert WikiRevision({'revid': 1, '*': 'Revision content'}, 1).content == 'Revision content'
+
+
+def test_get_page_data_upgrades_legacy_shape():
+    data = get_page_data(WikiPage(LEGACY_PAGE))
+    assert data['redirect'] is True
+    assert data['revisions'][0]['slots']['main'] == {'contentmodel': 'wikitext', 'content': 'Legacy content'}
+    assert data['langlinks'] == [{'lang': 'pl', 'title': 'Strona 1'}]
+    assert data['categoryinfo'] == {'size': 0, 'hidden': True}
+    assert not '_props' in data
+    # Original data is not modified
+    assert LEGACY_PAGE['revisions'][0]['slots']['main']['*'] == 'Legacy content'
+
+
+def test_get_query_pages():
+    pages = [{'pageid': 1}, {'pageid': 2}]
+    assert get_query_pages({'query': {'pages': pages}}) == pages
+    # NOTE: Legacy results (like cached responses) have pages by page id
+    assert get_query_pages({'query': {'pages': {'1': pages[0], '2': pages[1]}}}) == pages
+    assert get_query_pages({'batchcomplete': ''}) == []
+
+
+def test_migrate_pages(wiki, transport, make_client):
+    add_pages(wiki, 2)
+    client = make_client(profile='content')
+    list(client.pages([1, 2]))
+    # Replace cached page with one in legacy shape
+    page_fn = client._cache.page_db.get_page_fn('en', 1)
+    assert os.path.exists(page_fn)
+    with open(page_fn, 'w') as f:
+        json.dump(LEGACY_PAGE, f)
+
+    # NOTE: Legacy cached pages are still cache hits
+    requests = len(transport.requests)
+    assert client.page(1).content == 'Legacy content'
+    assert len(transport.requests) == requests
+
+    assert client._cache.migrate_pages() == 1
+    with open(page_fn) as f:
+        data = json.load(f)
+    assert data['revisions'][0]['slots']['main']['content'] == 'Legacy content'
+    assert data['_props'] == LEGACY_PAGE['_props']
+    # Migrated pages are not converted again
+    assert client._cache.migrate_pages() == 0
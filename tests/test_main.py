@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from wikipedia.__main__ import main
+
+from .fakes import add_pages
+
+
+class Interrupt:
+
+    # Wrap handler, interrupting on n-th request for pages' data
+
+    def __init__(self, handler, n):
+        self.handler = handler
+        self.n = n
+
+    def __call__(self, params):
+        if 'pageids' in params or 'titles' in params:
+            self.n -= 1
+            if not self.n:
+                raise KeyboardInterrupt()
+        return self.handler(params)
+
+
+@pytest.fixture
+def run(tmp_path, transport, monkeypatch, capsys):
+    # Run CLI with fake transport, return output pages' ids
+    monkeypatch.setattr('wikipedia.client.SessionTransport', lambda session: transport)
+
+    def run(*argv):
+        capsys.readouterr()
+        status = main([*argv, '--cache-dir', str(tmp_path / 'cache'), '--workers', '1', '--batch-size', '2'])
+        output = capsys.readouterr().out
+        return status, [json.loads(line)['pageid'] for line in output.splitlines()]
+    return run
+
+
+def test_fetch_resume(wiki, transport, tmp_path, run):
+    add_pages(wiki, 9)
+    input_fn = tmp_path / 'titles.txt'
+    input_fn.write_text('\n'.join(f'Page {page_id}' for page_id in range(1, 10)))
+
+    transport.handler = Interrupt(wiki, 4)
+    status, pages = run('fetch', str(input_fn), '--resume', 'test')
+    assert status == 130
+    assert pages == [1, 2, 3, 4]
+
+    transport.handler = wiki
+    status, pages = run('fetch', str(input_fn), '--resume', 'test')
+    assert not status
+    # NOTE: Resumed after the last complete batch
+    assert pages == [5, 6, 7, 8, 9]
+
+
+def test_category_load_resume(wiki, transport, run):
+    add_pages(wiki, 9, categories=1)
+    wiki.add_page(100, 'Category:Root', ns=14)
+    wiki.members['Category:Root'] = list(range(1, 10))
+
+    transport.handler = Interrupt(wiki, 4)
+    status, pages = run('category', 'Category:Root', '--load', '--resume', 'test')
+    assert status == 130
+    done = set(pages)
+    assert done
+
+    transport.handler = wiki
+    status, pages = run('category', 'Category:Root', '--load', '--resume', 'test')
+    assert not status
+    # NOTE: Members fetched in complete batches are skipped
+    assert not done & set(pages)
+    assert done | set(pages) == set(range(1, 10))
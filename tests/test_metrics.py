@@ -0,0 +1,67 @@
+from wikipedia import Metrics
+from wikipedia.metrics import NULL_METRICS
+
+from .fakes import add_pages
+
+
+def test_export_dict():
+    metrics = Metrics()
+    metrics.inc('api_calls', query='allpages')
+    metrics.inc('api_calls', 2, query='allpages')
+    metrics.inc('api_calls', query='')
+    for value in [.001, .003, 60]:
+        metrics.observe('request_seconds', value)
+    metrics.observe('continuation_depth', 3)
+
+    snapshot = metrics.export()
+    assert snapshot['counters']['api_calls'] == [
+        {'labels': {'query': ''}, 'value': 1},
+        {'labels': {'query': 'allpages'}, 'value': 3},
+    ]
+    request_seconds, = snapshot['histograms']['request_seconds']
+    assert request_seconds['count'] == 3
+    assert request_seconds['sum'] == .001 + .003 + 60
+    # NOTE: Buckets are cumulative, values equal to bucket's bound are counted in it
+    buckets = dict(request_seconds['buckets'])
+    assert (buckets[.001], buckets[.005], buckets[30.], buckets[float('inf')]) == (1, 2, 2, 3)
+    depth, = snapshot['histograms']['continuation_depth']
+    assert depth['buckets'][:3] == [(1, 0), (2, 0), (5, 1)]
+
+
+def test_export_prometheus():
+    metrics = Metrics()
+    metrics.inc('pipeline_items', stage='fetch', result='ok')
+    metrics.inc('pipeline_items', stage='a "quoted"\nstage', result='error')
+    metrics.observe('continuation_depth', 2)
+
+    lines = metrics.export('prometheus').splitlines()
+    assert lines[:3] == [
+        '# TYPE wikipedia_pipeline_items_total counter',
+        'wikipedia_pipeline_items_total{result="error",stage="a \\"quoted\\"\\nstage"} 1',
+        'wikipedia_pipeline_items_total{result="ok",stage="fetch"} 1',
+    ]
+    assert lines[3] == '# TYPE wikipedia_continuation_depth histogram'
+    assert 'wikipedia_continuation_depth_bucket{le="2"} 1' in lines
+    assert 'wikipedia_continuation_depth_bucket{le="+Inf"} 1' in lines
+    assert lines[-2:] == ['wikipedia_continuation_depth_sum 2', 'wikipedia_continuation_depth_count 1']
+
+
+def test_custom_exporter():
+    metrics = Metrics()
+    metrics.inc('stale_pages', 5)
+    assert metrics.export(lambda metrics: dict(metrics.counters)) == {('stale_pages', ()): 5}
+
+
+def test_client_metrics(wiki, make_client):
+    add_pages(wiki, 3)
+    metrics = Metrics()
+    client = make_client(metrics=metrics)
+    list(client.pages([1, 2, 3], profile='meta'))
+    list(client.pages([1, 2, 3], profile='meta'))
+
+    counters = metrics.export()['counters']
+    assert sum(counter['value'] for counter in counters['api_calls']) == 1
+    assert {'labels': {'result': 'hit', 'tier': 'page'}, 'value': 3} in counters['cache_lookups']
+    assert metrics.histograms[('request_seconds', ())].count == 1
+    # Disabled metrics don't collect anything
+    assert NULL_METRICS.export() == {'counters': {}, 'histograms': {}}
@@ -0,0 +1,93 @@
+import io
+import json
+import threading
+
+from wikipedia.pipeline import CacheSink, FetchStage, JSONLSink, Pipeline, Stage
+
+from .fakes import add_pages
+
+
+def test_jsonl_sink(wiki, client):
+    add_pages(wiki, 5)
+    wiki.redirects['Alias'] = 'Page 3'
+    f = io.StringIO()
+    pipeline = Pipeline([FetchStage(client, workers=2, profile='meta'), JSONLSink(f, batch_size=2)])
+    pages = list(pipeline.run([1, 2, 'Alias', 4, 5]))
+
+    assert len(pages) == 5
+    lines = [json.loads(line) for line in f.getvalue().splitlines()]
+    assert sorted(data['pageid'] for data in lines) == [1, 2, 3, 4, 5]
+    # NOTE: Client's internal data is not written
+    assert not any(key.startswith('_') for data in lines for key in data)
+
+
+def test_fetch_cache_sink_single_write(wiki, client, monkeypatch):
+    add_pages(wiki, 5)
+    list(client.pages([1, 2], profile='meta'))
+    inserted = []
+    insert_page = client._cache.page_db.insert_page
+
+    def counted(page):
+        inserted.append(page.page_id)
+        return insert_page(page)
+    monkeypatch.setattr(client._cache.page_db, 'insert_page', counted)
+
+    fetch = FetchStage(client, workers=2, profile='meta')
+    pipeline = Pipeline([fetch, CacheSink(client._cache, batch_size=2)])
+    pages = list(pipeline.run([1, 2, 3, 4, 5]))
+
+    assert not fetch.insert
+    assert sorted(page.page_id for page in pages) == [1, 2, 3, 4, 5]
+    # NOTE: Fetched pages are written once, cache hits are not written again
+    assert sorted(inserted) == [3, 4, 5]
+    assert all(client._cache.get_revision_id('en', page_id) for page_id in range(1, 6))
+
+
+def test_pipeline_error_isolation():
+    def process(item):
+        if item % 3 == 0:
+            raise ValueError(item)
+        return item
+
+    errors = []
+    pipeline = Pipeline(
+        [Stage('process', process, workers=2), Stage('drop', lambda item: item if item % 2 else None)],
+        on_error=lambda name, item, e: errors.append((name, item)),
+    )
+    results = list(pipeline.run(range(10)))
+
+    assert sorted(results) == [1, 5, 7]
+    assert sorted(errors) == [('process', 0), ('process', 3), ('process', 6), ('process', 9)]
+    process_stats, drop_stats = pipeline.stats
+    assert (process_stats.processed, process_stats.errors) == (6, 4)
+    assert (drop_stats.processed, drop_stats.dropped) == (3, 3)
+
+
+class ClosingStage(Stage):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.closed = 0
+
+    def close(self):
+        self.closed += 1
+
+
+def test_pipeline_early_close():
+    fed = []
+
+    def items():
+        for item in range(10000):
+            fed.append(item)
+            yield item
+
+    stages = [ClosingStage('first', lambda item: item, workers=2), ClosingStage('second', lambda item: item)]
+    pipeline = Pipeline(stages, queue_size=5)
+    results = pipeline.run(items())
+    assert [next(results) for _ in range(3)]
+    results.close()
+
+    # Workers are stopped, feeding stops at bounded queues, each stage is closed once
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith('wikipedia-pipeline')]
+    assert len(fed) < 100
+    assert [stage.closed for stage in stages] == [1, 1]
@@ -0,0 +1,85 @@
+import urllib.parse
+
+import pytest
+
+from wikipedia import WikiClientPool, TransportPolicy
+
+from .fakes import FakeTransport, FakeWiki, add_pages
+
+
+LANGS = ['en', 'pl', 'de']
+
+
+class LangTransport(FakeTransport):
+
+    # Answer requests by fake wiki of API URL's language
+
+    def __init__(self, wikis):
+        super().__init__(None)
+        self.wikis = wikis
+
+    def get(self, api_url, params, timeout=None):
+        lang = urllib.parse.urlsplit(api_url).hostname.split('.')[0]
+        self.handler = self.wikis[lang]
+        response = super().get(api_url, params, timeout)
+        self.requests[-1]['_lang'] = lang
+        return response
+
+
+@pytest.fixture
+def wikis():
+    wikis = {lang: FakeWiki(lang) for lang in LANGS}
+    for lang, wiki in wikis.items():
+        add_pages(wiki, 3)
+    wikis['en'].add_page(10, 'Poland', langlinks={'pl': 'Polska', 'de': 'Polen'})
+    wikis['pl'].add_page(20, 'Polska', content='Polska')
+    wikis['de'].add_page(30, 'Polen', content='Polen')
+    return wikis
+
+
+@pytest.fixture
+def pool(tmp_path, wikis):
+    transport = LangTransport(wikis)
+    pool = WikiClientPool('en', cache_dir=str(tmp_path / 'cache'), policy=TransportPolicy(backoff=0, jitter=0))
+    for lang in LANGS:
+        pool.client(lang)._transport = transport
+    pool.transport = transport
+    with pool:
+        yield pool
+
+
+def test_route(tmp_path, pool):
+    assert pool.route('Page 1').lang == 'en'
+    assert pool.route('Page 1', 'pl').lang == 'pl'
+    assert pool.route('https://de.wikipedia.org/wiki/Page_1').lang == 'de'
+    # NOTE: URL's domain takes precedence over given lang
+    assert pool.route('https://de.wikipedia.org/wiki/Page_1', 'pl').lang == 'de'
+    with WikiClientPool(cache_dir=str(tmp_path / 'cache')) as no_lang_pool:
+        with pytest.raises(ValueError):
+            no_lang_pool.route('Page 1')
+
+
+def test_pages(pool):
+    pages = list(pool.pages([
+        'Page 1',
+        'https://pl.wikipedia.org/wiki/Page_2',
+        'https://de.wikipedia.org/wiki/Page_3',
+        'https://de.wikipedia.org/wiki/Page_1',
+    ], profile='meta'))
+    assert sorted((page.lang, page.title) for page in pages) == [
+        ('de', 'Page 1'), ('de', 'Page 3'), ('en', 'Page 1'), ('pl', 'Page 2'),
+    ]
+    # Pages of each language are fetched in one batch, and cached by language
+    assert sorted(params['_lang'] for params in pool.transport.requests) == ['de', 'en', 'pl']
+    assert pool._cache.get('de', None, 'Page 1').lang == 'de'
+    assert pool._cache.get('pl', None, 'Page 1') is None
+
+
+def test_langlinks(pool):
+    pages = pool.langlinks('Poland')
+    assert {lang: page.title for lang, page in pages.items()} == {'pl': 'Polska', 'de': 'Polen'}
+    assert pages['pl'].content == 'Polska'
+    assert pages['pl'].lang == 'pl'
+
+    pages = pool.langlinks('Poland', langs=['de'])
+    assert list(pages) == ['de']
@@ -0,0 +1,57 @@
+import threading
+import time
+
+import pytest
+
+from wikipedia import TransportPolicy, RequestError
+
+from .fakes import add_pages
+
+
+@pytest.fixture
+def category(wiki):
+    add_pages(wiki, 100, categories=1)
+    wiki.add_page(1000, 'Category:Root', ns=14)
+    wiki.members['Category:Root'] = list(range(1, 101))
+    return wiki
+
+
+def list_members(client, **kwargs):
+    return client.category_members(client.page(1000, profile='meta'), **kwargs)
+
+
+def wait_for_prefetch_threads(timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not any(thread.name == 'wikipedia-prefetch' for thread in threading.enumerate()):
+            return True
+        time.sleep(.01)
+    return False
+
+
+def test_prefetch(category, make_client):
+    pages = list(list_members(make_client(prefetch=2)))
+    assert [page.page_id for page in pages] == list(range(1, 101))
+    assert wait_for_prefetch_threads()
+
+
+def test_prefetch_early_close(category, transport, make_client):
+    members = list_members(make_client(prefetch=2))
+    requests = len(transport.requests)
+    assert next(members).page_id == 1
+    members.close()
+
+    # NOTE: Background thread stops after request in flight, without fetching all results
+    assert wait_for_prefetch_threads()
+    assert len(transport.requests) - requests <= 4
+
+
+def test_prefetch_error(category, wiki, transport, make_client):
+    client = make_client(prefetch=2, policy=TransportPolicy(backoff=0, jitter=0, max_retries=0, maxlag=None))
+    members = list_members(client)
+    assert next(members).page_id == 1
+    wiki.failures.append((503, {}))
+    # Error of continued request is raised by consumer, after pages fetched before
+    with pytest.raises(RequestError):
+        list(members)
+    assert wait_for_prefetch_threads()
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+from wikipedia import ratelimit
+from wikipedia.ratelimit import TokenBucket, FileTokenBucket
+
+
+requires_fcntl = pytest.mark.skipif(ratelimit.fcntl is None, reason='FileTokenBucket requires fcntl')
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Fake clock, advanced by sleeping
+    clock = [1000.]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        clock[0] += seconds
+    monkeypatch.setattr(time, 'monotonic', lambda: clock[0])
+    monkeypatch.setattr(time, 'time', lambda: clock[0])
+    monkeypatch.setattr(time, 'sleep', sleep)
+    return sleeps
+
+
+def test_token_bucket(clock):
+    bucket = TokenBucket(rate=2, burst=2)
+    for _ in range(5):
+        with bucket:
+            pass
+    # NOTE: Burst is used first, then requests are spaced by 1/rate
+    assert clock == [.5, .5, .5]
+
+
+def test_token_bucket_max_concurrent():
+    bucket = TokenBucket(max_concurrent=2)
+    bucket.acquire()
+    bucket.acquire()
+    assert not bucket._slots.acquire(blocking=False)
+    bucket.release()
+    assert bucket._slots.acquire(blocking=False)
+
+
+@requires_fcntl
+def test_file_token_bucket_shared(tmp_path, clock):
+    fn = str(tmp_path / 'ratelimit')
+    first = FileTokenBucket(fn, rate=1, burst=2)
+    second = FileTokenBucket(fn, rate=1, burst=2)
+    with first, first:
+        pass
+    # NOTE: Tokens are shared by buckets using the same file
+    with second:
+        pass
+    assert clock == [1.]
+
+
+@requires_fcntl
+def test_file_token_bucket_slots(tmp_path):
+    first = FileTokenBucket(max_concurrent=2, cache_dir=str(tmp_path))
+    second = FileTokenBucket(max_concurrent=2, cache_dir=str(tmp_path))
+    first.acquire()
+    first.acquire()
+
+    acquired = threading.Event()
+
+    def acquire():
+        second.acquire()
+        acquired.set()
+        second.release()
+    thread = threading.Thread(target=acquire)
+    thread.start()
+    assert not acquired.wait(.1)
+    first.release()
+    assert acquired.wait(5)
+    thread.join()
+    first.release()
@@ -0,0 +1,87 @@
+import pytest
+
+from .fakes import add_pages
+
+
+def test_stale_pages(wiki, transport, client):
+    add_pages(wiki, 60)
+    list(client.pages(range(1, 61), profile='meta'))
+    revision_ids = {page_id: wiki.add_revision(page_id, f'New content of page {page_id}') for page_id in [7, 55]}
+    del wiki.pages[8]
+    requests = len(transport.requests)
+    progress = []
+
+    stale = list(client.stale_pages(progress=lambda *args: progress.append(args)))
+    assert stale == [
+        ('en', page_id, page_id*1000+1, revision_id)
+        for page_id, revision_id in revision_ids.items()
+    ]
+    # Pages' info is checked in batches, missing pages are skipped
+    checked = transport.requests[requests:]
+    assert [len(params['pageids'].split('|')) for params in checked] == [50, 10]
+    assert all(params['prop'] == 'info' for params in checked)
+    assert progress == [(50, 60, 1), (60, 60, 2)]
+
+
+def test_stale_pages_of_page_meta(wiki, client):
+    add_pages(wiki, 3)
+    list(client.pages([1, 2, 3], profile='meta'))
+    wiki.add_revision(2, 'New content')
+    # Only the latest cached revision of each page is checked
+    page_meta = [('en', 2, 2001, 'Page 2'), ('en', 2, 2002, 'Page 2'), ('en', 3, 3001, 'Page 3')]
+    assert list(client.stale_pages(page_meta)) == []
+    assert list(client.stale_pages(page_meta[:1])) == [('en', 2, 2001, 2002)]
+
+
+def test_refresh_pages(wiki, transport, client):
+    add_pages(wiki, 5)
+    list(client.pages(range(1, 6), profile='content'))
+    wiki.add_revision(4, 'New content of page 4')
+
+    pages = list(client.refresh_pages())
+    assert [page.page_id for page in pages] == [4]
+    assert pages[0].content == 'New content of page 4'
+    # Cache is updated, so refreshed page is not stale anymore
+    cached = client._cache.get('en', 4, None)
+    assert cached.revision_id == 4002
+    assert cached.content == 'New content of page 4'
+    assert list(client.refresh_pages()) == []
+
+
+@pytest.fixture
+def changed(wiki, client):
+    # Pages 1-25 cached, pages 2 and 4 changed since, page 30 is not cached
+    add_pages(wiki, 30)
+    list(client.pages(range(1, 26), profile='content'))
+    wiki.add_revision(2, 'New content of page 2', '2024-02-01T00:00:00Z')
+    wiki.add_revision(30, 'New content of page 30', '2024-02-01T00:01:00Z')
+    wiki.add_revision(4, 'New content of page 4', '2024-02-01T00:02:00Z')
+    return wiki
+
+
+def test_refresh_recent_changes(changed, transport, client):
+    # First run only stores the high-water mark
+    assert list(client.refresh_recent_changes()) == []
+    assert client._cache.get_state('recentchanges:en')
+    assert transport.queried(list='recentchanges') == []
+
+    client._cache.set_state('recentchanges:en', '2024-01-01T00:00:00Z')
+    pages = list(client.refresh_recent_changes())
+    assert sorted(page.page_id for page in pages) == [2, 4]
+    assert client._cache.get('en', 2, None).content == 'New content of page 2'
+    # Changes are continued, and the mark is moved to the last change
+    assert len(transport.queried(list='recentchanges')) == 4
+    assert client._cache.get_state('recentchanges:en') == '2024-02-01T00:02:00Z'
+
+    # NOTE: Changes since the mark are listed again, but pages are up to date
+    assert list(client.refresh_recent_changes()) == []
+    assert client._cache.get_state('recentchanges:en') == '2024-02-01T00:02:00Z'
+
+
+def test_refresh_recent_changes_interrupted(changed, client):
+    client._cache.set_state('recentchanges:en', '2024-01-01T00:00:00Z')
+    pages = client.refresh_recent_changes()
+    next(pages)
+    pages.close()
+    # Mark is not moved, so interrupted refresh is repeated
+    assert client._cache.get_state('recentchanges:en') == '2024-01-01T00:00:00Z'
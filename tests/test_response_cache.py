@@ -0,0 +1,34 @@
+import time
+
+from .fakes import add_pages
+
+
+def list_members(client):
+    category = client.page(100, profile='meta')
+    return [page.page_id for page in client.category_members(category)]
+
+
+def test_response_ttl(wiki, transport, make_client, monkeypatch):
+    add_pages(wiki, 25, categories=1)
+    wiki.add_page(100, 'Category:Root', ns=14)
+    wiki.members['Category:Root'] = list(range(1, 26))
+    client = make_client(response_ttl={'categorymembers': 3600})
+
+    assert list_members(client) == list(range(1, 26))
+    requests = len(transport.requests)
+    assert requests == 4
+
+    # Continued responses are replayed from cache, by another client sharing it
+    wiki.members['Category:Root'] = list(range(1, 11))
+    assert list_members(make_client(response_ttl={'categorymembers': 3600})) == list(range(1, 26))
+    assert len(transport.requests) == requests
+
+    # Responses of query types without TTL are not cached
+    assert list_members(make_client()) == list(range(1, 11))
+
+    # Expired responses are fetched again
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 3601)
+    requests = len(transport.requests)
+    assert list_members(client) == list(range(1, 11))
+    assert len(transport.requests) == requests + 1
@@ -0,0 +1,134 @@
+import random
+
+import pytest
+
+from wikipedia.cache.db import RevisionDB
+from wikipedia.cache.revisions import RevisionStore, apply_delta, get_chain_lengths, get_delta
+
+from wikipedia.page import WikiRevision
+
+
+def get_texts(count, seed=1):
+    # Return texts of page's revisions, each with a few lines changed
+    rnd = random.Random(seed)
+    lines = [f'Line {i}\n' for i in range(50)]
+    texts = []
+    for n in range(count):
+        i = rnd.randrange(len(lines))
+        if n % 3 == 0:
+            lines.insert(i, f'Added {n} – ü\n')
+        elif n % 3 == 1:
+            lines[i] = f'Changed {n}\n'
+        else:
+            del lines[i]
+        texts.append(''.join(lines))
+    return texts
+
+
+def get_revisions(texts, page_id=1, day=1):
+    return [
+        WikiRevision({
+            'revid': page_id*1000 + n,
+            'parentid': page_id*1000 + n-1 if n else 0,
+            'timestamp': f'2024-01-{day + n//24:02d}T{n%24:02d}:00:00Z',
+            'user': 'User',
+            'comment': f'Edit {n}',
+            'minor': bool(n % 2),
+            'size': len(text),
+            'slots': {'main': {'content': text}},
+        }, page_id)
+        for n, text in enumerate(texts)
+    ]
+
+
+@pytest.fixture
+def revision_db(tmp_path):
+    return RevisionDB.get_backend('sqlite')(cache_dir=str(tmp_path))
+
+
+def test_delta():
+    base, text = get_texts(2)
+    assert apply_delta(base, get_delta(base, text)) == text
+    assert apply_delta(text, get_delta(text, '')) == ''
+    assert apply_delta('', get_delta('', text)) == text
+
+
+def test_revisions_round_trip(revision_db):
+    store = RevisionStore(revision_db, max_chain=5)
+    revisions = get_revisions(get_texts(30))
+    assert store.insert('en', 1, revisions) == 30
+
+    stored = list(store.revisions('en', 1))
+    assert [revision.revision_id for revision in stored] == [revision.revision_id for revision in reversed(revisions)]
+    for revision, expected in zip(stored, reversed(revisions)):
+        assert revision.content == expected.content
+        assert revision.timestamp == expected.timestamp
+        assert revision.comment == expected.comment
+        assert revision.is_minor == expected.is_minor
+    assert store.get('en', 1, 1003).content == revisions[3].content
+    assert store.get_text('en', 1, 1017) == revisions[17].content
+    assert store.get('en', 1, 999) is None
+    assert store.newest_revision_id('en', 1) == 1029
+    assert max(get_chain_lengths(revision_db.get_revision_ids('en', 1)).values()) <= 5
+
+
+def test_revisions_appended_and_merged(revision_db):
+    store = RevisionStore(revision_db, max_chain=4)
+    revisions = get_revisions(get_texts(25))
+    assert store.insert('en', 1, revisions[10:20]) == 10
+    assert store.insert('en', 1, revisions[18:]) == 5
+    # Older revisions are merged into stored ones
+    assert store.insert('en', 1, revisions[:10]) == 10
+
+    stored = list(store.revisions('en', 1))
+    assert [revision.content for revision in stored] == [revision.content for revision in reversed(revisions)]
+    assert max(get_chain_lengths(revision_db.get_revision_ids('en', 1)).values()) <= 4
+
+
+def test_revisions_retention(revision_db):
+    store = RevisionStore(revision_db, max_revisions=5)
+    revisions = get_revisions(get_texts(20))
+    store.insert('en', 1, revisions)
+    stored = list(store.revisions('en', 1))
+    assert [revision.revision_id for revision in stored] == [1019, 1018, 1017, 1016, 1015]
+    assert stored[-1].content == revisions[15].content
+
+    # NOTE: Newest revision is always kept
+    store = RevisionStore(revision_db, max_age=3600)
+    store.insert('en', 2, get_revisions(get_texts(10), page_id=2))
+    assert [revision.revision_id for revision in store.revisions('en', 2)] == [2009]
+
+
+def test_revisions_compact(revision_db):
+    store = RevisionStore(revision_db, max_chain=3)
+    for page_id in [1, 2]:
+        store.insert('en', page_id, get_revisions(get_texts(20, page_id), page_id, day=page_id))
+    size = store.compact()
+
+    store.max_size = size // 2
+    assert store.compact() <= size // 2
+    for page_id in [1, 2]:
+        stored = list(store.revisions('en', page_id))
+        assert stored[0].revision_id == page_id*1000 + 19
+        assert stored[0].content == get_texts(20, page_id)[-1]
+    # Oldest revisions of all pages are removed first
+    assert len(list(store.revisions('en', 1))) < len(list(store.revisions('en', 2)))
+
+
+def test_update_revisions(wiki, transport, client):
+    texts = get_texts(8)
+    wiki.add_page(1, 'Page 1', content=texts[0])
+    for text in texts[1:]:
+        wiki.add_revision(1, text)
+
+    assert client.update_revisions(1) == 8
+    assert [revision.content for revision in client._cache.revisions.revisions('en', 1)] == texts[::-1]
+
+    wiki.add_revision(1, 'New text\n')
+    wiki.add_revision(1, 'Newest text\n')
+    requests = len(transport.requests)
+    assert client.update_revisions('Page 1') == 2
+    assert transport.requests[-1]['rvstartid'] == '1008'
+    assert len(transport.requests) - requests == 2
+    assert client._cache.revisions.get('en', 1, 1010).content == 'Newest text\n'
+    assert client.update_revisions(1) == 0
@@ -0,0 +1,37 @@
+from .fakes import add_pages
+
+
+def add_matching_pages(wiki):
+    # Page N mentions 'needle' (N % 7) times
+    add_pages(wiki, 30, categories=1)
+    for page_id in range(1, 31):
+        wiki.add_revision(page_id, f'Content of page {page_id}' + ' needle' * (page_id % 7))
+
+
+def get_expected(limit=None):
+    ranked = sorted(
+        (page_id for page_id in range(1, 31) if page_id % 7),
+        key=lambda page_id: (-(page_id % 7), page_id),
+    )
+    return ranked[:limit]
+
+
+def test_search_rank_order(wiki, transport, client):
+    add_matching_pages(wiki)
+    pages = list(client.search('needle', profile='meta'))
+    # NOTE: Pages are returned by API unordered, but yielded in rank order
+    assert [page.page_id for page in pages] == get_expected()
+    assert len(transport.queried(generator='search')) == 3
+    # Found pages are cached
+    assert all(client._cache.get_revision_id('en', page.page_id) for page in pages)
+
+
+def test_search_limit(wiki, transport, client):
+    add_matching_pages(wiki)
+    pages = list(client.search('needle', limit=5, profile='meta'))
+    assert [page.page_id for page in pages] == get_expected(5)
+    assert [params['gsrlimit'] for params in transport.queried(generator='search')] == ['5']
+
+    pages = list(client.search('needle', limit=15, profile='content'))
+    assert [page.page_id for page in pages] == get_expected(15)
+    assert pages[0].content.endswith('needle')
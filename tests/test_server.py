@@ -0,0 +1,85 @@
+import http.server
+import threading
+
+import pytest
+import requests
+
+from wikipedia import WikiClient, WikiClientPool, TransportPolicy
+from wikipedia.server import ProxyRequestHandler, WikiProxy
+
+from .fakes import add_pages
+
+
+@pytest.fixture
+def proxy_url(tmp_path, transport):
+    # Proxy on random port, forwarding to fake wiki
+    pool = WikiClientPool('en', cache_dir=str(tmp_path / 'proxy'), policy=TransportPolicy(backoff=0, jitter=0))
+    pool.client('en')._transport = transport
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), ProxyRequestHandler)
+    server.proxy = WikiProxy(pool)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:%s' % server.server_address[1]
+    server.shutdown()
+    server.server_close()
+    pool.close()
+
+
+@pytest.fixture
+def make_proxied_client(tmp_path, proxy_url):
+    class ProxiedClient(WikiClient):
+        API_URL = proxy_url + '/%s/w/api.php'
+
+    def make_proxied_client(name, **kwargs):
+        return ProxiedClient(
+            'en', cache_dir=str(tmp_path / name), policy=TransportPolicy(backoff=0, jitter=0), **kwargs,
+        )
+    return make_proxied_client
+
+
+def test_lookup_from_cache(wiki, transport, proxy_url, make_proxied_client):
+    add_pages(wiki, 5)
+    wiki.redirects['Alias'] = 'Page 3'
+    titles = ['page 1', 'Alias', 'Page 2']
+    pages = list(make_proxied_client('first').pages(titles, profile='meta'))
+    assert sorted(page.title for page in pages) == ['Page 1', 'Page 2', 'Page 3']
+    requests_count = len(transport.requests)
+
+    # Pages are answered from proxy's cache, in the same shape as by API
+    client = make_proxied_client('second')
+    pages = list(client.pages(titles + ['Missing'], profile='meta'))
+    assert sorted(page.title for page in pages) == ['Missing', 'Page 1', 'Page 2', 'Page 3']
+    assert client._cache.get_page_id('en', 'Alias') == 3
+    assert [params['titles'] for params in transport.requests[requests_count:]] == ['Missing']
+
+    # NOTE: Lookup sent by client, with titles resolved by proxy
+    response = requests.get(proxy_url + '/en/w/api.php', params=dict(
+        transport.requests[-1], titles='page 1|Alias|Missing',
+    ))
+    data = response.json()
+    assert response.status_code == 200
+    assert data['query']['normalized'] == [{'from': 'page 1', 'to': 'Page 1'}]
+    assert data['query']['redirects'] == [{'from': 'Alias', 'to': 'Page 3'}]
+    pages = {page['title']: page for page in data['query']['pages']}
+    assert pages['Missing']['missing'] is True
+    assert pages['Page 3']['pageid'] == 3
+
+
+def test_forward_formatversion_1(wiki, transport, proxy_url):
+    add_pages(wiki, 2)
+    params = {'action': 'query', 'format': 'json', 'redirects': '', 'pageids': '1', 'prop': 'info'}
+    response = requests.get(proxy_url + '/en/w/api.php', params=params)
+    assert response.status_code == 200
+    # NOTE: Legacy lookups are not answered from cache, but forwarded as requested
+    assert transport.queried(pageids='1', formatversion='1')
+    assert response.json()['query']['pages'][0]['pageid'] == 1
+
+
+def test_internal_error(wiki, transport, proxy_url):
+    def fail(params):
+        raise RuntimeError('broken')
+    transport.handler = fail
+    response = requests.get(proxy_url + '/en/w/api.php', params={'action': 'parse', 'page': 'Page 1'})
+    assert response.status_code == 500
+    assert response.json()['error']['code'] == 'internal_api_error'
+    assert 'RuntimeError: broken' in response.json()['error']['info']
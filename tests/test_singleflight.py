@@ -0,0 +1,80 @@
+import threading
+import time
+
+from wikipedia.singleflight import SingleFlight
+
+from .fakes import add_pages
+
+
+def run_concurrently(func, count=5):
+    results = [None] * count
+
+    def run(i):
+        try:
+            results[i] = func()
+        except Exception as e:
+            results[i] = e
+    threads = [threading.Thread(target=run, args=(i, )) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_single_flight():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def func(value):
+        calls.append(value)
+        release.wait()
+        return value
+
+    threads, results = run_concurrently(lambda: flights.do('key', func, 1))
+    time.sleep(.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+    assert results == [1] * 5
+
+    # Finished calls are not cached
+    assert flights.do('key', func, 2) == 2
+    assert calls == [1, 2]
+
+
+def test_single_flight_error():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def func():
+        release.wait()
+        raise ValueError('failed')
+
+    threads, results = run_concurrently(lambda: flights.do('key', func))
+    time.sleep(.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+    # NOTE: Error is raised by all waiting callers
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flights._calls == {}
+
+
+def test_page_coalesced(wiki, transport, client):
+    add_pages(wiki, 1)
+    release = threading.Event()
+
+    def handler(params):
+        release.wait()
+        return wiki(params)
+    transport.handler = handler
+
+    threads, results = run_concurrently(lambda: client.page(1, profile='meta'))
+    time.sleep(.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert [page.title for page in results] == ['Page 1'] * 5
+    # Page is fetched and inserted into cache once
+    assert len(transport.requests) == 1
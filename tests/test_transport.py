@@ -0,0 +1,116 @@
+import time
+
+import pytest
+
+from wikipedia import WikiClient, TransportPolicy, RequestError
+
+from .fakes import FakeTransport, add_pages
+
+
+@pytest.fixture
+def delays(monkeypatch):
+    # Record delays between retries, instead of sleeping
+    delays = []
+    monkeypatch.setattr(time, 'sleep', delays.append)
+    return delays
+
+
+def test_retry_with_backoff(wiki, transport, make_client, delays):
+    add_pages(wiki, 1)
+    client = make_client(policy=TransportPolicy(backoff=1, jitter=0, max_backoff=3, maxlag=None))
+    wiki.failures.extend([(503, {}), (502, {}), (500, {}), (429, {})])
+
+    page = client.page(1, profile='meta')
+    assert page.title == 'Page 1'
+    assert delays == [1, 2, 3, 3]
+    assert client.retries == 4
+    assert len(transport.requests) == 5
+
+
+def test_retry_after(wiki, make_client, delays):
+    add_pages(wiki, 1)
+    client = make_client(policy=TransportPolicy(backoff=1, jitter=0, maxlag=None))
+    wiki.failures.extend([
+        (429, {'Retry-After': '7'}),
+        (503, {'Retry-After': 'not a date'}),
+        (503, {'X-Database-Lag': '5', 'Retry-After': '5'}),
+    ])
+
+    assert client.page(1, profile='meta').title == 'Page 1'
+    # NOTE: Malformed Retry-After falls back to backoff
+    assert delays == [7, 2, 5]
+
+
+def test_retry_after_date():
+    response = type('Response', (), {})()
+    policy = TransportPolicy()
+    for timezone in ['GMT', '+0000', '-0000']:
+        response.headers = {
+            'Retry-After': time.strftime(f'%a, %d %b %Y %H:%M:%S {timezone}', time.gmtime(time.time()+30)),
+        }
+        assert 25 < policy.get_retry_after(response) <= 30
+    response.headers = {'Retry-After': 'Mon, 99 Foo 2024'}
+    assert policy.get_retry_after(response) is None
+
+
+def test_retries_exhausted(wiki, transport, make_client, delays):
+    add_pages(wiki, 1)
+    client = make_client(policy=TransportPolicy(backoff=0, jitter=0, max_retries=2, maxlag=None))
+    wiki.failures.extend([(503, {})] * 3)
+
+    with pytest.raises(RequestError) as error:
+        client.page(1, profile='meta')
+    assert error.value.params['pageids'] == '1'
+    assert len(transport.requests) == 3
+    assert client.errors == 3
+
+
+
+class SlowTransport(FakeTransport):
+
+    # Record requests' timeouts, each request advancing the clock
+
+    def __init__(self, handler, clock, latency):
+        super().__init__(handler)
+        self.clock = clock
+        self.latency = latency
+        self.timeouts = []
+
+    def get(self, api_url, params, timeout=None):
+        self.timeouts.append(timeout)
+        self.clock[0] += self.latency
+        return super().get(api_url, params, timeout)
+
+
+class SlowRateLimiter:
+
+    def __init__(self, clock, wait):
+        self.clock = clock
+        self.wait = wait
+
+    def __enter__(self):
+        self.clock[0] += self.wait
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+def test_deadline(wiki, tmp_path, monkeypatch):
+    add_pages(wiki, 1)
+    clock = [0.]
+    monkeypatch.setattr(time, 'monotonic', lambda: clock[0])
+    monkeypatch.setattr(time, 'sleep', lambda seconds: clock.__setitem__(0, clock[0]+seconds))
+    transport = SlowTransport(wiki, clock, latency=4)
+    client = WikiClient(
+        'en', transport=transport, cache_dir=str(tmp_path / 'cache'),
+        policy=TransportPolicy(timeout=(10, 60), deadline=10, backoff=1, jitter=0, max_retries=10, maxlag=None),
+        rate_limiter=SlowRateLimiter(clock, wait=3),
+    )
+    wiki.failures.extend([(503, {})] * 3)
+
+    with pytest.raises(RequestError) as error:
+        client.page(1, profile='meta')
+    assert 'deadline exceeded after 1 attempts' in str(error.value)
+    # NOTE: Timeout is capped to time remaining until deadline, after waiting for rate limiter
+    assert transport.timeouts == [(7, 7)]
+    assert client.errors == 1
@@ -1,4 +1,9 @@
 __version__ = "0.0.1"
 
 from .client import WikiClient
+from .aio import AsyncWikiClient
+from .pool import WikiClientPool
+from .transport import TransportPolicy, RequestError
+from .ratelimit import TokenBucket, FileTokenBucket
+from .metrics import Metrics
 
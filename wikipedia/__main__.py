@@ -0,0 +1,307 @@
+import argparse
+import collections
+import concurrent.futures
+import itertools
+import json
+import logging
+import sys
+import time
+
+from .client import DEFAULT_FETCH_PROFILE, QUERY_PAGES_BATCH_SIZE
+
+from .page import get_page_data
+
+from .pool import WikiClientPool
+
+from .ratelimit import TokenBucket
+
+from .dump import iter_batches
+
+from .server import WikiProxy, DEFAULT_HOST, DEFAULT_PORT
+
+
+log = logging.getLogger('wikipedia.main')
+
+
+# Usage:
+#   python -m wikipedia fetch titles.txt > pages.jsonl
+#   python -m wikipedia category 'Category:Poland' --max-depth 2 > members.jsonl
+#   python -m wikipedia warm-cache --category 'Category:Poland' --resume poland
+#   python -m wikipedia serve --port 8080 --rate 10
+#   python -m wikipedia migrate-cache
+# NOTE: Interrupted fetch / warm-cache with --resume NAME continues after the last
+#       complete batch, interrupted category continues expanding categories left
+# NOTE: Interrupted category --load / warm-cache --category lists members again,
+#       and skips members already fetched in complete batches
+
+
+DEFAULT_LANG = 'en'
+DEFAULT_CACHE_DIR = 'cache'
+DEFAULT_WORKERS = 4
+
+# Seconds between progress reports
+PROGRESS_INTERVAL = 5.
+
+
+class Progress:
+
+    # Report number of items and throughput to stderr
+
+    def __init__(self, name, interval=PROGRESS_INTERVAL):
+        self.name = name
+        self.interval = interval
+        self.count = 0
+        self.started = time.monotonic()
+        self._reported = self.started
+
+    def report(self):
+        elapsed = time.monotonic() - self.started
+        print(
+            f'{self.name}: {self.count} pages in {elapsed:.1f}s, {self.count/(elapsed or 1):.1f} pages/s',
+            file=sys.stderr, flush=True,
+        )
+
+    def update(self, count):
+        self.count += count
+        now = time.monotonic()
+        if now - self._reported >= self.interval:
+            self._reported = now
+            self.report()
+
+
+def read_items(f):
+    # Titles, URLs or page ids, one per line
+    for line in f:
+        item = line.strip()
+        if item and not item.startswith('#'):
+            yield item
+
+
+def write_json(data):
+    sys.stdout.write(json.dumps(data, ensure_ascii=False) + '\n')
+
+
+def get_resume_key(command, resume):
+    return resume and f'cli:{command}:{resume}'
+
+
+def get_category_items(pool, args, done=None):
+    # NOTE: Crawl is not used, as members are stored as expanded before they are fetched
+    client = pool.client()
+    for depth, parent, page in client.category_tree(
+        args.category, args.max_depth, args.cmtype, args.workers,
+    ):
+        if not done or not page.page_id in done:
+            yield page.page_id
+
+
+def fetch_batches(pool, items, args):
+    # Fetch batches of pages concurrently, yield (batch of items, pages) in batches' order
+    # NOTE: Batches in flight are limited, so input can be streamed
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=args.workers,
+        thread_name_prefix='wikipedia',
+    )
+    max_pending = 2 * args.workers
+    pending = collections.deque()
+
+    def fetch(batch):
+        return list(pool.pages(batch, check_updates=args.check_updates, profile=args.profile))
+
+    with executor:
+        for batch in iter_batches(items, args.batch_size):
+            pending.append((batch, executor.submit(fetch, batch)))
+            if len(pending) >= max_pending:
+                batch, future = pending.popleft()
+                yield batch, future.result()
+        while pending:
+            batch, future = pending.popleft()
+            yield batch, future.result()
+
+
+def write_pages(pages):
+    for page in pages:
+        write_json(get_page_data(page))
+    sys.stdout.flush()
+
+
+def run_fetch(pool, items, args, output=True, resume_key=None):
+    cache = pool._cache
+    done = int(resume_key and cache.get_state(resume_key) or 0)
+    if done:
+        log.info('Resuming after: %s items', done)
+        items = itertools.islice(items, done, None)
+
+    progress = Progress(args.command)
+    for batch, pages in fetch_batches(pool, items, args):
+        if output:
+            write_pages(pages)
+        done += len(batch)
+        if resume_key:
+            cache.set_state(resume_key, str(done))
+        progress.update(len(pages))
+    progress.report()
+
+
+def run_category_fetch(pool, args, output=True, resume_key=None):
+    # Fetch category members, ids of members in complete batches are stored as resume state's items
+    # NOTE: Members are not listed in the same order on each run, so number of items can't be used
+    cache = pool._cache
+    done = set()
+    if resume_key:
+        done = {int(page_id) for page_id in cache.all_state_items(resume_key)}
+        if done:
+            log.info('Resuming after: %s items', len(done))
+
+    progress = Progress(args.command)
+    for batch, pages in fetch_batches(pool, get_category_items(pool, args, done), args):
+        if output:
+            write_pages(pages)
+        if resume_key:
+            # NOTE: Stored after batch was written, so it's fetched again if interrupted before
+            cache.insert_state_items(resume_key, batch)
+        progress.update(len(pages))
+    progress.report()
+
+
+def cmd_fetch(pool, args):
+    items = read_items(args.input)
+    run_fetch(pool, items, args, resume_key=get_resume_key(args.command, args.resume))
+
+
+def cmd_category(pool, args):
+    crawl = get_resume_key(args.command, args.resume)
+    if args.load:
+        run_category_fetch(pool, args, resume_key=crawl and f'{crawl}:load')
+        return
+
+    progress = Progress(args.command)
+    client = pool.client()
+    for depth, parent, page in client.category_tree(
+        args.category, args.max_depth, args.cmtype, args.workers, crawl,
+    ):
+        write_json({
+            'depth': depth,
+            'parent': parent and parent.page_id,
+            'pageid': page.page_id,
+            'ns': page.namespace_id,
+            'title': page.title,
+        })
+        progress.update(1)
+    sys.stdout.flush()
+    progress.report()
+
+
+def cmd_warm_cache(pool, args):
+    resume_key = get_resume_key(args.command, args.resume)
+    if args.category:
+        # NOTE: Category members are resumed by ids of members fetched, not by number of items
+        run_category_fetch(pool, args, output=False, resume_key=resume_key)
+    else:
+        run_fetch(pool, read_items(args.input), args, output=False, resume_key=resume_key)
+
+
+def cmd_serve(pool, args):
+    proxy = WikiProxy(pool, check_updates=args.check_updates)
+    proxy.serve(args.host, args.port)
+
+
+def cmd_migrate_cache(pool, args):
+    migrated = pool._cache.migrate_pages()
+    print(f'{args.command}: {migrated} pages converted', file=sys.stderr, flush=True)
+
+
+def add_fetch_arguments(parser):
+    parser.add_argument('--batch-size', type=int, default=QUERY_PAGES_BATCH_SIZE,
+                        help='pages fetched by worker at once')
+    parser.add_argument('--profile', default=DEFAULT_FETCH_PROFILE,
+                        help='fetch profile (meta, extract, content, full) or props: prop1|prop2')
+    parser.add_argument('--check-updates', action='store_true',
+                        help='check if cached pages were updated')
+
+
+def add_category_arguments(parser):
+    parser.add_argument('--max-depth', type=int, default=None)
+    parser.add_argument('--cmtype', default=None, help='members types: page|subcat|file')
+
+
+def get_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--lang', default=DEFAULT_LANG)
+    common.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    common.add_argument('--meta-db', default='sqlite', help='PageMetaDB backend: sqlite, dbm')
+    common.add_argument('--page-db', default='fs', help='PageDB backend: fs')
+    common.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    common.add_argument('--rate', type=float, default=None, help='max requests per second')
+    common.add_argument('--resume', metavar='NAME', default=None,
+                        help='store progress under given name, and resume from it')
+    common.add_argument('-v', '--verbose', action='store_true')
+
+    parser = argparse.ArgumentParser(prog='python -m wikipedia', description='Wikipedia bulk fetcher')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    fetch = commands.add_parser('fetch', parents=[common], help='fetch pages, output JSON lines')
+    fetch.add_argument('input', nargs='?', type=argparse.FileType('r'), default=sys.stdin,
+                       help='titles, URLs or page ids, one per line (default: stdin)')
+    add_fetch_arguments(fetch)
+    fetch.set_defaults(func=cmd_fetch)
+
+    category = commands.add_parser('category', parents=[common],
+                                   help='list category members recursively, output JSON lines')
+    category.add_argument('category')
+    category.add_argument('--load', action='store_true', help='output members pages')
+    add_category_arguments(category)
+    add_fetch_arguments(category)
+    category.set_defaults(func=cmd_category)
+
+    warm_cache = commands.add_parser('warm-cache', parents=[common], help='fetch pages into cache')
+    warm_cache.add_argument('input', nargs='?', type=argparse.FileType('r'), default=sys.stdin,
+                            help='titles, URLs or page ids, one per line (default: stdin)')
+    warm_cache.add_argument('--category', default=None, help='fetch category members recursively instead')
+    add_category_arguments(warm_cache)
+    add_fetch_arguments(warm_cache)
+    warm_cache.set_defaults(func=cmd_warm_cache)
+
+    serve = commands.add_parser('serve', parents=[common],
+                                help='run local caching proxy, compatible with MediaWiki API')
+    serve.add_argument('--host', default=DEFAULT_HOST)
+    serve.add_argument('--port', type=int, default=DEFAULT_PORT)
+    serve.add_argument('--check-updates', action='store_true',
+                       help='check if cached pages were updated')
+    serve.set_defaults(func=cmd_serve, profile=DEFAULT_FETCH_PROFILE)
+
+    migrate_cache = commands.add_parser('migrate-cache', parents=[common],
+                                        help='convert pages cached in legacy JSON format (formatversion=1)')
+    migrate_cache.set_defaults(func=cmd_migrate_cache, profile=DEFAULT_FETCH_PROFILE)
+
+    return parser
+
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        stream=sys.stderr,
+    )
+    pool = WikiClientPool(
+        args.lang,
+        workers=args.workers,
+        rate_limiter=args.rate and TokenBucket(args.rate),
+        profile=args.profile,
+        cache_dir=args.cache_dir,
+        meta_db=args.meta_db,
+        page_db=args.page_db,
+    )
+    with pool:
+        try:
+            args.func(pool, args)
+        except KeyboardInterrupt:
+            log.warning('Interrupted')
+            return 130
+        except BrokenPipeError:
+            # Output closed, like: python -m wikipedia fetch | head
+            return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
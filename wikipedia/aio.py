@@ -0,0 +1,233 @@
+import asyncio
+import concurrent.futures
+import functools
+import logging
+
+from .client import WikiClient, QUERY_PAGES_BATCH_SIZE, get_profile_props, get_props_params, get_query_pages
+
+from .page import WikiPage
+
+
+log = logging.getLogger('wikipedia.aio')
+
+
+DEFAULT_CONCURRENCY = 10
+
+
+class AsyncWikiClient:
+
+    # NOTE: Blocking calls (HTTP requests, cache lookups and inserts) are run by wrapped WikiClient
+    #       in a pool of worker threads, so they never block the event loop.
+    #       Number of workers limits number of requests in flight.
+
+    def __init__(self, lang, *, concurrency=DEFAULT_CONCURRENCY, load=False, check_updates=False, **kwargs):
+        self._client = WikiClient(
+            lang, load=load, check_updates=check_updates, **kwargs,
+        )
+        self._concurrency = concurrency
+        # Reuse up to one connection per worker
+        self._client._policy.mount(
+            self._client._session,
+            max(self._client._policy.pool_size, concurrency),
+        )
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=concurrency,
+            thread_name_prefix='wikipedia',
+        )
+
+    @property
+    def lang(self):
+        return self._client.lang
+
+    def set_lang(self, lang):
+        self._client.set_lang(lang)
+
+    @property
+    def metrics(self):
+        return self._client.metrics
+
+    @property
+    def retries(self):
+        return self._client.retries
+
+    @property
+    def errors(self):
+        return self._client.errors
+
+    @property
+    def _load_members(self):
+        return self._client._load_members
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            functools.partial(func, *args, **kwargs),
+        )
+
+    async def close(self):
+        await self._run(self._client._transport.close)
+        self._executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _decoded(self, query, *args, **kwargs):
+        results = query(*args, **kwargs)
+        # NOTE: Decode response in worker thread, not in the event loop
+        results.data
+        return results
+
+    async def _query(self, query, *args, **kwargs):
+        # Run query method of WikiClient, return decoded results
+        return await self._run(self._decoded, query, *args, **kwargs)
+
+    async def _request(self, params, api_url=None):
+        return await self._query(self._client._request, params, api_url)
+
+    async def _continued(self, results):
+        original_params = dict(results.params)
+        depth = 1
+        try:
+            yield results
+            while 'continue' in results.data:
+                params = dict(original_params)
+                params.update(results.data['continue'])
+                results = await self._request(
+                    params,
+                    results.api_url,
+                )
+                depth += 1
+                yield results
+        finally:
+            self.metrics.observe('continuation_depth', depth)
+
+    async def query_pages(self, **params):
+        return await self._query(self._client.query_pages, **params)
+
+    async def query_page_ids(self, params, *page_ids):
+        return await self._query(self._client.query_page_ids, params, *page_ids)
+
+    async def query_page_titles(self, params, *titles):
+        return await self._query(self._client.query_page_titles, params, *titles)
+
+    async def query_list_category_members(self, category, cmtype=None):
+        return await self._query(self._client.query_list_category_members, category, cmtype)
+
+    async def query_category_members(self, category, cmtype=None, params=None):
+        return await self._query(self._client.query_category_members, category, cmtype, params)
+
+    async def query_category_pages(self, category, params=None):
+        return await self._query(self._client.query_category_pages, category, params)
+
+    async def query_category_subcategories(self, category, params=None):
+        return await self._query(self._client.query_category_subcategories, category, params)
+
+    async def _pages_gen(self, pages_data, load=False, check_updates=None):
+        if load is None:
+            load = self._load_members
+        pages = [WikiPage(data, self.metrics) for data in pages_data]
+        if load:
+            # Load all pages from given batch concurrently, keeping their order
+            pages = await asyncio.gather(*[
+                self.page(page, check_updates=check_updates) for page in pages
+            ])
+        for page in pages:
+            yield page
+
+    async def _get_pages(self, results, load=None, check_updates=None):
+        async for results in self._continued(results):
+            if not 'query' in results.data:
+                # no members returned
+                continue
+            async for page in self._pages_gen(
+                get_query_pages(results.data),
+                load, check_updates,
+            ):
+                yield page
+
+    async def _get_categorymembers(self, results, load=None, check_updates=None):
+        async for results in self._continued(results):
+            if not 'query' in results.data:
+                # no members returned
+                continue
+            async for page in self._pages_gen(
+                results.data['query'].get('categorymembers', []),
+                load, check_updates,
+            ):
+                yield page
+
+    async def _get_loaded_pages(self, results):
+        # NOTE: Merging continued pages' data and cache inserts are done in worker threads
+        pages = self._client._get_loaded_pages(results)
+        done = object()
+        while True:
+            page = await self._run(next, pages, done)
+            if page is done:
+                break
+            yield page
+
+    async def _category_members(self, query, category, load=None, check_updates=None, profile=None):
+        category = category.page_id or category.title
+        if profile:
+            results = await query(category, params=get_props_params(get_profile_props(profile)))
+            pages = self._get_loaded_pages(results)
+        else:
+            results = await query(category)
+            pages = self._get_pages(results, load, check_updates)
+        async for page in pages:
+            yield page
+
+    async def category_members(self, category, load=None, check_updates=None, profile=None):
+        async for page in self._category_members(
+            self.query_category_members, category, load, check_updates, profile,
+        ):
+            yield page
+
+    async def category_pages(self, category, load=None, check_updates=None, profile=None):
+        async for page in self._category_members(
+            self.query_category_pages, category, load, check_updates, profile,
+        ):
+            yield page
+
+    async def category_subcategories(self, category, load=None, check_updates=None, profile=None):
+        async for page in self._category_members(
+            self.query_category_subcategories, category, load, check_updates, profile,
+        ):
+            yield page
+
+    async def page(self, page, check_updates=None, profile=None):
+        return await self._run(self._client.page, page, check_updates, profile)
+
+    async def pages(self, pages, check_updates=None, profile=None):
+        # Get batches of pages concurrently, yielding pages as batches are completed
+        # NOTE: Pages are not yielded in the same order as given
+        def get_pages(batch):
+            return list(self._client.pages(batch, check_updates, profile))
+
+        pending = set()
+        batch = []
+        for page in pages:
+            batch.append(page)
+            if len(batch) < QUERY_PAGES_BATCH_SIZE:
+                continue
+            pending.add(asyncio.ensure_future(self._run(get_pages, batch)))
+            batch = []
+            if len(pending) >= self._concurrency:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED,
+                )
+                for future in done:
+                    for page in future.result():
+                        yield page
+        if batch:
+            pending.add(asyncio.ensure_future(self._run(get_pages, batch)))
+        for future in asyncio.as_completed(pending):
+            for page in await future:
+                yield page
+
+    async def parse(self, page):
+        return await self._query(self._client.parse, page)
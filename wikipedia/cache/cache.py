@@ -1,9 +1,16 @@
 import logging
 import os.path
+import time
 
-from ..parser.core import is_page_id
+from ..parser.core import is_page_id, normalize_title
 
-from .db import PageDB, PageMetaDB
+from ..transport import get_request_key
+
+from ..metrics import NULL_METRICS
+
+from .db import PageDB, PageMetaDB, CrawlDB, ResponseDB, RevisionDB, StateDB, migrate_page_db
+
+from .revisions import RevisionStore
 
 
 log = logging.getLogger('wikipedia.cache.cache')
@@ -11,7 +18,10 @@ log = logging.getLogger('wikipedia.cache.cache')
 
 class WikiCache:
 
-    def __init__(self, *, meta_db='sqlite', page_db='fs', **kwargs):
+    def __init__(self, *, meta_db='sqlite', page_db='fs',
+                 crawl_db='sqlite', response_db='sqlite', state_db='sqlite', revision_db='sqlite',
+                 revision_policy=None, metrics=None, **kwargs):
+        self.metrics = metrics or NULL_METRICS
         meta_db_cls = PageMetaDB.get_backend(meta_db)
         self.meta_db = meta_db_cls(**kwargs)
         page_db_cls = PageDB.get_backend(page_db)
@@ -20,6 +30,16 @@ class WikiCache:
             self.page_db = self.meta_db
         else:
             self.page_db = page_db_cls(**kwargs)
+        crawl_db_cls = CrawlDB.get_backend(crawl_db)
+        self.crawl_db = crawl_db_cls and crawl_db_cls(**kwargs)
+        response_db_cls = ResponseDB.get_backend(response_db)
+        self.response_db = response_db_cls and response_db_cls(**kwargs)
+        state_db_cls = StateDB.get_backend(state_db)
+        self.state_db = state_db_cls and state_db_cls(**kwargs)
+        revision_db_cls = RevisionDB.get_backend(revision_db)
+        self.revision_db = revision_db_cls and revision_db_cls(**kwargs)
+        # NOTE: revision_policy = {'max_chain': 50, 'max_revisions': None, 'max_age': None, 'max_size': None}
+        self.revisions = self.revision_db and RevisionStore(self.revision_db, **(revision_policy or {}))
 
     def get_revision_id(self, lang, page_id):
         if not page_id:
@@ -33,14 +53,106 @@ class WikiCache:
     def get_page_id(self, lang, title):
         if is_page_id(title):
             return title
-        title = title.replace('_', ' ')
-        return self.meta_db.get_page_id(lang, title)
+        title = normalize_title(title)
+        page_id = self.meta_db.get_page_id(lang, title)
+        self.metrics.inc('cache_lookups', tier='meta', result='hit' if page_id else 'miss')
+        if not page_id:
+            # Redirect or title normalized by API
+            page_id = self.meta_db.get_alias_page_id(lang, title)
+            self.metrics.inc('cache_lookups', tier='alias', result='hit' if page_id else 'miss')
+        return page_id
 
     def get(self, lang, page_id, title):
         page_id = page_id or self.get_page_id(lang, title)
-        return self.page_db.get_page(lang, page_id)
+        page = self.page_db.get_page(lang, page_id)
+        if page is None:
+            self.metrics.inc('cache_lookups', tier='page', result='miss')
+            return
+        self.metrics.inc('cache_lookups', tier='page', result='hit')
+        page._metrics = self.metrics
+        return page
+
+    def get_props(self, lang, page_id):
+        # Return props page was cached with, [] if not known, None if page is not cached
+        # NOTE: Pages cached before props were stored with meta are read
+        props = self.meta_db.get_page_props(lang, page_id)
+        if props is None:
+            page = self.get(lang, page_id, None)
+            props = page and (page.props or [])
+        return props
+
+    def all_page_meta(self):
+        # yield (lang, page_id, revision_id, title)
+        return self.meta_db.all_page_meta()
+
+    def insert_crawl_members(self, crawl, members):
+        self.crawl_db.insert_crawl_members(crawl, members)
+
+    def all_crawl_members(self, crawl):
+        return self.crawl_db.all_crawl_members(crawl)
+
+    def get_state(self, key):
+        return self.state_db.get_state(key)
+
+    def set_state(self, key, value):
+        self.state_db.set_state(key, value)
+
+    def insert_state_items(self, key, items):
+        self.state_db.insert_state_items(key, items)
+
+    def all_state_items(self, key):
+        return self.state_db.all_state_items(key)
+
+    def get_response(self, api_url, params, ttl):
+        key = get_request_key(api_url, params)
+        cached = self.response_db.get_response(key)
+        if not cached:
+            self.metrics.inc('cache_lookups', tier='response', result='miss')
+            return
+        timestamp, data = cached
+        if timestamp + ttl < time.time():
+            # Cached response expired
+            self.metrics.inc('cache_lookups', tier='response', result='expired')
+            return
+        self.metrics.inc('cache_lookups', tier='response', result='hit')
+        return data
+
+    def insert_response(self, api_url, params, data):
+        key = get_request_key(api_url, params)
+        self.response_db.insert_response(key, time.time(), data)
+
+    def delete_aliases(self, lang, titles):
+        self.meta_db.delete_aliases(lang, [normalize_title(title) for title in titles])
+
+    def _insert_aliases(self, page):
+        aliases = {normalize_title(alias) for alias in page.aliases} - {page.title}
+        if aliases:
+            self.meta_db.insert_aliases(page.lang, [
+                (alias, page.page_id, page.revision_id) for alias in sorted(aliases)
+            ])
 
     def insert(self, page):
         self.page_db.insert_page(page)
         self.meta_db.insert_meta(page)
+        if page.props:
+            self.meta_db.insert_pages_props([(page.lang, page.page_id, page.props)])
+        self._insert_aliases(page)
+
+    def insert_pages(self, pages):
+        # NOTE: Pages' meta is inserted in bulk
+        for page in pages:
+            self.page_db.insert_page(page)
+        self.meta_db.insert_pages_meta([
+            (page.lang, page.page_id, page.revision_id, page.title)
+            for page in pages
+        ])
+        self.meta_db.insert_pages_props([
+            (page.lang, page.page_id, page.props)
+            for page in pages if page.props
+        ])
+        for page in pages:
+            self._insert_aliases(page)
 
+    def migrate_pages(self):
+        # One-off conversion of pages cached in legacy formatversion=1 shape
+        return migrate_page_db(self.meta_db, self.page_db)
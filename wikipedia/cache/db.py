@@ -1,6 +1,6 @@
 import logging
 
-from ..page import WikiPage
+from ..page import WikiPage, upgrade_page_data
 
 
 log = logging.getLogger('wikipedia.cache.db')
@@ -41,9 +41,26 @@ class PageMetaDB(DB):
             page.lang, page.page_id,  page.revision_id,page.title,
         )
 
+    def insert_pages_meta(self, pages_meta):
+        # pages_meta = [(lang, page_id, revision_id, title), ]
+        for lang, page_id, revision_id, title in pages_meta:
+            self.insert_page_meta(
+                lang, page_id, revision_id, title,
+            )
+
     def get_revision_id(self, lang: str, page_id: int) -> int:
         raise NotImplementedError()
 
+    def insert_pages_props(self, pages_props):
+        # pages_props = [(lang, page_id, props), ]
+        # NOTE: Props are stored with meta, so cached pages' data doesn't have to be read
+        #       to check which props it holds. Backends not storing props return None
+        pass
+
+    def get_page_props(self, lang: str, page_id: int):
+        # return [prop, ] or None if not known
+        return None
+
     def get_page_id(self, lang: str, title: str) -> int:
         raise NotImplementedError()
 
@@ -51,6 +68,94 @@ class PageMetaDB(DB):
         # yield (lang, page_id, revision_id, title)
         raise NotImplementedError()
 
+    def insert_aliases(self, lang: str, aliases):
+        # aliases = [(title, page_id, revision_id), ]
+        raise NotImplementedError()
+
+    def get_alias_page_id(self, lang: str, title: str) -> int:
+        raise NotImplementedError()
+
+    def delete_aliases(self, lang: str, titles):
+        raise NotImplementedError()
+
+    def insert_unresolved_aliases(self, aliases, attempt: int = 0):
+        # aliases = [(lang, title, target title), ] of redirects whose targets are not known yet
+        raise NotImplementedError()
+
+    def get_unresolved_aliases(self, attempt: int, limit: int):
+        # return up to limit [(lang, title, target title), ] last attempted before given attempt
+        raise NotImplementedError()
+
+    def delete_unresolved_aliases(self, aliases):
+        # aliases = [(lang, title), ]
+        raise NotImplementedError()
+
+
+class CrawlDB(DB):
+
+    def insert_crawl_members(self, crawl: str, members):
+        # members = [(page_id, depth, parent_id, title, ns, expanded), ]
+        raise NotImplementedError()
+
+    def all_crawl_members(self, crawl: str):
+        # yield (page_id, depth, parent_id, title, ns, expanded)
+        raise NotImplementedError()
+
+
+class ResponseDB(DB):
+
+    def insert_response(self, key: str, timestamp: float, data: dict):
+        raise NotImplementedError()
+
+    def get_response(self, key: str):
+        # return (timestamp, data)
+        raise NotImplementedError()
+
+
+class RevisionDB(DB):
+
+    def insert_revisions(self, lang: str, page_id: int, revisions):
+        # revisions = [(revision_id, timestamp, base_id, data, meta), ]
+        # NOTE: data is full text if base_id is 0, delta against base revision otherwise
+        # NOTE: Revisions with the same revision_id are replaced
+        raise NotImplementedError()
+
+    def get_revision(self, lang: str, page_id: int, revision_id: int):
+        # return (timestamp, base_id, data, meta)
+        raise NotImplementedError()
+
+    def get_revision_ids(self, lang: str, page_id: int):
+        # return [(revision_id, timestamp, base_id, size), ] oldest first
+        raise NotImplementedError()
+
+    def delete_revisions(self, lang: str, page_id: int, revision_ids):
+        raise NotImplementedError()
+
+    def all_revision_pages(self):
+        # yield (lang, page_id)
+        raise NotImplementedError()
+
+    def compact(self):
+        # Reclaim space of deleted revisions
+        pass
+
+
+class StateDB(DB):
+
+    def set_state(self, key: str, value: str):
+        raise NotImplementedError()
+
+    def get_state(self, key: str) -> str:
+        raise NotImplementedError()
+
+    def insert_state_items(self, key: str, items):
+        # Set of items stored under key, like ids of items already processed
+        raise NotImplementedError()
+
+    def all_state_items(self, key: str):
+        # yield item
+        raise NotImplementedError()
+
 
 def copy_page_meta_db(source_db, destination_db):
     for lang, page_id, revision_id, title in source_db.all_page_meta():
@@ -58,3 +163,23 @@ def copy_page_meta_db(source_db, destination_db):
             lang, page_id, revision_id, title,
         )
 
+
+def migrate_page_db(page_meta_db, page_db):
+    # Convert pages cached in legacy formatversion=1 shape to formatversion=2, return number of pages converted
+    # NOTE: Only the latest revision of each page is stored in PageDB
+    migrated = 0
+    seen = set()
+    for lang, page_id, revision_id, title in page_meta_db.all_page_meta():
+        if (lang, page_id) in seen:
+            continue
+        seen.add((lang, page_id))
+        page = page_db.get_page(lang, page_id)
+        if page is None:
+            continue
+        data = upgrade_page_data(page._data)
+        if data != page._data:
+            page_db.insert_page(WikiPage(data))
+            migrated += 1
+    log.info('Migrated pages: %s', migrated)
+    return migrated
+
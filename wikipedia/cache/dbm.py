@@ -2,6 +2,7 @@ import dbm
 import logging
 import os
 import os.path
+import threading
 
 from .db import PageMetaDB
 
@@ -17,32 +18,91 @@ class DbmPageMetaDB(PageMetaDB):
 
     def __init__(self, *, cache_dir, fn=None, **kwargs):
         self.fn = os.path.join(cache_dir, fn or CACHE_FN)
+        # NOTE: dbm file can't be opened for writing by multiple threads at once
+        self._lock = threading.Lock()
 
     def get_ro_db(self):
         return dbm.open(self.fn, 'r')
 
     def insert_page_meta(self, lang, page_id, revision_id, title):
-        with dbm.open(self.fn, 'c') as db:
+        with self._lock, dbm.open(self.fn, 'c') as db:
             db[f'title:{lang}:{title}'] = str(page_id)
             db[f'revid:{lang}:{page_id}'] = str(revision_id)
 
     def get_revision_id(self, lang, page_id):
-        with dbm.open(self.fn, 'c') as db:
+        with self._lock, dbm.open(self.fn, 'c') as db:
             revision_id = db.get(f'revid:{lang}:{page_id}')
             if revision_id:
                 return int(revision_id)
 
+    def insert_pages_props(self, pages_props):
+        with self._lock, dbm.open(self.fn, 'c') as db:
+            for lang, page_id, props in pages_props:
+                db[f'props:{lang}:{page_id}'] = '|'.join(props)
+
+    def get_page_props(self, lang, page_id):
+        with self._lock, dbm.open(self.fn, 'c') as db:
+            props = db.get(f'props:{lang}:{page_id}')
+            if props:
+                return props.decode().split('|')
+
     def get_page_id(self, lang, title):
-        with dbm.open(self.fn, 'c') as db:
+        with self._lock, dbm.open(self.fn, 'c') as db:
             page_id = db.get(f'title:{lang}:{title}')
             if page_id:
                 return page_id.decode()
 
+    def insert_aliases(self, lang, aliases):
+        with self._lock, dbm.open(self.fn, 'c') as db:
+            for title, page_id, revision_id in aliases:
+                db[f'alias:{lang}:{title}'] = str(page_id)
+
+    def get_alias_page_id(self, lang, title):
+        with self._lock, dbm.open(self.fn, 'c') as db:
+            page_id = db.get(f'alias:{lang}:{title}')
+            if page_id:
+                return page_id.decode()
+
+    def delete_aliases(self, lang, titles):
+        with self._lock, dbm.open(self.fn, 'c') as db:
+            for title in titles:
+                key = f'alias:{lang}:{title}'
+                if key in db:
+                    del db[key]
+
+    def insert_unresolved_aliases(self, aliases, attempt=0):
+        with self._lock, dbm.open(self.fn, 'c') as db:
+            for lang, title, target in aliases:
+                db[f'unresolved:{lang}:{title}'] = f'{attempt}:{target}'
+
+    def get_unresolved_aliases(self, attempt, limit):
+        # NOTE: All keys are scanned on each call
+        aliases = []
+        with self._lock, dbm.open(self.fn, 'c') as db:
+            for key in db.keys():
+                if not key.startswith(b'unresolved:'):
+                    continue
+                last_attempt, target = db.get(key).decode().split(':', 1)
+                if int(last_attempt) >= attempt:
+                    continue
+                _, lang, title = key.decode().split(':', 2)
+                aliases.append((lang, title, target))
+                if len(aliases) >= limit:
+                    break
+        return aliases
+
+    def delete_unresolved_aliases(self, aliases):
+        with self._lock, dbm.open(self.fn, 'c') as db:
+            for lang, title in aliases:
+                key = f'unresolved:{lang}:{title}'
+                if key in db:
+                    del db[key]
+
     def all_page_meta(self):
         titles = {}
         revision_ids = {}
 
-        with dbm.open(self.fn, 'c') as db:
+        with self._lock, dbm.open(self.fn, 'c') as db:
             for key in db.keys():
                 if key.startswith(b'title'):
                     _, lang, title = key.split(b':', 2)
@@ -5,12 +5,15 @@ import json
 
 from ..page import WikiPage
 
-from .db import PageDB
+from .db import PageDB, ResponseDB, StateDB
 
 
 log = logging.getLogger('wikipedia.cache.fs')
 
 
+STATE_FN = 'state.json'
+
+
 @PageDB.register('fs')
 class FilePageDB(PageDB):
 
@@ -40,3 +43,53 @@ class FilePageDB(PageDB):
             with open(page_fn, 'r') as f:
                 return WikiPage(json.load(f))
 
+
+
+@ResponseDB.register('fs')
+class FileResponseDB(ResponseDB):
+
+    def __init__(self, *, cache_dir, **kwargs):
+        self.cache_dir = os.path.join(cache_dir, 'responses')
+
+    def get_response_fn(self, key):
+        response_fn = os.path.join(
+            self.cache_dir,
+            f'{key}.json',
+        )
+        return response_fn
+
+    def insert_response(self, key, timestamp, data):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        response_fn = self.get_response_fn(key)
+        with open(response_fn, 'w') as f:
+            json.dump(data, f)
+        os.utime(response_fn, (timestamp, timestamp))
+
+    def get_response(self, key):
+        response_fn = self.get_response_fn(key)
+        if os.path.exists(response_fn):
+            with open(response_fn, 'r') as f:
+                return os.path.getmtime(response_fn), json.load(f)
+
+
+@StateDB.register('fs')
+class FileStateDB(StateDB):
+
+    def __init__(self, *, cache_dir, **kwargs):
+        self.fn = os.path.join(cache_dir, STATE_FN)
+
+    def _load(self):
+        if os.path.exists(self.fn):
+            with open(self.fn, 'r') as f:
+                return json.load(f)
+        return {}
+
+    def set_state(self, key, value):
+        state = self._load()
+        state[key] = value
+        os.makedirs(os.path.dirname(self.fn), exist_ok=True)
+        with open(self.fn, 'w') as f:
+            json.dump(state, f, indent=2)
+
+    def get_state(self, key):
+        return self._load().get(key)
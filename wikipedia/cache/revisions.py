@@ -0,0 +1,320 @@
+import collections
+import difflib
+import heapq
+import json
+import logging
+import threading
+import time
+import zlib
+
+from ..page import WikiRevision
+
+
+log = logging.getLogger('wikipedia.cache.revisions')
+
+
+# Delta-compressed revisions store, usage:
+#   store = RevisionStore(revision_db, max_revisions=1000, max_size=10*2**30)
+#   store.insert(lang, page_id, client.revisions(page_id))
+#   for revision in store.revisions(lang, page_id):
+#       ...
+# NOTE: Newest revision of each page is stored as full text, older revisions as deltas
+#       against the next newer revision, compressed with zlib
+# NOTE: After max_chain deltas full text is stored again, so getting any revision needs
+#       at most max_chain deltas applied
+
+
+DEFAULT_MAX_CHAIN = 50
+
+COMPRESS_LEVEL = 6
+
+# Revisions written to RevisionDB at once
+INSERT_BATCH_SIZE = 100
+
+# Part of max_size inserted after which store is compacted
+COMPACT_THRESHOLD = .1
+
+# Revision's data not stored in meta
+CONTENT_KEYS = {
+    'slots',
+    'content',
+    '*',
+}
+
+
+def get_delta(base, text):
+    # Return delta of lines to get text from base: [[start, end] of base lines to copy, or text to insert, ]
+    base_lines = base.splitlines(keepends=True)
+    lines = text.splitlines(keepends=True)
+    delta = []
+    matcher = difflib.SequenceMatcher(None, base_lines, lines)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            delta.append([i1, i2])
+        elif j2 > j1:
+            delta.append(''.join(lines[j1:j2]))
+    return delta
+
+
+def apply_delta(base, delta):
+    base_lines = base.splitlines(keepends=True)
+    return ''.join(
+        ''.join(base_lines[op[0]:op[1]]) if isinstance(op, list) else op
+        for op in delta
+    )
+
+
+def encode_text(text):
+    return zlib.compress(text.encode(), COMPRESS_LEVEL)
+
+
+def decode_text(data):
+    return zlib.decompress(data).decode()
+
+
+def encode_delta(delta):
+    return zlib.compress(json.dumps(delta, ensure_ascii=False).encode(), COMPRESS_LEVEL)
+
+
+def decode_delta(data):
+    return json.loads(zlib.decompress(data))
+
+
+def get_revision_entry(revision):
+    # Return (revision_id, timestamp, meta, text) of WikiRevision
+    meta = {
+        key: value for key, value in revision._data.items()
+        if not key in CONTENT_KEYS
+    }
+    timestamp = revision.timestamp
+    return (
+        revision.revision_id, timestamp.timestamp() if timestamp else time.time(), meta, revision.content,
+    )
+
+
+def get_chain_lengths(stored):
+    # Return {revision_id: number of deltas to apply}
+    # NOTE: stored = [(revision_id, timestamp, base_id, size), ] oldest first, base is always newer revision
+    chains = {}
+    for revision_id, timestamp, base_id, size in reversed(stored):
+        chains[revision_id] = base_id and chains.get(base_id, 0) + 1
+    return chains
+
+
+class RevisionStore:
+
+    def __init__(self, db, max_chain=DEFAULT_MAX_CHAIN, max_revisions=None, max_age=None, max_size=None):
+        self.db = db
+        self.max_chain = max_chain
+        # Retention: max number of page's revisions, and max age (in seconds) of revisions
+        # NOTE: Newest revision of page is always kept
+        self.max_revisions = max_revisions
+        self.max_age = max_age
+        # Max total size (in bytes) of stored data, oldest revisions of all pages are removed on compact()
+        self.max_size = max_size
+        self._inserted_size = 0
+        self._lock = threading.Lock()
+
+    def _get_base(self, newer, run):
+        # Return (base_id, run), base_id is 0 for full text if there's no newer revision or chain is too long
+        # NOTE: run is number of deltas between revision and the next full text
+        if newer is None or run >= self.max_chain:
+            return 0, 0
+        return newer[0], run+1
+
+    def _encode(self, entry, base_id, newer):
+        revision_id, timestamp, meta, text = entry
+        if base_id:
+            data = encode_delta(get_delta(newer[3], text))
+        else:
+            data = encode_text(text)
+        return revision_id, timestamp, base_id, data, meta
+
+    def _write(self, lang, page_id, rows):
+        # NOTE: Rows are written in one transaction, with bases of deltas in the same batch or already written
+        if not rows:
+            return
+        self.db.insert_revisions(lang, page_id, rows)
+        with self._lock:
+            self._inserted_size += sum(len(row[3]) for row in rows)
+
+    def _decode(self, lang, page_id, base_id, data, newer=None):
+        # Return text of revision, newer = (revision_id, text) of already decoded revision
+        if not base_id:
+            return decode_text(data)
+        if newer and newer[0] == base_id:
+            base = newer[1]
+        else:
+            base = self.get_text(lang, page_id, base_id)
+        return apply_delta(base, decode_delta(data))
+
+    def _entries(self, lang, page_id, stored=None):
+        # Yield (revision_id, timestamp, meta, text) of stored revisions, newest first
+        stored = stored or self.db.get_revision_ids(lang, page_id)
+        newer = None
+        for revision_id, *_ in reversed(stored):
+            timestamp, base_id, data, meta = self.db.get_revision(lang, page_id, revision_id)
+            text = self._decode(lang, page_id, base_id, data, newer)
+            newer = (revision_id, text)
+            yield revision_id, timestamp, meta, text
+
+    def get_text(self, lang, page_id, revision_id):
+        chain = []
+        while True:
+            row = self.db.get_revision(lang, page_id, revision_id)
+            if row is None:
+                return
+            timestamp, base_id, data, meta = row
+            chain.append(data)
+            if not base_id:
+                break
+            revision_id = base_id
+        text = decode_text(chain.pop())
+        for data in reversed(chain):
+            text = apply_delta(text, decode_delta(data))
+        return text
+
+    def get(self, lang, page_id, revision_id):
+        row = self.db.get_revision(lang, page_id, revision_id)
+        if row is None:
+            return
+        timestamp, base_id, data, meta = row
+        text = self._decode(lang, page_id, base_id, data)
+        return WikiRevision(dict(meta, slots={'main': {'content': text}}), page_id)
+
+    def revisions(self, lang, page_id):
+        # Yield stored revisions (WikiRevision), newest first
+        for revision_id, timestamp, meta, text in self._entries(lang, page_id):
+            yield WikiRevision(dict(meta, slots={'main': {'content': text}}), page_id)
+
+    def newest_revision_id(self, lang, page_id):
+        stored = self.db.get_revision_ids(lang, page_id)
+        if stored:
+            return stored[-1][0]
+
+    def insert(self, lang, page_id, revisions):
+        # Insert page's revisions (WikiRevision with content), return number of inserted revisions
+        # NOTE: Revisions newer than stored ones are appended as they come, oldest first (as
+        #       returned by WikiClient.revisions()), older revisions are merged after all
+        # NOTE: Revisions of the same page shouldn't be inserted concurrently
+        stored = self.db.get_revision_ids(lang, page_id)
+        revision_ids = {revision_id for revision_id, *_ in stored}
+        newer = None
+        run = 0
+        if stored:
+            newer = next(self._entries(lang, page_id, stored[-1:]))
+            for revision_id, timestamp, base_id, size in reversed(stored[:-1]):
+                if not base_id:
+                    break
+                run += 1
+
+        rows = []
+        older = []
+        inserted = 0
+        for revision in revisions:
+            if revision.content is None or revision.revision_id in revision_ids:
+                # NOTE: Content of deleted revisions might be hidden
+                continue
+            revision_ids.add(revision.revision_id)
+            entry = get_revision_entry(revision)
+            if newer and entry[0] < newer[0]:
+                older.append(entry)
+                continue
+            if newer:
+                base_id, run = self._get_base(entry, run)
+                rows.append(self._encode(newer, base_id, entry))
+            newer = entry
+            inserted += 1
+            if len(rows) >= INSERT_BATCH_SIZE:
+                # NOTE: Newest revision is written as full text, it's replaced in next batch
+                self._write(lang, page_id, rows + [self._encode(newer, 0, None)])
+                rows = []
+        if inserted:
+            self._write(lang, page_id, rows + [self._encode(newer, 0, None)])
+
+        if older:
+            self._merge(lang, page_id, older)
+            inserted += len(older)
+        if inserted:
+            self._apply_retention(lang, page_id)
+            if self.max_size and self._inserted_size >= self.max_size*COMPACT_THRESHOLD:
+                self.compact()
+        return inserted
+
+    def _merge(self, lang, page_id, entries):
+        # Re-encode page's stored revisions, with given revisions merged in
+        # NOTE: Stored revisions that would be encoded the same way are not written again
+        stored = self.db.get_revision_ids(lang, page_id)
+        bases = {revision_id: base_id for revision_id, timestamp, base_id, size in stored}
+        entries = sorted(entries, key=lambda entry: entry[0], reverse=True)
+        merged = heapq.merge(self._entries(lang, page_id, stored), entries, key=lambda entry: entry[0], reverse=True)
+        rows = []
+        newer = None
+        run = 0
+        for entry in merged:
+            base_id, run = self._get_base(newer, run)
+            if bases.get(entry[0]) != base_id:
+                rows.append(self._encode(entry, base_id, newer))
+            newer = entry
+            if len(rows) >= INSERT_BATCH_SIZE:
+                self._write(lang, page_id, rows)
+                rows = []
+        self._write(lang, page_id, rows)
+
+    def _apply_retention(self, lang, page_id, stored=None):
+        # Delete page's oldest revisions, return page's revisions left
+        stored = stored or self.db.get_revision_ids(lang, page_id)
+        expired = 0
+        if self.max_revisions:
+            expired = max(len(stored) - self.max_revisions, 0)
+        if self.max_age:
+            cutoff = time.time() - self.max_age
+            for i, (revision_id, timestamp, base_id, size) in enumerate(stored):
+                if timestamp >= cutoff:
+                    break
+                expired = max(expired, i+1)
+        # NOTE: Deltas' bases are always newer, so oldest revisions can be deleted
+        expired = min(expired, len(stored)-1)
+        if expired > 0:
+            self.db.delete_revisions(lang, page_id, [revision_id for revision_id, *_ in stored[:expired]])
+            stored = stored[expired:]
+        return stored
+
+    def compact(self):
+        # Apply retention policy to all pages, re-encode pages with too long delta chains,
+        # delete oldest revisions of all pages until store fits max_size, return stored size
+        with self._lock:
+            self._inserted_size = 0
+        pages = {}
+        for lang, page_id in list(self.db.all_revision_pages()):
+            stored = self._apply_retention(lang, page_id)
+            if max(get_chain_lengths(stored).values(), default=0) > self.max_chain:
+                self._merge(lang, page_id, [])
+                stored = self.db.get_revision_ids(lang, page_id)
+            pages[(lang, page_id)] = collections.deque(stored)
+
+        size = sum(row[3] for stored in pages.values() for row in stored)
+        if self.max_size and size > self.max_size:
+            oldest = [
+                (stored[0][1], lang, page_id) for (lang, page_id), stored in pages.items()
+                if len(stored) > 1
+            ]
+            heapq.heapify(oldest)
+            expired = {}
+            while oldest and size > self.max_size:
+                timestamp, lang, page_id = heapq.heappop(oldest)
+                stored = pages[(lang, page_id)]
+                revision_id, timestamp, base_id, revision_size = stored.popleft()
+                expired.setdefault((lang, page_id), []).append(revision_id)
+                size -= revision_size
+                if len(stored) > 1:
+                    heapq.heappush(oldest, (stored[0][1], lang, page_id))
+            for (lang, page_id), revision_ids in expired.items():
+                self.db.delete_revisions(lang, page_id, revision_ids)
+            if size > self.max_size:
+                log.warning('Revisions size: %s over max size: %s, with only newest revisions left', size, self.max_size)
+
+        self.db.compact()
+        log.info('Revisions compacted, size: %s', size)
+        return size
+
@@ -1,17 +1,21 @@
+import json
 import logging
 import sqlite3
+import threading
 import os
 import os.path
 
 import sql
 
-from .db import PageMetaDB
+from .db import PageMetaDB, CrawlDB, ResponseDB, RevisionDB, StateDB
 
 
 log = logging.getLogger('wikipedia.cache.sqlite')
 
 
 CACHE_FN = 'pages.sqlite'
+# NOTE: Revisions are stored in separate file, so it can be vacuumed without locking pages' meta
+REVISIONS_FN = 'revisions.sqlite'
 
 
 PAGE_META = sql.Columns(
@@ -28,34 +32,159 @@ PAGE_META_TABLE = sql.Table(
     PAGE_META.lang, PAGE_META.page_id, PAGE_META.revision_id,
 )
 
-INDEXES = [
+PAGE_META_INDEXES = [
     PAGE_META_TABLE.index('PageMeta_page_id_index', PAGE_META.lang, PAGE_META.page_id),
     PAGE_META_TABLE.index('PageMeta_title_index', PAGE_META.lang, PAGE_META.title),
 ]
 
 
+# Props pages' data was fetched with
+PAGE_PROPS = sql.Columns(
+    'lang TEXT NOT NULL',
+    'page_id INTEGER NOT NULL',
+    'props TEXT NOT NULL',
+)
+
+PAGE_PROPS_TABLE = sql.Table(
+    name='PageProps',
+    columns=PAGE_PROPS,
+).primary_key(
+    PAGE_PROPS.lang, PAGE_PROPS.page_id,
+)
+
+
+# Redirects' and not normalized titles, with revision of page they were resolved to
+ALIAS = sql.Columns(
+    'lang TEXT NOT NULL',
+    'title TEXT NOT NULL',
+    'page_id INTEGER NOT NULL',
+    'revision_id INTEGER NOT NULL',
+)
+
+ALIAS_TABLE = sql.Table(
+    name='Alias',
+    columns=ALIAS,
+).primary_key(
+    ALIAS.lang, ALIAS.title,
+)
+
+
+# Redirects to targets not known yet, while ingesting dump
+UNRESOLVED_ALIAS = sql.Columns(
+    'lang TEXT NOT NULL',
+    'title TEXT NOT NULL',
+    'target TEXT NOT NULL',
+    'attempt INTEGER NOT NULL',
+)
+
+UNRESOLVED_ALIAS_TABLE = sql.Table(
+    name='UnresolvedAlias',
+    columns=UNRESOLVED_ALIAS,
+).primary_key(
+    UNRESOLVED_ALIAS.lang, UNRESOLVED_ALIAS.title,
+)
+
+
+CRAWL_MEMBER = sql.Columns(
+    'crawl TEXT NOT NULL',
+    'page_id INTEGER NOT NULL',
+    'depth INTEGER NOT NULL',
+    'parent_id INTEGER',
+    'title TEXT NOT NULL',
+    'ns INTEGER NOT NULL',
+    'expanded INTEGER NOT NULL',
+)
+
+CRAWL_MEMBER_TABLE = sql.Table(
+    name='CrawlMember',
+    columns=CRAWL_MEMBER,
+).primary_key(
+    CRAWL_MEMBER.crawl, CRAWL_MEMBER.page_id,
+)
+
+RESPONSE = sql.Columns(
+    'key TEXT NOT NULL',
+    'timestamp REAL NOT NULL',
+    'data TEXT NOT NULL',
+)
+
+RESPONSE_TABLE = sql.Table(
+    name='Response',
+    columns=RESPONSE,
+).primary_key(
+    RESPONSE.key,
+)
+
+# Revisions' full text (base_id = 0), or delta against base revision (see: cache.revisions)
+REVISION = sql.Columns(
+    'lang TEXT NOT NULL',
+    'page_id INTEGER NOT NULL',
+    'revision_id INTEGER NOT NULL',
+    'timestamp REAL NOT NULL',
+    'base_id INTEGER NOT NULL',
+    'size INTEGER NOT NULL',
+    'data BLOB NOT NULL',
+    'meta TEXT NOT NULL',
+)
+
+REVISION_TABLE = sql.Table(
+    name='Revision',
+    columns=REVISION,
+).primary_key(
+    REVISION.lang, REVISION.page_id, REVISION.revision_id,
+)
+
+STATE = sql.Columns(
+    'key TEXT NOT NULL',
+    'value TEXT NOT NULL',
+)
+
+STATE_TABLE = sql.Table(
+    name='State',
+    columns=STATE,
+).primary_key(
+    STATE.key,
+)
+
+
+STATE_ITEM = sql.Columns(
+    'key TEXT NOT NULL',
+    'item TEXT NOT NULL',
+)
+
+STATE_ITEM_TABLE = sql.Table(
+    name='StateItem',
+    columns=STATE_ITEM,
+).primary_key(
+    STATE_ITEM.key, STATE_ITEM.item,
+)
+
+
 Param = sql.QmarkParameter
 
 
-@PageMetaDB.register('sqlite')
-class SQLitePageMetaDB(PageMetaDB):
+class SQLiteDB:
+
+    TABLES = []
+    INDEXES = []
 
     def __init__(self, *, cache_dir, fn=None, **kwargs):
         self.fn = os.path.join(cache_dir, fn or CACHE_FN)
-        self._connection = None
+        # NOTE: sqlite3 connections can't be shared between threads
+        self._local = threading.local()
 
     @property
     def connection(self):
-        if self._connection is None:
+        if getattr(self._local, 'connection', None) is None:
             os.makedirs(
                 os.path.dirname(self.fn),
                 exist_ok=True,
             )
-            self._connection = sqlite3.connect(self.fn)
-            self._connection.row_factory = sqlite3.Row
+            self._local.connection = sqlite3.connect(self.fn)
+            self._local.connection.row_factory = sqlite3.Row
             self._create_tables()
             self._create_indexes()
-        return self._connection
+        return self._local.connection
 
     def execute_query(self, query, *params):
         return self.connection.execute(
@@ -64,15 +193,28 @@ class SQLitePageMetaDB(PageMetaDB):
         )
 
     def _create_tables(self):
-        query = PAGE_META_TABLE.create(if_not_exists=True)
-        self.execute_query(query)
+        for table in self.TABLES:
+            query = table.create(if_not_exists=True)
+            self.execute_query(query)
 
     def _create_indexes(self):
-        for index in INDEXES:
+        for index in self.INDEXES:
             query = index.create(if_not_exists=True)
             self.execute_query(query)
 
-    def insert_page_meta(self, lang, page_id, revision_id, title):
+
+@PageMetaDB.register('sqlite')
+class SQLitePageMetaDB(SQLiteDB, PageMetaDB):
+
+    TABLES = [
+        PAGE_META_TABLE,
+        PAGE_PROPS_TABLE,
+        ALIAS_TABLE,
+        UNRESOLVED_ALIAS_TABLE,
+    ]
+    INDEXES = PAGE_META_INDEXES
+
+    def _insert_page_meta_query(self):
         param = Param()
         query = PAGE_META_TABLE.insert({
             PAGE_META.lang: param('lang'),
@@ -82,12 +224,26 @@ class SQLitePageMetaDB(PageMetaDB):
         },
             replace=True,
         )
+        return query
+
+    def insert_page_meta(self, lang, page_id, revision_id, title):
+        query = self._insert_page_meta_query()
         self.execute_query(
             query,
             lang, page_id, title, revision_id,
         )
         self.connection.commit()
 
+    def insert_pages_meta(self, pages_meta):
+        # NOTE: All rows are inserted in one transaction
+        query = self._insert_page_meta_query()
+        for lang, page_id, revision_id, title in pages_meta:
+            self.execute_query(
+                query,
+                lang, page_id, title, revision_id,
+            )
+        self.connection.commit()
+
     def get_revision_id(self, lang, page_id):
         param = Param()
         query = PAGE_META_TABLE.select(
@@ -105,6 +261,37 @@ class SQLitePageMetaDB(PageMetaDB):
         for row in results:
             return row['revision_id']
 
+    def insert_pages_props(self, pages_props):
+        param = Param()
+        query = PAGE_PROPS_TABLE.insert({
+            PAGE_PROPS.lang: param('lang'),
+            PAGE_PROPS.page_id: param('page_id'),
+            PAGE_PROPS.props: param('props'),
+        },
+            replace=True,
+        )
+        for lang, page_id, props in pages_props:
+            self.execute_query(
+                query,
+                lang, page_id, '|'.join(props),
+            )
+        self.connection.commit()
+
+    def get_page_props(self, lang, page_id):
+        param = Param()
+        query = PAGE_PROPS_TABLE.select(
+            PAGE_PROPS.props,
+        ).where(
+            PAGE_PROPS.lang == param('lang'),
+            PAGE_PROPS.page_id == param('page_id'),
+        )
+        results = self.execute_query(
+            query,
+            lang, page_id,
+        )
+        for row in results:
+            return row['props'].split('|')
+
     def get_page_id(self, lang, title):
         param = Param()
         query = PAGE_META_TABLE.select(
@@ -130,3 +317,340 @@ class SQLitePageMetaDB(PageMetaDB):
                 row['lang'], row['page_id'], row['revision_id'], row['title'],
             )
 
+    def insert_aliases(self, lang, aliases):
+        param = Param()
+        query = ALIAS_TABLE.insert({
+            ALIAS.lang: param('lang'),
+            ALIAS.title: param('title'),
+            ALIAS.page_id: param('page_id'),
+            ALIAS.revision_id: param('revision_id'),
+        },
+            replace=True,
+        )
+        for title, page_id, revision_id in aliases:
+            self.execute_query(
+                query,
+                lang, title, page_id, revision_id,
+            )
+        self.connection.commit()
+
+    def get_alias_page_id(self, lang, title):
+        param = Param()
+        query = ALIAS_TABLE.select(
+            ALIAS.page_id,
+        ).where(
+            ALIAS.lang == param('lang'),
+            ALIAS.title == param('title'),
+        )
+        results = self.execute_query(
+            query,
+            lang, title,
+        )
+        for row in results:
+            return row['page_id']
+
+    def delete_aliases(self, lang, titles):
+        param = Param()
+        query = ALIAS_TABLE.delete().where(
+            ALIAS.lang == param('lang'),
+            ALIAS.title == param('title'),
+        )
+        for title in titles:
+            self.execute_query(
+                query,
+                lang, title,
+            )
+        self.connection.commit()
+
+
+    def insert_unresolved_aliases(self, aliases, attempt=0):
+        param = Param()
+        query = UNRESOLVED_ALIAS_TABLE.insert({
+            UNRESOLVED_ALIAS.lang: param('lang'),
+            UNRESOLVED_ALIAS.title: param('title'),
+            UNRESOLVED_ALIAS.target: param('target'),
+            UNRESOLVED_ALIAS.attempt: param('attempt'),
+        },
+            replace=True,
+        )
+        for lang, title, target in aliases:
+            self.execute_query(
+                query,
+                lang, title, target, attempt,
+            )
+        self.connection.commit()
+
+    def get_unresolved_aliases(self, attempt, limit):
+        param = Param()
+        query = UNRESOLVED_ALIAS_TABLE.select(
+            UNRESOLVED_ALIAS.lang, UNRESOLVED_ALIAS.title, UNRESOLVED_ALIAS.target,
+        ).where(
+            UNRESOLVED_ALIAS.attempt < param('attempt'),
+        )
+        results = self.execute_query(
+            query,
+            attempt,
+        )
+        # NOTE: Rows are fetched before cursor is closed, so table can be modified by caller
+        rows = results.fetchmany(limit)
+        results.close()
+        return [
+            (row['lang'], row['title'], row['target']) for row in rows
+        ]
+
+    def delete_unresolved_aliases(self, aliases):
+        param = Param()
+        query = UNRESOLVED_ALIAS_TABLE.delete().where(
+            UNRESOLVED_ALIAS.lang == param('lang'),
+            UNRESOLVED_ALIAS.title == param('title'),
+        )
+        for lang, title in aliases:
+            self.execute_query(
+                query,
+                lang, title,
+            )
+        self.connection.commit()
+
+
+@CrawlDB.register('sqlite')
+class SQLiteCrawlDB(SQLiteDB, CrawlDB):
+
+    TABLES = [
+        CRAWL_MEMBER_TABLE,
+    ]
+
+    def insert_crawl_members(self, crawl, members):
+        param = Param()
+        query = CRAWL_MEMBER_TABLE.insert({
+            CRAWL_MEMBER.crawl: param('crawl'),
+            CRAWL_MEMBER.page_id: param('page_id'),
+            CRAWL_MEMBER.depth: param('depth'),
+            CRAWL_MEMBER.parent_id: param('parent_id'),
+            CRAWL_MEMBER.title: param('title'),
+            CRAWL_MEMBER.ns: param('ns'),
+            CRAWL_MEMBER.expanded: param('expanded'),
+        },
+            replace=True,
+        )
+        for page_id, depth, parent_id, title, ns, expanded in members:
+            self.execute_query(
+                query,
+                crawl, page_id, depth, parent_id, title, ns, int(expanded),
+            )
+        self.connection.commit()
+
+    def all_crawl_members(self, crawl):
+        param = Param()
+        query = CRAWL_MEMBER_TABLE.select(
+            CRAWL_MEMBER.page_id, CRAWL_MEMBER.depth, CRAWL_MEMBER.parent_id,
+            CRAWL_MEMBER.title, CRAWL_MEMBER.ns, CRAWL_MEMBER.expanded,
+        ).where(
+            CRAWL_MEMBER.crawl == param('crawl'),
+        )
+        results = self.execute_query(
+            query,
+            crawl,
+        )
+        for row in results:
+            yield (
+                row['page_id'], row['depth'], row['parent_id'],
+                row['title'], row['ns'], bool(row['expanded']),
+            )
+
+
+@ResponseDB.register('sqlite')
+class SQLiteResponseDB(SQLiteDB, ResponseDB):
+
+    TABLES = [
+        RESPONSE_TABLE,
+    ]
+
+    def insert_response(self, key, timestamp, data):
+        param = Param()
+        query = RESPONSE_TABLE.insert({
+            RESPONSE.key: param('key'),
+            RESPONSE.timestamp: param('timestamp'),
+            RESPONSE.data: param('data'),
+        },
+            replace=True,
+        )
+        self.execute_query(
+            query,
+            key, timestamp, json.dumps(data),
+        )
+        self.connection.commit()
+
+    def get_response(self, key):
+        param = Param()
+        query = RESPONSE_TABLE.select(
+            RESPONSE.timestamp, RESPONSE.data,
+        ).where(
+            RESPONSE.key == param('key'),
+        )
+        results = self.execute_query(
+            query,
+            key,
+        )
+        for row in results:
+            return row['timestamp'], json.loads(row['data'])
+
+
+@RevisionDB.register('sqlite')
+class SQLiteRevisionDB(SQLiteDB, RevisionDB):
+
+    TABLES = [
+        REVISION_TABLE,
+    ]
+
+    def __init__(self, *, cache_dir, **kwargs):
+        super().__init__(cache_dir=cache_dir, fn=REVISIONS_FN)
+
+    def insert_revisions(self, lang, page_id, revisions):
+        # NOTE: All rows are inserted in one transaction
+        param = Param()
+        query = REVISION_TABLE.insert({
+            REVISION.lang: param('lang'),
+            REVISION.page_id: param('page_id'),
+            REVISION.revision_id: param('revision_id'),
+            REVISION.timestamp: param('timestamp'),
+            REVISION.base_id: param('base_id'),
+            REVISION.size: param('size'),
+            REVISION.data: param('data'),
+            REVISION.meta: param('meta'),
+        },
+            replace=True,
+        )
+        for revision_id, timestamp, base_id, data, meta in revisions:
+            self.execute_query(
+                query,
+                lang, page_id, revision_id, timestamp, base_id, len(data), data, json.dumps(meta),
+            )
+        self.connection.commit()
+
+    def get_revision(self, lang, page_id, revision_id):
+        param = Param()
+        query = REVISION_TABLE.select(
+            REVISION.timestamp, REVISION.base_id, REVISION.data, REVISION.meta,
+        ).where(
+            REVISION.lang == param('lang'),
+            REVISION.page_id == param('page_id'),
+            REVISION.revision_id == param('revision_id'),
+        )
+        results = self.execute_query(
+            query,
+            lang, page_id, revision_id,
+        )
+        for row in results:
+            return row['timestamp'], row['base_id'], row['data'], json.loads(row['meta'])
+
+    def get_revision_ids(self, lang, page_id):
+        param = Param()
+        query = REVISION_TABLE.select(
+            REVISION.revision_id, REVISION.timestamp, REVISION.base_id, REVISION.size,
+        ).where(
+            REVISION.lang == param('lang'),
+            REVISION.page_id == param('page_id'),
+        ).order_by(
+            REVISION.revision_id,
+        )
+        results = self.execute_query(
+            query,
+            lang, page_id,
+        )
+        return [
+            (row['revision_id'], row['timestamp'], row['base_id'], row['size'])
+            for row in results
+        ]
+
+    def delete_revisions(self, lang, page_id, revision_ids):
+        param = Param()
+        query = REVISION_TABLE.delete().where(
+            REVISION.lang == param('lang'),
+            REVISION.page_id == param('page_id'),
+            REVISION.revision_id == param('revision_id'),
+        )
+        for revision_id in revision_ids:
+            self.execute_query(
+                query,
+                lang, page_id, revision_id,
+            )
+        self.connection.commit()
+
+    def all_revision_pages(self):
+        query = REVISION_TABLE.select(
+            REVISION.lang, REVISION.page_id,
+        )
+        results = self.execute_query(query)
+        pages = dict.fromkeys(
+            (row['lang'], row['page_id']) for row in results
+        )
+        yield from pages
+
+    def compact(self):
+        self.connection.execute('VACUUM')
+
+
+@StateDB.register('sqlite')
+class SQLiteStateDB(SQLiteDB, StateDB):
+
+    TABLES = [
+        STATE_TABLE,
+        STATE_ITEM_TABLE,
+    ]
+
+    def set_state(self, key, value):
+        param = Param()
+        query = STATE_TABLE.insert({
+            STATE.key: param('key'),
+            STATE.value: param('value'),
+        },
+            replace=True,
+        )
+        self.execute_query(
+            query,
+            key, value,
+        )
+        self.connection.commit()
+
+    def get_state(self, key):
+        param = Param()
+        query = STATE_TABLE.select(
+            STATE.value,
+        ).where(
+            STATE.key == param('key'),
+        )
+        results = self.execute_query(
+            query,
+            key,
+        )
+        for row in results:
+            return row['value']
+
+    def insert_state_items(self, key, items):
+        param = Param()
+        query = STATE_ITEM_TABLE.insert({
+            STATE_ITEM.key: param('key'),
+            STATE_ITEM.item: param('item'),
+        },
+            replace=True,
+        )
+        for item in items:
+            self.execute_query(
+                query,
+                key, str(item),
+            )
+        self.connection.commit()
+
+    def all_state_items(self, key):
+        param = Param()
+        query = STATE_ITEM_TABLE.select(
+            STATE_ITEM.item,
+        ).where(
+            STATE_ITEM.key == param('key'),
+        )
+        results = self.execute_query(
+            query,
+            key,
+        )
+        for row in results:
+            yield row['item']
@@ -1,14 +1,31 @@
+import collections
+import concurrent.futures
+import contextlib
+import datetime
+import itertools
+import json
 import logging
+import queue
+import threading
+import time
 import urllib.parse
 
 import requests
 
-from .parser.core import is_page_id, is_link
+from .parser.core import is_page_id, is_link, normalize_title
 from .parser import WikiLink
 
 from .cache import WikiCache
 
-from .page import WikiPage
+from .page import WikiPage, WikiRevision
+
+from .transport import TransportPolicy, RequestError, RETRY_EXCEPTIONS, SessionTransport
+
+from .decoders import get_decoder
+
+from .singleflight import SingleFlight
+
+from .metrics import NULL_METRICS
 
 
 log = logging.getLogger('wikipedia.client')
@@ -18,6 +35,8 @@ log = logging.getLogger('wikipedia.client')
 
 FORMAT_JSON = {
     'format': 'json', # specify data format
+    'formatversion': 2, # Compact format: pages as list, booleans as true/false
+                        # https://www.mediawiki.org/wiki/API:JSON_version_2
 }
 
 QUERY_RESOLVE_REDIRECTS = {
@@ -48,6 +67,7 @@ QUERY_PAGES_FULL = {
     # prop = extracts
     'explaintext': '',  # Return extracts as plain text instead of limited HTML
     'exintro': '',      # Return only content before the first section
+    'exlimit': 'max',   # How many extracts to return
     # prop = revisions
     'rvprop': '|'.join([    # Which properties to get for each revision
         'ids',          # The ID of the revision
@@ -55,6 +75,7 @@ QUERY_PAGES_FULL = {
     ]),
     # 'rvlimit': 1,       # Limit how many revisions will be returned
     #                     # NOTE: If specified continue with previous revid will be added
+    #                     #       Revisions history is streamed by WikiClient.revisions()
     'rvslots': '*',     # Which revision slots to return data for; '*' for all values
     # prop = categories
     'cllimit': 'max',   # How many categories to return
@@ -68,6 +89,38 @@ QUERY_PAGES_MINIMAL = {
     'inprop': 'url',
 }
 
+# Parameters used with each of pages' props
+PROP_PARAMS = {
+    'info': {
+        'inprop': 'url',
+    },
+    'extracts': {
+        'explaintext': '',
+        'exintro': '',
+        'exlimit': 'max',
+    },
+    'revisions': {
+        'rvprop': '|'.join([
+            'ids',
+            'content',
+        ]),
+        'rvslots': '*',
+    },
+    'categories': {
+        'cllimit': 'max',
+    },
+}
+
+# Named sets of pages' props to fetch
+FETCH_PROFILES = {
+    'meta': ['info', 'categoryinfo', 'pageprops'],
+    'extract': ['info', 'extracts'],
+    'content': ['info', 'revisions'],
+    'full': QUERY_PAGES_FULL['prop'].split('|'),
+}
+
+DEFAULT_FETCH_PROFILE = 'full'
+
 QUERY_LIST_CATEGORYMEMBERS = {
     'action': 'query',
     'list': 'categorymembers',  # List all pages in a given category
@@ -80,22 +133,194 @@ QUERY_LIST_CATEGORYMEMBERS = {
     ]),
 }
 
+# NOTE: Maximum number of page ids / titles in one query (for non-bot users)
+QUERY_PAGES_BATCH_SIZE = 50
+
 QUERY_GENERATOR_CATEGORYMEMBERS = {
     'generator': 'categorymembers',
     'gcmlimit': 'max',
 }
 
+QUERY_GENERATOR_SEARCH = {
+    'generator': 'search',      # Perform a full text search
+                                # https://www.mediawiki.org/wiki/API:Search
+    'gsrlimit': 'max',          # How many total pages to return
+    'gsrprop': '|'.join([       # Which properties to return, added to pages' data
+        'snippet',              # Adds a parsed snippet of the page
+        'titlesnippet',         # Adds a parsed snippet of the page title
+        'size',                 # Adds the size of the page in bytes
+        'wordcount',            # Adds the word count of the page
+        'timestamp',            # Adds the timestamp of when the page was last edited
+    ]),
+}
+
+# Number of categories expanded at once by category_tree()
+CATEGORY_TREE_WORKERS = 4
+
+# Number of continued results fetched ahead in background, when prefetching is enabled
+DEFAULT_PREFETCH = 2
+
+# Category members' types used by cmtype
+NAMESPACE_MEMBER_TYPES = {
+    6: 'file',
+    14: 'subcat',
+}
+
+
+QUERY_LIST_ALLPAGES = {
+    'action': 'query',
+    'list': 'allpages',         # Enumerate all pages sequentially in a given namespace
+                                # https://www.mediawiki.org/wiki/API:Allpages
+    'aplimit': 'max',           # How many total pages to return
+    'apfilterredir': 'nonredirects',    # Which pages to list
+}
+
+# Titles' first letters used as boundaries of allpages ranges by get_partitions()
+# NOTE: Latin alphabet only, all_pages() samples boundaries from the wiki instead
+ALLPAGES_BOUNDARIES = list('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+
+# Max number of allpages requests used to sample titles' first characters
+ALLPAGES_SAMPLES = 100
+
+# Number of allpages ranges, and number of ranges listed at once by all_pages()
+ALLPAGES_PARTITIONS = 8
+ALLPAGES_WORKERS = 4
+
+# Number of batches of pages kept ahead by each range
+ALLPAGES_QUEUE_SIZE = 2
+
+# Checkpoint's state of range that was listed completely
+ALLPAGES_RANGE_DONE = 'done'
+
+
+QUERY_LIST_RECENTCHANGES = {
+    'action': 'query',
+    'list': 'recentchanges',    # Enumerate recent changes
+                                # https://www.mediawiki.org/wiki/API:RecentChanges
+    'rcdir': 'newer',           # List oldest first
+    'rclimit': 'max',           # How many total changes to return
+    'rcprop': '|'.join([        # Include additional pieces of information
+        'ids',                  # Adds the page ID, recent changes ID and the new and old revision ID
+        'title',                # Adds the title of the edited page
+        'timestamp',            # Adds timestamp of the edit
+    ]),
+    'rctype': '|'.join([        # Which types of changes to show
+        'edit',
+        'new',
+    ]),
+}
+
+QUERY_REVISIONS = {
+    'action': 'query',
+    'prop': 'revisions',    # https://www.mediawiki.org/wiki/API:Revisions
+    'rvprop': '|'.join([
+        'ids',
+        'timestamp',
+        'flags',            # Revision flags (minor)
+        'user',
+        'comment',
+        'size',
+        'sha1',
+        'content',
+    ]),
+    'rvslots': 'main',
+    'rvlimit': 'max',       # NOTE: Up to 50 revisions are returned with content, 500 without
+    'rvdir': 'newer',       # List oldest first
+}
+
+QUERY_LANGLINKS = {
+    'prop': 'langlinks',    # Returns all interlanguage links from the given pages
+                            # https://www.mediawiki.org/wiki/API:Langlinks
+    'lllimit': 'max',       # How many langlinks to return
+}
+
 
 # https://github.com/goldsmith/Wikipedia/blob/master/wikipedia/wikipedia.py
 # https://github.com/5j9/wikitextparser
 
 
+def get_profile_props(profile):
+    # Return set of props for named profile, 'prop1|prop2' string or iterable of props
+    if isinstance(profile, str):
+        if profile in FETCH_PROFILES:
+            return set(FETCH_PROFILES[profile])
+        profile = profile.split('|')
+    # NOTE: info is always needed, as it includes revision_id and lang used by cache
+    return {'info', *profile}
+
+
+def get_props_params(props):
+    params = {
+        'prop': '|'.join(sorted(props)),
+    }
+    for prop in props:
+        params.update(PROP_PARAMS.get(prop, {}))
+    return params
+
+
+def get_partitions(partitions):
+    # Return [(apfrom, apto), ] ranges for number of partitions or list of boundaries
+    # NOTE: First range has no apfrom, last range has no apto
+    if isinstance(partitions, int):
+        step = len(ALLPAGES_BOUNDARIES) / max(1, partitions)
+        boundaries = [ALLPAGES_BOUNDARIES[int(i*step)] for i in range(1, partitions)]
+    else:
+        boundaries = partitions
+    boundaries = [None, *sorted(set(boundaries)), None]
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def get_next_character(char):
+    code = ord(char) + 1
+    if 0xD800 <= code < 0xE000:
+        # NOTE: Surrogates are not valid characters
+        code = 0xE000
+    return chr(code)
+
+
+def get_weighted_boundaries(weights, partitions):
+    # Return boundaries splitting [(key, weight), ] sorted by key, into partitions of about the same weight
+    total = sum(weight for key, weight in weights)
+    boundaries = []
+    cumulative = 0
+    for key, weight in weights:
+        # NOTE: Key starts next partition if most of its weight is past partition's end
+        if len(boundaries) < partitions-1 and cumulative and cumulative + weight/2 > total*(len(boundaries)+1)/partitions:
+            boundaries.append(key)
+        cumulative += weight
+    return boundaries
+
+
+def get_query_pages(data):
+    # Return list of pages' data from query results
+    # NOTE: With formatversion=2 pages are returned as list, with legacy formatversion=1
+    #       (like cached responses) as: {page_id: {}, }
+    pages = data.get('query', {}).get('pages', [])
+    if isinstance(pages, dict):
+        return list(pages.values())
+    return pages
+
+
+def is_url(title):
+    return title.startswith('https://') or title.startswith('http://')
+
+
+def parse_url(url):
+    # Return (lang, title) from https://{lang}.wikipedia.org/wiki/{title} URL
+    parsed = urllib.parse.urlsplit(url)
+    lang = parsed.hostname.split('.')[0]
+    title = parsed.path[parsed.path.find('/wiki/')+6 :]
+    return lang, urllib.parse.unquote(title)
+
+
 class Results:
 
-    def __init__(self, api_url, params, response):
+    def __init__(self, api_url, params, response, decoder=None):
         self.api_url = api_url
         self.params = params
         self.response = response
+        self._decoder = decoder or get_decoder()
+        self._data = None
 
     @property
     def request(self):
@@ -115,21 +340,69 @@ class Results:
 
     @property
     def data(self):
-        return self.response.json()
+        # NOTE: Response is decoded only once
+        if self._data is None:
+            self._data = self._decoder(self.response.content)
+        return self._data
+
+
+class CachedResults(Results):
+
+    def __init__(self, api_url, params, data):
+        super().__init__(api_url, params, None)
+        self._data = data
+
+    @property
+    def request(self):
+        return None
+
+    @property
+    def ok(self):
+        return True
+
+    @property
+    def status(self):
+        return 200
+
+    @property
+    def reason(self):
+        return 'OK'
 
 
 class WikiClient:
 
     API_URL = 'https://%s.wikipedia.org/w/api.php'
 
-    def __init__(self, lang, *, load=False, check_updates=False, **kwargs):
+    def __init__(self, lang, *, load=False, check_updates=False, policy=None, decoder=None,
+                 response_ttl=None, rate_limiter=None, cache=None, profile=DEFAULT_FETCH_PROFILE,
+                 transport=None, metrics=None, prefetch=0, **kwargs):
         self._lang = None
         self._api_url = None
         self.set_lang(lang)
         self._load_members = load
         self._check_updates = check_updates
-        self._cache = WikiCache(**kwargs)
+        self._profile = profile
+        # Number of continued results fetched ahead in background thread, True for DEFAULT_PREFETCH
+        self._prefetch = prefetch
+        # NOTE: Use metrics.Metrics() to collect metrics, disabled by default
+        self.metrics = metrics or NULL_METRICS
+        # NOTE: WikiCache instance might be shared by clients for different languages
+        self._cache = cache or WikiCache(metrics=metrics, **kwargs)
+        self._policy = policy or TransportPolicy()
+        self._decoder = self.metrics.timed('json_decode_seconds', get_decoder(decoder))
+        # Time in seconds to cache responses by query type, like: {'categorymembers': 3600, 'parse': 86400}
+        self._response_ttl = response_ttl
         self._session = requests.Session()
+        self._policy.mount(self._session)
+        # NOTE: Use transport.RecordingTransport / ReplayTransport to record and replay responses
+        self._transport = transport or SessionTransport(self._session)
+        # NOTE: Use ratelimit.FileTokenBucket to share limits between processes
+        self._rate_limiter = rate_limiter or contextlib.nullcontext()
+        # NOTE: Counters are updated by concurrent threads (pool, prefetch, pipeline)
+        self.retries = 0
+        self.errors = 0
+        self._counters_lock = threading.Lock()
+        self._flights = SingleFlight()
 
     @property
     def lang(self):
@@ -139,37 +412,173 @@ class WikiClient:
         self._lang = lang
         self._api_url = self.API_URL % (self._lang, )
 
+    def _get_response_ttl(self, params):
+        if not self._response_ttl:
+            return
+        query_type = params.get('list') or params.get('generator') or params['action']
+        return self._response_ttl.get(query_type)
+
     def _request(self, params, api_url=None):
-        params.update(FORMAT_JSON)
+        # NOTE: Legacy format can be still requested with: formatversion=1
+        for key, value in FORMAT_JSON.items():
+            params.setdefault(key, value)
         if not 'action' in params:
             # NOTE: By default use action=query module if not specified otherwise
             params['action'] = 'query'
+        self._policy.update_params(params)
         api_url = api_url or self._api_url
-        response = self._session.get(
-            api_url,
-            params=params,
-        )
-        results = Results(
-            api_url,
-            params,
-            response,
-        )
-        log.debug(
-            'API: %s - %s',
-            results.request.url, results.status,
-        )
+
+        ttl = self._get_response_ttl(params)
+        if ttl:
+            data = self._cache.get_response(api_url, params, ttl)
+            if data is not None:
+                log.debug('API: %s - cached', api_url)
+                return CachedResults(api_url, params, data)
+
+        results = self._fetch(params, api_url)
+        if ttl and results.ok and not 'error' in results.data:
+            self._cache.insert_response(api_url, params, results.data)
         return results
 
-    def _continued(self, results):
-        yield results
-        while 'continue' in results.data:
-            params = results.params
-            params.update(results.data['continue'])
-            results = self._request(
-                params,
-                results.api_url,
+    def _get_timeout(self, started, attempt, error, api_url, params):
+        # Request timeout capped to time remaining until deadline
+        # NOTE: Called after waiting for rate limiter, which counts towards deadline
+        elapsed = time.monotonic() - started
+        if self._policy.deadline is not None and elapsed >= self._policy.deadline:
+            raise RequestError(
+                f'API request deadline exceeded after {attempt} attempts: {error}',
+                api_url, params,
+            )
+        return self._policy.get_timeout(elapsed)
+
+    def _fetch(self, params, api_url):
+        started = time.monotonic()
+        attempt = 0
+        error = None
+        while True:
+            response = None
+            retry_after = None
+            try:
+                with self._rate_limiter, self.metrics.timer('request_seconds'):
+                    response = self._transport.get(
+                        api_url,
+                        params,
+                        self._get_timeout(started, attempt, error, api_url, params),
+                    )
+            except RETRY_EXCEPTIONS as e:
+                error = repr(e)
+            else:
+                self._count_response(params, response)
+                results = Results(
+                    api_url,
+                    params,
+                    response,
+                    self._decoder,
+                )
+                log.debug(
+                    'API: %s - %s',
+                    results.request.url, results.status,
+                )
+                error = self._policy.get_error(response)
+                if not error:
+                    return results
+                retry_after = self._policy.get_retry_after(response)
+
+            with self._counters_lock:
+                self.errors += 1
+            self.metrics.inc('request_errors')
+            delay = self._policy.get_delay(attempt, retry_after)
+            if not self._policy.should_retry(attempt, time.monotonic()-started, delay):
+                raise RequestError(
+                    f'API request failed after {attempt+1} attempts: {error}',
+                    api_url, params, response,
+                )
+            log.warning(
+                'API: %s - %s, retrying in %.1fs',
+                api_url, error, delay,
             )
+            with self._counters_lock:
+                self.retries += 1
+            self.metrics.inc('request_retries')
+            attempt += 1
+            time.sleep(delay)
+
+    def _count_response(self, params, response):
+        if not self.metrics.enabled:
+            return
+        query = params.get('list') or params.get('generator') or ''
+        self.metrics.inc(
+            'api_calls',
+            action=params.get('action', ''), query=query, prop=params.get('prop', ''),
+        )
+        self.metrics.inc('response_bytes', len(response.content))
+
+    def _prefetched(self, results, prefetch):
+        # Fetch (and decode) continued results in background thread, while consumer
+        # handles previous ones; up to prefetch results are kept ahead, in order
+        # NOTE: When closed early, background thread stops after request in flight
+        fetched = queue.Queue(maxsize=prefetch)
+        closed = threading.Event()
+        done = object()
+
+        def fetch():
+            continued = self._continued(results, prefetch=0)
+            try:
+                for item in continued:
+                    item.data   # Decode in background thread
+                    fetched.put(item)
+                    if closed.is_set():
+                        return
+            except Exception as e:
+                fetched.put(e)
+                return
+            finally:
+                continued.close()
+            fetched.put(done)
+
+        thread = threading.Thread(target=fetch, name='wikipedia-prefetch', daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = fetched.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            closed.set()
+            # NOTE: Make room for the last put, so background thread is never blocked
+            while not fetched.empty():
+                fetched.get_nowait()
+
+    def _continued(self, results, prefetch=None):
+        # NOTE: Continue values must be merged with the original request's params,
+        #       otherwise stale prop continuation values (like excontinue) would be sent
+        # NOTE: Failed requests are retried by _request(), so continuation is resumed at
+        #       the failed request. If all retries fail RequestError with params is raised
+        if prefetch is None:
+            prefetch = self._prefetch
+        if prefetch is True:
+            prefetch = DEFAULT_PREFETCH
+        if prefetch:
+            yield from self._prefetched(results, prefetch)
+            return
+        original_params = dict(results.params)
+        depth = 1
+        try:
             yield results
+            while 'continue' in results.data:
+                params = dict(original_params)
+                params.update(results.data['continue'])
+                results = self._request(
+                    params,
+                    results.api_url,
+                )
+                depth += 1
+                yield results
+        finally:
+            self.metrics.observe('continuation_depth', depth)
 
     def query_pages(self, **params):
         params.update(QUERY_RESOLVE_REDIRECTS)
@@ -204,13 +613,14 @@ class WikiClient:
         # NOTE: result = {'query': {'categorymembers': [] }}
         return self._request(params)
 
-    def query_category_members(self, category, cmtype=None):
+    def query_category_members(self, category, cmtype=None, params=None):
         # Using generator instead of list, so we can query for additional pages' data pages
         # NOTE: Generator parameter names must be prefixed with a "g"
         if is_page_id(category):
             query_for = 'gcmpageid'
         else:
             query_for = 'gcmtitle'
+        pages_params = params or QUERY_PAGES_MINIMAL
         params = {
             query_for: category,
         }
@@ -218,37 +628,94 @@ class WikiClient:
             params['gcmtype'] = cmtype
         params.update(QUERY_RESOLVE_REDIRECTS)
         params.update(QUERY_GENERATOR_CATEGORYMEMBERS)
-        params.update(QUERY_PAGES_MINIMAL)
+        params.update(pages_params)
+        if 'revisions' in pages_params['prop']:
+            # NOTE: Revisions' content is returned for up to 50 pages per request
+            params['gcmlimit'] = QUERY_PAGES_BATCH_SIZE
         # NOTE: result = {'query': {'pages': {} }}
         return self._request(params)
 
-    def query_category_pages(self, category):
-        return self.query_category_members(category, 'page')
+    def query_category_pages(self, category, params=None):
+        return self.query_category_members(category, 'page', params)
 
-    def query_category_subcategories(self, category):
-        return self.query_category_members(category, 'subcat')
+    def query_category_subcategories(self, category, params=None):
+        return self.query_category_members(category, 'subcat', params)
 
     def _pages_gen(self, pages_data, load=False, check_updates=None):
         if load is None:
             load = self._load_members
         for data in pages_data:
-            page = WikiPage(data)
+            page = WikiPage(data, self.metrics)
             if load:
                 page = self.page(page, check_updates=check_updates)
             yield page
 
-    def _get_pages(self, results, load=None, check_updates=None):
-        for results in self._continued(results):
+    def _query_pages(self, data):
+        # Return [(key, page's data), ] with page id as key, or title if page has no id
+        return [
+            (page_data.get('pageid') or page_data.get('title'), page_data)
+            for page_data in get_query_pages(data)
+        ]
+
+    def _merge_page_data(self, page_data, data):
+        # NOTE: When continued, props like revisions, categories or extracts
+        #       might be split across responses
+        for key, value in data.items():
+            if isinstance(value, list) and isinstance(page_data.get(key), list):
+                page_data[key].extend(value)
+            else:
+                page_data[key] = value
+
+    def _get_aliases(self, data):
+        # Return {title: [alias, ]} from titles normalized and redirects resolved by API
+        query = data.get('query', {})
+        resolved = {}
+        for mapping in query.get('normalized', []) + query.get('redirects', []):
+            resolved[mapping['from']] = mapping['to']
+        aliases = {}
+        for alias, title in resolved.items():
+            # NOTE: Normalized title might be a redirect
+            seen = {alias}
+            while title in resolved and not title in seen:
+                seen.add(title)
+                title = resolved[title]
+            aliases.setdefault(title, []).append(alias)
+        return aliases
+
+    def _get_complete_pages(self, results, prefetch=None, order=None):
+        # Merge pages' data from continued results, yield pages after each batch is complete
+        # NOTE: Queried props are stored with page's data, so cache knows what data it holds
+        # NOTE: Aliases resolved to page are stored with its data, so they can be cached as well
+        # NOTE: Pages of each batch are sorted by order(data) if given
+        props = results.params.get('prop', '').split('|')
+        pages_data = {}
+        for results in self._continued(results, prefetch):
+            aliases = self._get_aliases(results.data)
+            for key, data in self._query_pages(results.data):
+                if key in pages_data:
+                    self._merge_page_data(pages_data[key], data)
+                else:
+                    data['_props'] = props
+                    pages_data[key] = data
+                    if data.get('title') in aliases:
+                        data['_aliases'] = aliases[data['title']]
+            if 'batchcomplete' in results.data:
+                yield from self._pages_gen(sorted(pages_data.values(), key=order) if order else pages_data.values())
+                pages_data = {}
+        yield from self._pages_gen(sorted(pages_data.values(), key=order) if order else pages_data.values())
+
+    def _get_pages(self, results, load=None, check_updates=None, prefetch=None):
+        for results in self._continued(results, prefetch):
             if not 'query' in results.data:
                 # no members returned
                 continue
             yield from self._pages_gen(
-                results.data['query'].get('pages', {}).values(),
+                get_query_pages(results.data),
                 load, check_updates,
             )
 
-    def _get_categorymembers(self, results, load=None, check_updates=None):
-        for results in self._continued(results):
+    def _get_categorymembers(self, results, load=None, check_updates=None, prefetch=None):
+        for results in self._continued(results, prefetch):
             if not 'query' in results.data:
                 # no members returned
                 continue
@@ -257,17 +724,315 @@ class WikiClient:
                 load, check_updates,
             )
 
-    def category_members(self, category, load=None, check_updates=None):
-        results = self.query_category_members(category.page_id or category.title)
-        yield from self._get_pages(results, load, check_updates)
+    def _get_loaded_pages(self, results, prefetch=None, order=None):
+        # Pages queried with fetch profile's props, insert them into cache as they arrive
+        for page in self._get_complete_pages(results, prefetch, order):
+            if self._cache and page.page_id and not page.is_missing:
+                self._cache.insert(page)
+            yield page
+
+    def _category_members(self, query, category, load=None, check_updates=None, profile=None,
+                          prefetch=None):
+        category = category.page_id or category.title
+        if profile:
+            # Get pages' data with generator query, instead of loading pages one by one
+            results = query(category, params=get_props_params(get_profile_props(profile)))
+            yield from self._get_loaded_pages(results, prefetch)
+        else:
+            results = query(category)
+            yield from self._get_pages(results, load, check_updates, prefetch)
+
+    def category_members(self, category, load=None, check_updates=None, profile=None, prefetch=None):
+        yield from self._category_members(
+            self.query_category_members, category, load, check_updates, profile, prefetch,
+        )
+
+    def category_pages(self, category, load=None, check_updates=None, profile=None, prefetch=None):
+        yield from self._category_members(
+            self.query_category_pages, category, load, check_updates, profile, prefetch,
+        )
+
+    def category_subcategories(self, category, load=None, check_updates=None, profile=None,
+                               prefetch=None):
+        yield from self._category_members(
+            self.query_category_subcategories, category, load, check_updates, profile, prefetch,
+        )
+
+    def _get_category(self, category):
+        if isinstance(category, WikiPage):
+            return category
+        if is_page_id(category):
+            return WikiPage({'pageid': int(category)})
+        return WikiPage({'title': self._get_title(category)})
+
+    def _list_category_members(self, category):
+        return list(self.category_members(category, load=False))
+
+    def category_tree(self, root, max_depth=None, cmtype=None, workers=CATEGORY_TREE_WORKERS, crawl=None):
+        # Breadth-first walk over category and its subcategories, yield (depth, parent, page)
+        # Each member is yielded only once, even if reachable by several paths or on category cycles
+        # NOTE: If crawl name is given known members are stored in cache, so interrupted crawl
+        #       is resumed without expanding categories again
+        root = self._get_category(root)
+        if not root.page_id:
+            root = self._page(root.page_id, root.title, QUERY_PAGES_MINIMAL) or root
+        if not root.page_id:
+            return
+        cmtypes = cmtype and set(cmtype.split('|'))
+        crawl = self._cache and crawl
+
+        visited = set()
+        frontier = collections.deque()
+        if crawl:
+            for page_id, depth, parent_id, title, ns, expanded in self._cache.all_crawl_members(crawl):
+                visited.add(page_id)
+                if expanded or ns != 14 or (max_depth is not None and depth >= max_depth):
+                    continue
+                category = WikiPage({'pageid': page_id, 'title': title, 'ns': ns})
+                frontier.append((depth, parent_id, category))
+        if not visited:
+            visited.add(root.page_id)
+            frontier.append((0, None, root))
+            if crawl:
+                self._cache.insert_crawl_members(crawl, [
+                    (root.page_id, 0, None, root.title, 14, False),
+                ])
+
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix='wikipedia',
+        )
+        pending = {}
+        try:
+            while frontier or pending:
+                while frontier and len(pending) < workers:
+                    depth, parent_id, category = frontier.popleft()
+                    future = executor.submit(self._list_category_members, category)
+                    pending[future] = (depth, parent_id, category)
+                done, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED,
+                )
+                for future in done:
+                    depth, parent_id, category = pending.pop(future)
+                    members = []
+                    for page in future.result():
+                        if not page.page_id or page.page_id in visited:
+                            continue
+                        visited.add(page.page_id)
+                        members.append(page)
+                    for page in members:
+                        if page.is_category and (max_depth is None or depth+1 < max_depth):
+                            frontier.append((depth+1, category.page_id, page))
+                        member_type = NAMESPACE_MEMBER_TYPES.get(page.namespace_id, 'page')
+                        if not cmtypes or member_type in cmtypes:
+                            yield depth+1, category, page
+                    if crawl:
+                        # Store members after all were yielded, so category is expanded again
+                        # if crawl is interrupted before that
+                        self._cache.insert_crawl_members(crawl, [
+                            (page.page_id, depth+1, category.page_id, page.title, page.namespace_id, False)
+                            for page in members
+                        ] + [
+                            (category.page_id, depth, parent_id, category.title, 14, True),
+                        ])
+        finally:
+            executor.shutdown(wait=False)
+
+    def _all_pages_range(self, namespace, start, end, continue_params=None):
+        # yield (pages, continue params) for batches of pages with titles from start to end
+        # NOTE: apto is inclusive, so page titled exactly as end is left for the next range
+        params = {
+            'apnamespace': namespace,
+        }
+        params.update(QUERY_LIST_ALLPAGES)
+        if start:
+            params['apfrom'] = start
+        if end:
+            params['apto'] = end
+            end = normalize_title(end)
+        if continue_params:
+            params.update(continue_params)
+        results = self._request(params)
+        for results in self._continued(results, prefetch=0):
+            pages = [
+                page for page in self._pages_gen(results.data.get('query', {}).get('allpages', []))
+                if not end or self._get_range_title(page, namespace) != end
+            ]
+            yield pages, results.data.get('continue')
+
+    def _get_range_title(self, page, namespace):
+        # Title without namespace prefix, as used by apfrom / apto
+        if namespace:
+            return page.title.partition(':')[2]
+        return page.title
+
+    def _get_all_pages_key(self, namespace, checkpoint, start):
+        return f'allpages:{self.lang}:{namespace}:{checkpoint}:{start or ""}'
+
+    def _sample_all_pages(self, namespace, samples=ALLPAGES_SAMPLES):
+        # Return [(first character, weight), ] of titles in namespace, in titles' order
+        # NOTE: Weight is number of titles starting with character in sampled batch, so frequent
+        #       characters have about the same weight (batch size), and rare ones less
+        # NOTE: After each batch titles starting with its last character are skipped, so sampling
+        #       takes about one request per frequent first character
+        weights = {}
+        start = None
+        for _ in range(samples):
+            params = {
+                'apnamespace': namespace,
+            }
+            params.update(QUERY_LIST_ALLPAGES)
+            if start:
+                params['apfrom'] = start
+            results = self._request(params)
+            pages = list(self._pages_gen(results.data.get('query', {}).get('allpages', [])))
+            for page in pages:
+                char = self._get_range_title(page, namespace)[:1]
+                weights[char] = weights.get(char, 0) + 1
+            if not pages or not 'continue' in results.data:
+                break
+            start = get_next_character(char)
+        else:
+            log.warning(
+                'All pages sampled up to: %r, titles after it are listed by one range, '
+                'use explicit partitions boundaries for wikis with many titles\' first characters', start,
+            )
+        return sorted(weights.items())
+
+    def _get_all_pages_boundaries(self, namespace, partitions, checkpoint=None):
+        # Return list of boundaries, sampled from wiki if number of partitions is given
+        # NOTE: Sampled boundaries are stored with checkpoint, so resumed ranges are the same
+        if not isinstance(partitions, int):
+            return partitions
+        key = checkpoint and f'allpages-boundaries:{self.lang}:{namespace}:{checkpoint}'
+        state = key and self._cache.get_state(key)
+        if state:
+            return json.loads(state)
+        boundaries = get_weighted_boundaries(self._sample_all_pages(namespace), partitions)
+        log.info('All pages boundaries: %s', boundaries)
+        if key:
+            self._cache.set_state(key, json.dumps(boundaries))
+        return boundaries
+
+    def all_pages(self, namespace=0, partitions=ALLPAGES_PARTITIONS, workers=ALLPAGES_WORKERS,
+                  ordered=False, profile=None, check_updates=None, checkpoint=None):
+        # Enumerate all pages in namespace, with ranges of titles (apfrom / apto) listed concurrently
+        # NOTE: If ordered pages are yielded in titles' order, otherwise as ranges' batches arrive
+        # NOTE: If profile is given pages are loaded with pages(), in batches by workers
+        # NOTE: If checkpoint name is given progress of each range is stored in cache after its
+        #       batch of pages was yielded, so interrupted enumeration is resumed
+        # NOTE: If number of partitions is given, boundaries are sampled from titles' first
+        #       characters, otherwise partitions is list of boundaries (titles without namespace)
+        checkpoint = self._cache and checkpoint
+        ranges = []
+        for start, end in get_partitions(self._get_all_pages_boundaries(namespace, partitions, checkpoint)):
+            continue_params = None
+            if checkpoint:
+                state = self._cache.get_state(self._get_all_pages_key(namespace, checkpoint, start))
+                if state == ALLPAGES_RANGE_DONE:
+                    continue
+                continue_params = state and json.loads(state)
+            ranges.append((start, end, continue_params))
+        if not ranges:
+            return
+
+        if ordered:
+            queues = [queue.Queue(maxsize=ALLPAGES_QUEUE_SIZE) for _ in ranges]
+        else:
+            # NOTE: Room for one batch per worker, so no worker is blocked after queue is drained
+            queues = [queue.Queue(maxsize=ALLPAGES_QUEUE_SIZE*workers)] * len(ranges)
+        closed = threading.Event()
+        done = object()
+
+        def list_range(index, start, end, continue_params):
+            fetched = queues[index]
+            if closed.is_set():
+                return
+            try:
+                for pages, continue_params in self._all_pages_range(namespace, start, end, continue_params):
+                    if profile and pages:
+                        # NOTE: pages() yields cached pages first, loaded pages are kept in titles' order
+                        loaded = {page.page_id: page for page in self.pages(pages, check_updates, profile)}
+                        pages = [loaded[page.page_id] for page in pages if page.page_id in loaded]
+                    fetched.put((index, pages, continue_params))
+                    if closed.is_set():
+                        return
+            except Exception as e:
+                fetched.put((index, e, None))
+                return
+            fetched.put((index, done, None))
 
-    def category_pages(self, category, load=None, check_updates=None):
-        results = self.query_category_pages(category.page_id or category.title)
-        yield from self._get_pages(results, load, check_updates)
+        def get_batches(fetched, count):
+            # yield (index, pages, continue params) until count ranges are done
+            while count:
+                index, pages, continue_params = fetched.get()
+                if pages is done:
+                    count -= 1
+                    continue
+                if isinstance(pages, Exception):
+                    raise pages
+                yield index, pages, continue_params
 
-    def category_subcategories(self, category, load=None, check_updates=None):
-        results = self.query_category_subcategories(category.page_id or category.title)
-        yield from self._get_pages(results, load, check_updates)
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix='wikipedia',
+        )
+        futures = [
+            executor.submit(list_range, index, start, end, continue_params)
+            for index, (start, end, continue_params) in enumerate(ranges)
+        ]
+        if ordered:
+            batches = itertools.chain.from_iterable(
+                get_batches(fetched, 1) for fetched in queues
+            )
+        else:
+            batches = get_batches(queues[0], len(ranges))
+        try:
+            for index, pages, continue_params in batches:
+                yield from pages
+                if checkpoint:
+                    start, end, _ = ranges[index]
+                    self._cache.set_state(
+                        self._get_all_pages_key(namespace, checkpoint, start),
+                        json.dumps(continue_params) if continue_params else ALLPAGES_RANGE_DONE,
+                    )
+        finally:
+            closed.set()
+            for future in futures:
+                future.cancel()
+            # NOTE: Make room for the last put of each worker, so workers are never blocked
+            for fetched in set(queues):
+                while not fetched.empty():
+                    fetched.get_nowait()
+            executor.shutdown(wait=False)
+
+    def query_search(self, query, limit=None, namespaces=None, params=None):
+        params = dict(params or {})
+        params['gsrsearch'] = query
+        params.update(QUERY_GENERATOR_SEARCH)
+        if namespaces is not None:
+            params['gsrnamespace'] = '|'.join(str(namespace) for namespace in namespaces)
+        if 'revisions' in params.get('prop', ''):
+            # NOTE: Revisions' content is returned for up to 50 pages per request
+            params['gsrlimit'] = QUERY_PAGES_BATCH_SIZE
+        if limit and (params['gsrlimit'] == 'max' or limit < params['gsrlimit']):
+            params['gsrlimit'] = limit
+        # NOTE: result = {'query': {'pages': {page_id: {'index': rank, 'snippet': '', }, } }}
+        return self._request(params)
+
+    def search(self, query, limit=None, namespaces=None, profile=None, prefetch=None):
+        # Full text search, yield pages (with fetch profile's props) in rank order, up to limit pages
+        # NOTE: Search results' data (rank, snippet) is included with pages' data,
+        #       pages are inserted into cache as they arrive
+        params = get_props_params(self._get_props(profile))
+        results = self.query_search(query, limit, namespaces, params)
+        for count, page in enumerate(self._get_loaded_pages(results, prefetch, order=self._get_rank), 1):
+            yield page
+            if limit and count >= limit:
+                break
+
+    def _get_rank(self, data):
+        return data.get('index', 0)
 
     def _get_page_id(self, page):
         if isinstance(page, WikiPage):
@@ -276,10 +1041,13 @@ class WikiClient:
             return page
 
     def _get_title(self, title):
+        if isinstance(title, WikiPage):
+            return title.title
         if isinstance(title, str):
-            if title.startswith('https://'):
-                # TODO: extract lang from URL and compare with current client's lang
-                title = title[title.find('/wiki/')+6 :]
+            if is_url(title):
+                lang, title = parse_url(title)
+                if lang != self.lang:
+                    log.warning('URL language: %s, client language: %s', lang, self.lang)
             elif is_link(title):
                 # Follow a links title
                 title = WikiLink.parse(title)
@@ -292,67 +1060,361 @@ class WikiClient:
         if isinstance(page, WikiPage):
             return page.revision_id
 
+    def _get_flight_key(self, page_id, title):
+        if page_id:
+            return (self.lang, int(page_id))
+        return (self.lang, normalize_title(title))
+
     def _page(self, page_id, title, params=None):
+        # NOTE: Concurrent queries for the same page and props are coalesced
         params = params or QUERY_PAGES_FULL
+        return self._flights.do(
+            ('query', self._get_flight_key(page_id, title), params['prop']),
+            self._query_page, page_id, title, params,
+        )
+
+    def _query_page(self, page_id, title, params):
         if page_id:
             results = self.query_page_ids(params, page_id)
         else:
             results = self.query_page_titles(params, title)
-        for page in self._get_pages(results, load=False):
+        for page in self._get_complete_pages(results):
             return page
 
-    def _get_cached_page(self, page_id, title, revision_id, check_updates=None):
+    def _fetch_pages(self, query, items, props):
+        results = query(get_props_params(props), *items)
+        yield from self._get_loaded_pages(results)
+
+    def _get_props(self, profile=None):
+        return get_profile_props(profile or self._profile)
+
+    def _has_props(self, page, props):
+        # NOTE: Pages cached without list of props were fetched with all props
+        return page.props is None or props <= set(page.props)
+
+    def _get_cached_props(self, cached_page):
+        # Props of cached page, so page can be upgraded with missing props instead of losing them
+        if cached_page:
+            return set(cached_page.props or FETCH_PROFILES['full'])
+        return set()
+
+    def _is_outdated(self, cached_revision_id, revision_id):
+        return bool(revision_id and cached_revision_id < revision_id)
+
+    def _get_cached_page(self, cached_page, page_id, title, revision_id, check_updates=None, props=None):
+        # Return cached page if it's up to date and includes all props
+        # NOTE: cached_page is looked up by caller, so its props can be reused if it's not returned
         if check_updates is None:
             check_updates = self._check_updates
 
-        cached_page = self._cache.get(
-            self.lang, page_id, title,
-        )
         if not cached_page:
             return
 
+        if props and not self._has_props(cached_page, props):
+            # Cached page doesn't include all requested props
+            return
+
         if check_updates and not revision_id:
             # Get minimal data and check if revision_id changed
+            self.metrics.inc('stale_checks')
             page = self._page(page_id, title, QUERY_PAGES_MINIMAL)
             if page:
                 revision_id = page.revision_id
 
-        if revision_id and cached_page.revision_id < revision_id:
+        if self._is_outdated(cached_page.revision_id, revision_id):
             # Cached page is older than given revision_id
+            self.metrics.inc('stale_pages')
             return
 
         return cached_page
 
-    def _cached_page(self, page, page_id, title, check_updates):
+    def _cached_page(self, page, page_id, title, check_updates, props, insert=True):
         revision_id = self._get_revision_id(page)
-        cached_page = self._get_cached_page(
-            page_id, title, revision_id, check_updates,
-        )
-        if cached_page:
+        cached_page = self._cache.get(self.lang, page_id, title)
+        if self._get_cached_page(cached_page, page_id, title, revision_id, check_updates, props):
             return cached_page
 
-        page = self._page(page_id, title)
-        if page and page.page_id:
+        props = props | self._get_cached_props(cached_page)
+        page = self._page(page_id, title, get_props_params(props))
+        if insert and page and page.page_id and not page.is_missing:
             self._cache.insert(page)
 
         return page
 
-    def page(self, page, check_updates=None):
+    def page(self, page, check_updates=None, profile=None, insert=True):
+        # NOTE: With insert=False cache is only looked up, fetched pages are inserted by caller
         page_id = self._get_page_id(page)
         if not page_id:
             title = self._get_title(page)
         else:
             title = None
+        props = self._get_props(profile)
 
         if self._cache:
-            page = self._cached_page(
-                page, page_id, title, check_updates,
+            # NOTE: Concurrent calls for the same page are coalesced, so page is fetched
+            #       and inserted into cache only once
+            page = self._flights.do(
+                ('page', self._get_flight_key(page_id, title), self._get_revision_id(page), check_updates,
+                 tuple(sorted(props)), insert),
+                self._cached_page, page, page_id, title, check_updates, props, insert,
             )
         else:
-            page = self._page(page_id, title)
+            page = self._page(page_id, title, get_props_params(props))
 
         return page
 
+    def langlinks(self, page):
+        # Return {lang: title} of the page in other languages
+        page_id = self._get_page_id(page)
+        if page_id:
+            results = self.query_page_ids(QUERY_LANGLINKS, page_id)
+        else:
+            results = self.query_page_titles(QUERY_LANGLINKS, self._get_title(page))
+        for page in self._get_complete_pages(results):
+            return page.langlinks
+        return {}
+
+    def pages(self, pages, check_updates=None, profile=None):
+        # Get pages in batches, yielding cached pages first
+        # NOTE: Pages are not yielded in the same order as given
+        props = self._get_props(profile)
+        page_ids = []
+        page_ids_props = set(props)
+        titles = []
+        titles_props = set(props)
+        for page in pages:
+            page_id = self._get_page_id(page)
+            if not page_id:
+                title = self._get_title(page)
+            else:
+                title = None
+
+            cached_props = set()
+            if self._cache:
+                cached_page = self._cache.get(self.lang, page_id, title)
+                if self._get_cached_page(
+                    cached_page, page_id, title, self._get_revision_id(page), check_updates, props,
+                ):
+                    yield cached_page
+                    continue
+                cached_props = self._get_cached_props(cached_page)
+
+            # NOTE: Batch is fetched with props already cached for any of its pages
+            if page_id:
+                page_ids.append(page_id)
+                page_ids_props.update(cached_props)
+            else:
+                titles.append(title)
+                titles_props.update(cached_props)
+
+            if len(page_ids) >= QUERY_PAGES_BATCH_SIZE:
+                yield from self._fetch_pages(self.query_page_ids, page_ids, page_ids_props)
+                page_ids = []
+                page_ids_props = set(props)
+            if len(titles) >= QUERY_PAGES_BATCH_SIZE:
+                yield from self._fetch_pages(self.query_page_titles, titles, titles_props)
+                titles = []
+                titles_props = set(props)
+
+        if page_ids:
+            yield from self._fetch_pages(self.query_page_ids, page_ids, page_ids_props)
+        if titles:
+            yield from self._fetch_pages(self.query_page_titles, titles, titles_props)
+
+    def _get_page_meta_revision_ids(self, page_meta=None):
+        # NOTE: page_meta = [(lang, page_id, revision_id, ...), ]
+        if page_meta is None:
+            page_meta = self._cache.all_page_meta()
+        revision_ids = {}
+        for lang, page_id, revision_id, *_ in page_meta:
+            # Only the latest cached revision of each page is checked
+            key = (lang, int(page_id))
+            revision_ids[key] = max(revision_id or 0, revision_ids.get(key, 0))
+        pages_ids = {}
+        for (lang, page_id), revision_id in revision_ids.items():
+            pages_ids.setdefault(lang, {})[page_id] = revision_id
+        return pages_ids
+
+    def stale_pages(self, page_meta=None, progress=None):
+        # Check which cached pages have newer revisions, querying info for batches of pages
+        # NOTE: yield (lang, page_id, cached_revision_id, revision_id)
+        pages_ids = self._get_page_meta_revision_ids(page_meta)
+        total = sum(len(revision_ids) for revision_ids in pages_ids.values())
+        checked = 0
+        stale = 0
+        for lang, revision_ids in pages_ids.items():
+            page_ids = list(revision_ids)
+            for i in range(0, len(page_ids), QUERY_PAGES_BATCH_SIZE):
+                batch = page_ids[i:i+QUERY_PAGES_BATCH_SIZE]
+                params = {
+                    'pageids': '|'.join(str(page_id) for page_id in batch),
+                    'prop': 'info',
+                }
+                results = self._request(params, self.API_URL % (lang, ))
+                self.metrics.inc('stale_checks', len(batch))
+                for page in self._get_pages(results, load=False):
+                    if not page.page_id or page.is_missing:
+                        continue
+                    cached_revision_id = revision_ids[page.page_id]
+                    if self._is_outdated(cached_revision_id, page.revision_id):
+                        stale += 1
+                        self.metrics.inc('stale_pages')
+                        yield lang, page.page_id, cached_revision_id, page.revision_id
+                checked += len(batch)
+                log.info('Checked: %s/%s pages, stale: %s', checked, total, stale)
+                if progress:
+                    progress(checked, total, stale)
+
+    def _get_lang_cached_props(self, lang, page_id):
+        # Props of cached page in given lang, or client's profile props if not cached
+        # NOTE: Props are read from cache's meta, not from cached page's data
+        props = self._cache.get_props(lang, page_id)
+        if props is None:
+            return self._get_props()
+        return get_profile_props(props or 'full')
+
+    def _fetch_lang_page_ids(self, lang, page_ids):
+        # NOTE: Pages are refetched with props they were cached with, grouped by props
+        pages_ids = {}
+        for page_id in page_ids:
+            props = frozenset(self._get_lang_cached_props(lang, page_id))
+            pages_ids.setdefault(props, []).append(page_id)
+        for props, props_page_ids in pages_ids.items():
+            params = {
+                'pageids': '|'.join(str(page_id) for page_id in props_page_ids),
+            }
+            params.update(QUERY_RESOLVE_REDIRECTS)
+            params.update(get_props_params(props))
+            results = self._request(params, self.API_URL % (lang, ))
+            yield from self._get_loaded_pages(results)
+
+    def refresh_pages(self, page_meta=None, progress=None):
+        # Fetch and update cache for stale pages only, yield refreshed pages
+        stale_ids = {}
+        for lang, page_id, cached_revision_id, revision_id in self.stale_pages(page_meta, progress):
+            page_ids = stale_ids.setdefault(lang, [])
+            page_ids.append(page_id)
+            if len(page_ids) >= QUERY_PAGES_BATCH_SIZE:
+                yield from self._fetch_lang_page_ids(lang, page_ids)
+                page_ids.clear()
+        for lang, page_ids in stale_ids.items():
+            if page_ids:
+                yield from self._fetch_lang_page_ids(lang, page_ids)
+
+    def query_recent_changes(self, since=None):
+        params = {}
+        if since:
+            params['rcstart'] = since   # The timestamp to start enumerating from
+        params.update(QUERY_LIST_RECENTCHANGES)
+        # NOTE: result = {'query': {'recentchanges': [] }}
+        return self._request(params)
+
+    def recent_changes(self, since=None):
+        # yield {'pageid', 'revid', 'title', 'timestamp', ...} of changes since given timestamp, oldest first
+        results = self.query_recent_changes(since)
+        for results in self._continued(results):
+            yield from results.data.get('query', {}).get('recentchanges', [])
+
+    def _get_recent_changes_key(self):
+        return f'recentchanges:{self.lang}'
+
+    def refresh_recent_changes(self, since=None, progress=None):
+        # Refetch cached pages changed since last run (or since given timestamp), yield refreshed pages
+        # NOTE: Recent changes are kept for 30 days only, older caches need to use refresh_pages()
+        key = self._get_recent_changes_key()
+        since = since or self._cache.get_state(key)
+        if not since:
+            # First run, only store the high-water mark
+            since = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+            log.info('No recent changes high-water mark, starting from: %s', since)
+            self._cache.set_state(key, since)
+            return
+
+        revision_ids = {}
+        titles = set()
+        last_timestamp = since
+        for change in self.recent_changes(since):
+            page_id = change.get('pageid')
+            if page_id:
+                revision_ids[page_id] = max(change.get('revid', 0), revision_ids.get(page_id, 0))
+            if change.get('title'):
+                titles.add(change['title'])
+            last_timestamp = change.get('timestamp', last_timestamp)
+
+        # NOTE: Changed redirects might point to other pages now
+        self._cache.delete_aliases(self.lang, titles)
+
+        page_ids = []
+        for page_id, revision_id in revision_ids.items():
+            cached_revision_id = self._cache.get_revision_id(self.lang, page_id)
+            if cached_revision_id and self._is_outdated(cached_revision_id, revision_id):
+                page_ids.append(page_id)
+        log.info(
+            'Recent changes since: %s: %s pages changed, %s cached pages to refresh',
+            since, len(revision_ids), len(page_ids),
+        )
+
+        for i in range(0, len(page_ids), QUERY_PAGES_BATCH_SIZE):
+            batch = page_ids[i:i+QUERY_PAGES_BATCH_SIZE]
+            yield from self._fetch_lang_page_ids(self.lang, batch)
+            if progress:
+                progress(i+len(batch), len(page_ids))
+
+        # NOTE: Mark is stored after all pages are refreshed, so interrupted refresh is repeated
+        self._cache.set_state(key, last_timestamp)
+
+    def query_revisions(self, page_id=None, title=None, since=None, content=True, params=None):
+        params = dict(params or {})
+        params.update(QUERY_RESOLVE_REDIRECTS)
+        params.update(QUERY_REVISIONS)
+        if not content:
+            params['rvprop'] = '|'.join(prop for prop in params['rvprop'].split('|') if prop != 'content')
+            params.pop('rvslots')
+        if page_id:
+            params['pageids'] = page_id
+        else:
+            params['titles'] = title
+        if isinstance(since, int):
+            params['rvstartid'] = since     # Start enumeration from this revision's timestamp
+        elif isinstance(since, datetime.datetime):
+            if since.tzinfo:
+                since = since.astimezone(datetime.timezone.utc)
+            params['rvstart'] = since.strftime('%Y-%m-%dT%H:%M:%SZ')
+        elif since:
+            params['rvstart'] = since       # The timestamp to start enumerating from
+        # NOTE: result = {'query': {'pages': [{'pageid': page_id, 'revisions': [], }, ] }}
+        return self._request(params)
+
+    def revisions(self, page, since=None, content=True, prefetch=None):
+        # Stream page's revisions (WikiRevision), oldest first, newer than since (revision id or timestamp)
+        # NOTE: Revisions are not cached, use update_revisions() to store them
+        page_id = self._get_page_id(page)
+        title = not page_id and self._get_title(page)
+        results = self.query_revisions(page_id, title, since, content)
+        for results in self._continued(results, prefetch):
+            for page_data in get_query_pages(results.data):
+                for data in page_data.get('revisions', []):
+                    revision = WikiRevision(data, page_data.get('pageid'))
+                    if isinstance(since, int) and revision.revision_id == since:
+                        # NOTE: rvstartid is inclusive
+                        continue
+                    yield revision
+
+    def update_revisions(self, page, prefetch=None):
+        # Fetch page's revisions newer than ones in cache's revisions store, return number of new revisions
+        page_id = self._get_page_id(page)
+        if not page_id:
+            page = self.page(page, profile='meta')
+            if not page or page.is_missing:
+                return 0
+            page_id = page.page_id
+        page_id = int(page_id)
+        since = self._cache.revisions.newest_revision_id(self.lang, page_id)
+        revisions = self.revisions(page_id, since, prefetch=prefetch)
+        inserted = self._cache.revisions.insert(self.lang, page_id, revisions)
+        log.info('Page: %s - %s new revisions', page_id, inserted)
+        return inserted
+
     def parse(self, page):
         # TODO: Do I need it? Might need some reworking
         # https://www.mediawiki.org/wiki/API:Parsing_wikitext
@@ -0,0 +1,45 @@
+import json
+import logging
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+log = logging.getLogger('wikipedia.decoders')
+
+
+# NOTE: All decoders accept bytes, so response's content is decoded directly,
+#       without creating decoded text copy first
+DECODERS = {
+    'json': json.loads,
+}
+if ujson:
+    DECODERS['ujson'] = ujson.loads
+if orjson:
+    DECODERS['orjson'] = orjson.loads
+
+# Fastest available decoder is used by default
+DEFAULT_DECODERS = [
+    'orjson',
+    'ujson',
+    'json',
+]
+
+
+def get_decoder(name=None):
+    if callable(name):
+        return name
+    if name:
+        if not name in DECODERS:
+            raise ValueError(f'JSON decoder not available: {name}')
+        return DECODERS[name]
+    for name in DEFAULT_DECODERS:
+        if name in DECODERS:
+            return DECODERS[name]
@@ -0,0 +1,238 @@
+import bz2
+import collections
+import concurrent.futures
+import gzip
+import logging
+import os
+import xml.etree.ElementTree as ET
+
+from .client import parse_url
+
+from .cache.db import PageDB, PageMetaDB
+
+from .page import WikiPage
+
+from .parser.core import normalize_title
+
+
+log = logging.getLogger('wikipedia.dump')
+
+
+# Pages sent to worker process at once
+DEFAULT_BATCH_SIZE = 100
+
+# Props of pages ingested from dump, see: client.FETCH_PROFILES
+# NOTE: Dump pages are cache hits only for profiles within these props, like 'content',
+#       with default 'full' profile ingested pages are fetched again
+DUMP_PROPS = ['info', 'revisions']
+
+# Redirects resolved to pages at once
+REDIRECTS_BATCH_SIZE = 10000
+
+
+# XML dumps: https://meta.wikimedia.org/wiki/Data_dumps/Dump_format
+# https://dumps.wikimedia.org/enwiki/latest/enwiki-latest-pages-articles.xml.bz2
+
+
+def open_dump(fn):
+    if fn.endswith('.bz2'):
+        return bz2.open(fn, 'rb')
+    if fn.endswith('.gz'):
+        return gzip.open(fn, 'rb')
+    return open(fn, 'rb')
+
+
+def get_tag(element):
+    # Tag name without namespace
+    return element.tag.rpartition('}')[2]
+
+
+def get_page_data(lang, element):
+    # Build data compatible with WikiPage (same as returned by API with formatversion=2)
+    children = {get_tag(child): child for child in element}
+    revision = {get_tag(child): child for child in children['revision']}
+    data = {
+        'pageid': int(children['id'].text),
+        'ns': int(children['ns'].text),
+        'title': children['title'].text,
+        'lastrevid': int(revision['id'].text),
+        'pagelanguage': lang,
+        'revisions': [{
+            'revid': int(revision['id'].text),
+            'parentid': int(revision['parentid'].text) if 'parentid' in revision else 0,
+            'slots': {
+                'main': {
+                    'contentmodel': revision['model'].text if 'model' in revision else 'wikitext',
+                    'contentformat': revision['format'].text if 'format' in revision else 'text/x-wiki',
+                    'content': revision['text'].text or '',
+                },
+            },
+        }],
+        '_props': DUMP_PROPS,
+    }
+    if 'redirect' in children:
+        data['redirect'] = True
+        # Title of redirect's target, used by ingest_dump()
+        data['_redirect'] = children['redirect'].get('title')
+    return data
+
+
+def iter_dump(f, namespaces=None):
+    # Stream parse dump, yield pages' data
+    # NOTE: Parsed elements are cleared, so memory usage doesn't grow with dump size
+    lang = None
+    root = None
+    for event, element in ET.iterparse(f, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = element
+            continue
+        tag = get_tag(element)
+        if tag == 'base':
+            lang, title = parse_url(element.text)
+        elif tag == 'page':
+            data = get_page_data(lang, element)
+            if namespaces is None or data['ns'] in namespaces:
+                yield data
+            root.clear()
+
+
+def iter_batches(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# PageDB instance of worker process
+_page_db = None
+
+
+def init_worker(page_db, kwargs):
+    global _page_db
+    page_db_cls = PageDB.get_backend(page_db)
+    _page_db = page_db_cls(**kwargs)
+
+
+def insert_pages(pages_data):
+    # Encode and store pages in worker process, return pages' meta
+    pages_meta = []
+    for data in pages_data:
+        page = WikiPage(data)
+        _page_db.insert_page(page)
+        pages_meta.append((page.lang, page.page_id, page.revision_id, page.title))
+    return pages_meta
+
+
+def resolve_redirects(meta_db, redirects):
+    # Insert redirects [(lang, title, target title), ] as aliases of target pages,
+    # return redirects whose targets are not known yet
+    unresolved = []
+    aliases = collections.defaultdict(list)
+    for lang, title, target in redirects:
+        target = normalize_title(target)
+        page_id = meta_db.get_page_id(lang, target) or meta_db.get_alias_page_id(lang, target)
+        if page_id:
+            aliases[lang].append((title, int(page_id), meta_db.get_revision_id(lang, page_id)))
+        else:
+            unresolved.append((lang, title, target))
+    for lang, lang_aliases in aliases.items():
+        meta_db.insert_aliases(lang, lang_aliases)
+    return unresolved
+
+
+def resolve_unresolved_aliases(meta_db, batch_size=REDIRECTS_BATCH_SIZE):
+    # Resolve redirects stored as unresolved aliases, return number of redirects left unresolved
+    # NOTE: Redirects to redirects are resolved after their targets' aliases are inserted,
+    #       so all unresolved aliases are retried until no more are resolved
+    attempt = 0
+    while True:
+        attempt += 1
+        resolved = unresolved = 0
+        while True:
+            redirects = meta_db.get_unresolved_aliases(attempt, batch_size)
+            if not redirects:
+                break
+            left = resolve_redirects(meta_db, redirects)
+            left_titles = {(lang, title) for lang, title, target in left}
+            meta_db.delete_unresolved_aliases([
+                (lang, title) for lang, title, target in redirects
+                if not (lang, title) in left_titles
+            ])
+            meta_db.insert_unresolved_aliases(left, attempt)
+            resolved += len(redirects) - len(left)
+            unresolved += len(left)
+        if not resolved or not unresolved:
+            break
+    # Targets missing from dump (or filtered out by namespaces)
+    while True:
+        redirects = meta_db.get_unresolved_aliases(attempt+1, batch_size)
+        if not redirects:
+            break
+        meta_db.delete_unresolved_aliases([(lang, title) for lang, title, target in redirects])
+    return unresolved
+
+
+def ingest_dump(fn, *, workers=None, batch_size=DEFAULT_BATCH_SIZE, namespaces=None,
+                meta_db='sqlite', page_db='fs', progress=None, **kwargs):
+    # Ingest pages from XML dump (plain, .bz2 or .gz) into cache, return number of pages
+    # NOTE: Dump is decompressed and parsed in this process, while encoding and storing pages
+    #       is done by worker processes, pages' meta is inserted here in bulk
+    # NOTE: Redirects are not stored as pages, but as aliases of their targets (same as
+    #       redirects resolved by API), targets are resolved after their meta is inserted.
+    #       Redirects to targets not known yet are stored as unresolved aliases in meta DB,
+    #       so memory usage doesn't grow with dump's size
+    # NOTE: Pages are stored with props: DUMP_PROPS
+    meta_db_cls = PageMetaDB.get_backend(meta_db)
+    meta_db = meta_db_cls(**kwargs)
+    workers = workers or os.cpu_count()
+    executor = concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_worker,
+        initargs=(page_db, kwargs),
+    )
+    max_pending = 2 * workers
+    pending = collections.deque()
+    ingested = 0
+    redirects = []
+
+    def iter_pages(f):
+        for data in iter_dump(f, namespaces):
+            if data.get('redirect'):
+                if data.get('_redirect'):
+                    redirects.append((data['pagelanguage'], data['title'], data['_redirect']))
+                continue
+            yield data
+
+    def insert_meta(future):
+        pages_meta = future.result()
+        meta_db.insert_pages_meta(pages_meta)
+        meta_db.insert_pages_props([
+            (lang, page_id, DUMP_PROPS) for lang, page_id, revision_id, title in pages_meta
+        ])
+        if progress:
+            progress(ingested + len(pages_meta))
+        return len(pages_meta)
+
+    with open_dump(fn) as f, executor:
+        for batch in iter_batches(iter_pages(f), batch_size):
+            pending.append(executor.submit(insert_pages, batch))
+            if len(pending) >= max_pending:
+                # NOTE: Limit batches in flight, so memory usage is bounded
+                ingested += insert_meta(pending.popleft())
+            if len(redirects) >= REDIRECTS_BATCH_SIZE:
+                meta_db.insert_unresolved_aliases(resolve_redirects(meta_db, redirects))
+                redirects.clear()
+        while pending:
+            ingested += insert_meta(pending.popleft())
+
+    meta_db.insert_unresolved_aliases(resolve_redirects(meta_db, redirects))
+    unresolved = resolve_unresolved_aliases(meta_db, REDIRECTS_BATCH_SIZE)
+    if unresolved:
+        log.warning('Redirects with unknown targets: %s', unresolved)
+    log.info('Ingested: %s pages from: %s', ingested, fn)
+    return ingested
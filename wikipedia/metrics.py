@@ -0,0 +1,177 @@
+import bisect
+import contextlib
+import functools
+import logging
+import threading
+import time
+
+
+log = logging.getLogger('wikipedia.metrics')
+
+
+PREFIX = 'wikipedia_'
+
+LATENCY_BUCKETS = [.001, .005, .01, .025, .05, .1, .25, .5, 1., 2.5, 5., 10., 30.]
+DEPTH_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+# Histograms' buckets by metric name, LATENCY_BUCKETS are used if not specified
+BUCKETS = {
+    'continuation_depth': DEPTH_BUCKETS,
+}
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last one for +Inf
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        # yield (upper bound, cumulative count)
+        total = 0
+        for bound, count in zip(self.buckets + [float('inf')], self.counts):
+            total += count
+            yield bound, total
+
+
+class Metrics:
+
+    # Counters and histograms, with optional labels
+
+    enabled = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def _get_key(self, name, labels):
+        return (name, tuple(sorted(labels.items())))
+
+    def inc(self, name, value=1, **labels):
+        key = self._get_key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = self._get_key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = Histogram(BUCKETS.get(name, LATENCY_BUCKETS))
+                self.histograms[key] = histogram
+            histogram.observe(value)
+
+    @contextlib.contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter()-started, **labels)
+
+    def timed(self, name, func):
+        # Wrap function, observing its execution time
+        @functools.wraps(func)
+        def _timed(*args, **kwargs):
+            with self.timer(name):
+                return func(*args, **kwargs)
+        return _timed
+
+    def export(self, exporter='dict'):
+        exporter = EXPORTERS.get(exporter, exporter)
+        return exporter(self)
+
+
+class NullMetrics(Metrics):
+
+    # Disabled metrics, doing nothing
+
+    enabled = False
+
+    def inc(self, name, value=1, **labels):
+        pass
+
+    def observe(self, name, value, **labels):
+        pass
+
+    def timer(self, name, **labels):
+        return contextlib.nullcontext()
+
+    def timed(self, name, func):
+        return func
+
+
+NULL_METRICS = NullMetrics()
+
+
+def export_dict(metrics):
+    with metrics._lock:
+        snapshot = {
+            'counters': {},
+            'histograms': {},
+        }
+        for (name, labels), value in sorted(metrics.counters.items()):
+            snapshot['counters'].setdefault(name, []).append({
+                'labels': dict(labels),
+                'value': value,
+            })
+        for (name, labels), histogram in sorted(metrics.histograms.items()):
+            snapshot['histograms'].setdefault(name, []).append({
+                'labels': dict(labels),
+                'count': histogram.count,
+                'sum': histogram.sum,
+                'buckets': list(histogram.cumulative()),
+            })
+    return snapshot
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels, **extra):
+    labels = list(labels) + list(extra.items())
+    if not labels:
+        return ''
+    labels = ','.join(
+        f'{key}="{escape_label(value)}"' for key, value in labels
+    )
+    return f'{{{labels}}}'
+
+
+def export_prometheus(metrics):
+    # Prometheus text exposition format
+    lines = []
+    with metrics._lock:
+        names = set()
+        for (name, labels), value in sorted(metrics.counters.items()):
+            name = f'{PREFIX}{name}_total'
+            if not name in names:
+                lines.append(f'# TYPE {name} counter')
+                names.add(name)
+            lines.append(f'{name}{format_labels(labels)} {value}')
+        for (name, labels), histogram in sorted(metrics.histograms.items()):
+            name = f'{PREFIX}{name}'
+            if not name in names:
+                lines.append(f'# TYPE {name} histogram')
+                names.add(name)
+            for bound, count in histogram.cumulative():
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{name}_bucket{format_labels(labels, le=le)} {count}')
+            lines.append(f'{name}_sum{format_labels(labels)} {histogram.sum}')
+            lines.append(f'{name}_count{format_labels(labels)} {histogram.count}')
+    return '\n'.join(lines) + '\n'
+
+
+EXPORTERS = {
+    'dict': export_dict,
+    'prometheus': export_prometheus,
+}
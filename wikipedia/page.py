@@ -4,15 +4,84 @@ import dateutil.parser
 
 from .parser import Section, Table, Template
 
+from .metrics import NULL_METRICS
+
 
 log = logging.getLogger('wikipedia.page')
 
 
+# Flags returned by legacy formatversion=1 as empty strings, as booleans by formatversion=2
+PAGE_FLAGS = (
+    'missing',
+    'invalid',
+    'redirect',
+    'new',
+    'known',
+    'special',
+    'watched',
+)
+
+
+def upgrade_content_data(data):
+    # Revision's or slot's data with content under 'content' key instead of legacy '*'
+    if not '*' in data:
+        return data
+    data = dict(data)
+    data['content'] = data.pop('*')
+    return data
+
+
+def upgrade_page_data(data):
+    # Return copy of page's data in formatversion=2 shape, data in legacy shape is converted
+    # NOTE: Nested data that needs no conversion is shared with original data
+    data = dict(data)
+    for key in PAGE_FLAGS:
+        if data.get(key) == '':
+            data[key] = True
+    if 'revisions' in data:
+        revisions = []
+        for revision in data['revisions']:
+            revision = upgrade_content_data(revision)
+            if 'slots' in revision:
+                revision = dict(revision)
+                revision['slots'] = {
+                    slot: upgrade_content_data(slot_data) for slot, slot_data in revision['slots'].items()
+                }
+            revisions.append(revision)
+        data['revisions'] = revisions
+    if 'langlinks' in data:
+        data['langlinks'] = [
+            {('title' if key == '*' else key): value for key, value in link.items()}
+            for link in data['langlinks']
+        ]
+    if data.get('categoryinfo', {}).get('hidden') == '':
+        data['categoryinfo'] = dict(data['categoryinfo'], hidden=True)
+    return data
+
+
+def get_page_data(page):
+    # Page's data as returned by API (formatversion=2), without data added by WikiClient
+    # NOTE: Pages cached in legacy shape are converted
+    return upgrade_page_data({
+        key: value for key, value in page._data.items()
+        if not key.startswith('_')
+    })
+
+
+def get_revision_content(data):
+    # Content of revision's main slot, in formatversion=2 or legacy shape
+    main = data.get('slots', {}).get('main', data)
+    if 'content' in main:
+        return main['content']
+    return main.get('*')
+
+
 class WikiPage:
 
-    def __init__(self, data):
+    def __init__(self, data, metrics=None):
         self._data = data
         self._cache = {}
+        self._metrics = metrics or NULL_METRICS
 
     def _clear_cached(self):
         self._cache.clear()
@@ -25,8 +94,34 @@ class WikiPage:
         self._data.update(other._data)
         self._clear_cached()
 
+    @property
+    def props(self):
+        # Props this page's data was fetched with, None if unknown
+        return self._data.get('_props')
+
+    @property
+    def aliases(self):
+        # Titles resolved to this page: redirects and titles normalized by API
+        return self._data.get('_aliases', [])
+
+    @property
+    def rank(self):
+        # Rank of search result
+        return self._data.get('index')
+
+    @property
+    def snippet(self):
+        # Search result's snippet, HTML with matches in: <span class="searchmatch">
+        return self._data.get('snippet')
+
+    @property
+    def score(self):
+        # Search result's relevance score, if returned by search backend
+        return self._data.get('score')
+
     @property
     def is_missing(self):
+        # NOTE: missing is '' with formatversion=1, True with formatversion=2, omitted if false
         return 'missing' in self._data
 
     @property
@@ -77,6 +172,12 @@ class WikiPage:
     def categories(self):
         return [WikiPage(category) for category in self._data.get('categories', [])]
 
+    @property
+    def langlinks(self):
+        return {
+            link['lang']: link.get('title', link.get('*')) for link in self._data.get('langlinks', [])
+        }
+
     @property
     def extract(self):
         return self._data.get('extract')
@@ -88,12 +189,13 @@ class WikiPage:
     @property
     def content(self):
         if 'revisions' in self._data:
-            return self._data['revisions'][0]['slots']['main']['*']
+            return get_revision_content(self._data['revisions'][0])
 
     @property
     def sections(self):
         if self.has_content and not 'sections' in self._cache:
-            self._cache['sections'] = list(Section.find_all(self.content))
+            with self._metrics.timer('parse_seconds'):
+                self._cache['sections'] = list(Section.find_all(self.content))
         return self._cache.get('sections', [])
 
     @property
@@ -147,3 +249,51 @@ class WikiPage:
             return f'<{self.__class__.__name__} page_id={self.page_id}, title="{self.title}">'
         return f'<{self.__class__.__name__} title="{self.title}">'
 
+
+class WikiRevision:
+
+    def __init__(self, data, page_id=None):
+        self._data = data
+        self.page_id = page_id
+
+    @property
+    def revision_id(self):
+        return self._data.get('revid')
+
+    @property
+    def parent_id(self):
+        return self._data.get('parentid')
+
+    @property
+    def timestamp(self):
+        if 'timestamp' in self._data:
+            return dateutil.parser.isoparse(self._data['timestamp'])
+
+    @property
+    def user(self):
+        return self._data.get('user')
+
+    @property
+    def comment(self):
+        return self._data.get('comment')
+
+    @property
+    def size(self):
+        return self._data.get('size')
+
+    @property
+    def sha1(self):
+        return self._data.get('sha1')
+
+    @property
+    def is_minor(self):
+        # NOTE: minor is '' if set with formatversion=1, true / false with formatversion=2
+        return self._data.get('minor', False) is not False
+
+    @property
+    def content(self):
+        # NOTE: None if content was not fetched, or was hidden
+        return get_revision_content(self._data)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} page_id={self.page_id}, revision_id={self.revision_id}>'
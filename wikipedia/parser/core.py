@@ -1,4 +1,5 @@
 import logging
+import urllib.parse
 
 from .links import WikiLink
 
@@ -6,6 +7,25 @@ from .links import WikiLink
 log = logging.getLogger('wikipedia.parser.core')
 
 
+# Canonical namespaces' names, see: https://www.mediawiki.org/wiki/Help:Namespaces
+NAMESPACES = {
+    name.lower(): name for name in [
+        'Media', 'Special',
+        'Talk',
+        'User', 'User talk',
+        'Wikipedia', 'Wikipedia talk',
+        'File', 'File talk',
+        'MediaWiki', 'MediaWiki talk',
+        'Template', 'Template talk',
+        'Help', 'Help talk',
+        'Category', 'Category talk',
+        'Portal', 'Portal talk',
+        'Draft', 'Draft talk',
+        'Module', 'Module talk',
+    ]
+}
+
+
 
 def is_page_id(page_id):
     if isinstance(page_id, int):
@@ -15,6 +35,31 @@ def is_page_id(page_id):
     return False
 
 
+def upper_first(title):
+    first = title[:1].upper()
+    if len(first) != 1:
+        # NOTE: Some letters (like: ß) have no single letter uppercase
+        return title
+    return first + title[1:]
+
+
+def normalize_title(title):
+    # MediaWiki-style title normalization: percent-decoding, underscores and whitespace,
+    # uppercase first letter of title (and of canonical namespace's name)
+    # NOTE: Only canonical namespaces' names are recognized, localized names are not,
+    #       titles with those are normalized by the API (and cached as aliases)
+    title = urllib.parse.unquote(title)
+    title = title.partition('#')[0]
+    title = ' '.join(title.replace('_', ' ').split())
+    if title.startswith(':'):
+        title = title[1:].strip()
+    namespace, sep, name = title.partition(':')
+    namespace = sep and NAMESPACES.get(namespace.strip().lower())
+    if namespace:
+        return f'{namespace}:{upper_first(name.strip())}'
+    return upper_first(title)
+
+
 def is_link(wikitext):
     if not wikitext:
         return False
@@ -0,0 +1,366 @@
+import concurrent.futures
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from .page import WikiPage, get_page_data
+
+from .metrics import NULL_METRICS
+
+
+log = logging.getLogger('wikipedia.pipeline')
+
+
+# Fetch -> parse -> store pipeline, usage:
+#   pipeline = Pipeline([
+#       FetchStage(client, workers=8),
+#       ParseStage(),
+#       JSONLSink(f),
+#   ])
+#   for page in pipeline.run(titles):
+#       ...
+# NOTE: Stages are connected by bounded queues, so fast stages wait for slow ones,
+#       items are not kept in order
+
+
+DEFAULT_QUEUE_SIZE = 100
+DEFAULT_FETCH_WORKERS = 8
+DEFAULT_SINK_BATCH_SIZE = 100
+
+# Seconds between checks if pipeline was closed, by workers waiting on queues
+QUEUE_POLL_INTERVAL = .1
+
+# Parsed WikiPage's properties, cached in WikiPage._cache by worker processes
+PARSE_EXTRACTORS = (
+    'sections',     # Also used by: lists, tables, templates
+    'infobox',
+)
+
+
+class StageStats:
+
+    def __init__(self, name):
+        self.name = name
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.busy = 0.          # Total time spent by workers processing items
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def update(self, processed=0, dropped=0, errors=0, busy=0.):
+        with self._lock:
+            self.processed += processed
+            self.dropped += dropped
+            self.errors += errors
+            self.busy += busy
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def throughput(self):
+        # Items per second
+        return self.processed / (self.elapsed or 1)
+
+    def __repr__(self):
+        return (
+            f'<{self.__class__.__name__} {self.name}: processed={self.processed}, dropped={self.dropped}, '
+            f'errors={self.errors}, {self.throughput:.1f} items/s, busy={self.busy:.1f}s>'
+        )
+
+
+class Stage:
+
+    # Items are processed by pool of worker threads, results are passed to the next stage
+    # NOTE: Items for which process() returns None are dropped
+
+    def __init__(self, name, func=None, workers=1):
+        self.name = name
+        self.func = func
+        self.workers = workers
+
+    def start(self):
+        pass
+
+    def process(self, item):
+        return self.func(item)
+
+    def close(self):
+        # Called after all items were processed
+        pass
+
+
+class FetchStage(Stage):
+
+    # Fetch pages (titles, page ids, URLs or WikiPage stubs) with WikiClient.page()
+    # NOTE: Cached pages are not fetched again, fetched pages are inserted into client's cache,
+    #       unless CacheSink later in pipeline owns writes (see Pipeline)
+
+    def __init__(self, client, workers=DEFAULT_FETCH_WORKERS, check_updates=None, profile=None, name='fetch'):
+        super().__init__(name, workers=workers)
+        self.client = client
+        self.check_updates = check_updates
+        self.profile = profile
+        self.insert = True
+
+    def process(self, item):
+        page = self.client.page(item, self.check_updates, self.profile, insert=self.insert)
+        if page and not page.is_missing:
+            return page
+
+
+def parse_page(data, extractors):
+    # Run in worker process, return parsed data (WikiPage._cache) of page
+    page = WikiPage(data)
+    for extractor in extractors:
+        getattr(page, extractor)
+    return page._cache
+
+
+class ParseStage(Stage):
+
+    # Parse pages' wikitext with wikipedia.parser in worker processes
+    # NOTE: Parsed data is returned to WikiPage._cache, so properties like sections, tables
+    #       or infobox are not parsed again
+
+    def __init__(self, workers=None, extractors=PARSE_EXTRACTORS, name='parse'):
+        super().__init__(name, workers=workers or os.cpu_count())
+        self.extractors = extractors
+        self._executor = None
+
+    def start(self):
+        self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+
+    def process(self, page):
+        if page.has_content:
+            parsed = self._executor.submit(parse_page, page._data, self.extractors).result()
+            page._cache.update(parsed)
+        return page
+
+    def close(self):
+        self._executor.shutdown()
+
+
+class BatchSink(Stage):
+
+    # Write items in batches, items are passed to the next stage (or yielded by Pipeline.run())
+    # NOTE: Batch is written by worker that filled it, last batch is written on close
+
+    def __init__(self, name, workers=1, batch_size=DEFAULT_SINK_BATCH_SIZE):
+        super().__init__(name, workers=workers)
+        self.batch_size = batch_size
+        self._batch = []
+        self._lock = threading.Lock()
+
+    def write(self, items):
+        raise NotImplementedError()
+
+    def process(self, item):
+        batch = None
+        with self._lock:
+            self._batch.append(item)
+            if len(self._batch) >= self.batch_size:
+                batch, self._batch = self._batch, []
+        if batch:
+            self.write(batch)
+        return item
+
+    def close(self):
+        if self._batch:
+            self.write(self._batch)
+            self._batch = []
+
+
+class CacheSink(BatchSink):
+
+    # Insert pages into WikiCache, pages' meta is inserted in bulk
+    # NOTE: Pages already cached with the same revision and props (cache hits of FetchStage)
+    #       are not written again
+
+    def __init__(self, cache, batch_size=DEFAULT_SINK_BATCH_SIZE, name='cache'):
+        super().__init__(name, batch_size=batch_size)
+        self.cache = cache
+
+    def is_cached(self, page):
+        if self.cache.get_revision_id(page.lang, page.page_id) != page.revision_id:
+            return False
+        props = self.cache.get_props(page.lang, page.page_id)
+        if props is None:
+            return False
+        # NOTE: Pages cached without list of props were fetched with all props
+        return not props or (page.props is not None and set(page.props) <= set(props))
+
+    def write(self, pages):
+        pages = [page for page in pages if not self.is_cached(page)]
+        if pages:
+            self.cache.insert_pages(pages)
+
+
+class JSONLSink(BatchSink):
+
+    # Write pages' data as JSON lines, in the same shape as returned by API
+
+    def __init__(self, f, batch_size=DEFAULT_SINK_BATCH_SIZE, name='jsonl'):
+        super().__init__(name, batch_size=batch_size)
+        self.f = f
+        self._write_lock = threading.Lock()
+
+    def write(self, pages):
+        lines = [json.dumps(get_page_data(page), ensure_ascii=False) + '\n' for page in pages]
+        with self._write_lock:
+            self.f.writelines(lines)
+            self.f.flush()
+
+
+class PipelineClosed(Exception):
+    pass
+
+
+class Pipeline:
+
+    def __init__(self, stages, queue_size=DEFAULT_QUEUE_SIZE, metrics=None, on_error=None):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.metrics = metrics or NULL_METRICS
+        # Called with (stage name, item, exception) for items that failed, instead of just logging
+        self.on_error = on_error
+        self.stats = []
+        self._closed = None
+        self._done = object()
+        for i, stage in enumerate(stages):
+            if isinstance(stage, FetchStage):
+                # NOTE: CacheSink later in pipeline owns cache writes, so pages are not inserted twice
+                stage.insert = not any(isinstance(sink, CacheSink) for sink in stages[i+1:])
+
+    def _put(self, items, item):
+        while True:
+            if self._closed.is_set():
+                raise PipelineClosed()
+            try:
+                return items.put(item, timeout=QUEUE_POLL_INTERVAL)
+            except queue.Full:
+                continue
+
+    def _get(self, items):
+        while True:
+            if self._closed.is_set():
+                raise PipelineClosed()
+            try:
+                return items.get(timeout=QUEUE_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+
+    def _feed(self, items, output, errors):
+        try:
+            for item in items:
+                self._put(output, item)
+        except PipelineClosed:
+            return
+        except Exception as e:
+            errors.append(e)
+        try:
+            self._put(output, self._done)
+        except PipelineClosed:
+            pass
+
+    def _process(self, stage, stats, item):
+        started = time.monotonic()
+        try:
+            result = stage.process(item)
+        except Exception as e:
+            # NOTE: Failed items are dropped, not stopping the pipeline
+            stats.update(errors=1, busy=time.monotonic()-started)
+            self.metrics.inc('pipeline_items', stage=stage.name, result='error')
+            if self.on_error:
+                self.on_error(stage.name, item, e)
+            else:
+                log.warning('%s failed: %r - %r', stage.name, item, e)
+            return
+        elapsed = time.monotonic() - started
+        self.metrics.observe('pipeline_stage_seconds', elapsed, stage=stage.name)
+        if result is None:
+            stats.update(dropped=1, busy=elapsed)
+            self.metrics.inc('pipeline_items', stage=stage.name, result='dropped')
+        else:
+            stats.update(processed=1, busy=elapsed)
+            self.metrics.inc('pipeline_items', stage=stage.name, result='ok')
+        return result
+
+    def _work(self, stage, stats, input, output, running):
+        try:
+            while True:
+                item = self._get(input)
+                if item is self._done:
+                    # NOTE: Put it back for other workers of this stage
+                    self._put(input, item)
+                    break
+                result = self._process(stage, stats, item)
+                if result is not None:
+                    self._put(output, result)
+        except PipelineClosed:
+            return
+        with running[1]:
+            running[0] -= 1
+            is_last = not running[0]
+        if is_last:
+            # Last worker of stage closes it and notifies next stage
+            try:
+                stage.close()
+            except Exception as e:
+                log.warning('%s close failed: %r', stage.name, e)
+            stats.finished = time.monotonic()
+            try:
+                self._put(output, self._done)
+            except PipelineClosed:
+                pass
+
+    def run(self, items):
+        # Process items by all stages, yield results of the last stage
+        self.stats = [StageStats(stage.name) for stage in self.stages]
+        self._closed = threading.Event()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages)+1)]
+        errors = []
+        threads = [
+            threading.Thread(
+                target=self._feed, args=(items, queues[0], errors),
+                name='wikipedia-pipeline-feed', daemon=True,
+            ),
+        ]
+        for i, (stage, stats) in enumerate(zip(self.stages, self.stats)):
+            stage.start()
+            stats.started = time.monotonic()
+            running = [stage.workers, threading.Lock()]
+            for n in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._work, args=(stage, stats, queues[i], queues[i+1], running),
+                    name=f'wikipedia-pipeline-{stage.name}-{n}', daemon=True,
+                ))
+        for thread in threads:
+            thread.start()
+
+        output = queues[-1]
+        try:
+            while True:
+                item = output.get()
+                if item is self._done:
+                    break
+                yield item
+        finally:
+            self._closed.set()
+            for thread in threads:
+                thread.join()
+            for stage, stats in zip(self.stages, self.stats):
+                if stats.finished is None:
+                    # Closed early
+                    stage.close()
+        if errors:
+            raise errors[0]
+        log.info('Pipeline done: %s', self.stats)
@@ -0,0 +1,114 @@
+import concurrent.futures
+import logging
+import threading
+
+from .client import WikiClient, DEFAULT_FETCH_PROFILE, is_url, parse_url
+
+from .cache import WikiCache
+
+from .page import WikiPage
+
+
+log = logging.getLogger('wikipedia.pool')
+
+
+DEFAULT_WORKERS = 10
+
+
+class WikiClientPool:
+
+    # Clients for multiple languages, each with its own connection pool, sharing one WikiCache
+
+    def __init__(self, lang=None, *, workers=DEFAULT_WORKERS,
+                 load=False, check_updates=False, policy=None, decoder=None,
+                 response_ttl=None, rate_limiter=None, profile=DEFAULT_FETCH_PROFILE,
+                 metrics=None, prefetch=0, **kwargs):
+        self.default_lang = lang
+        # NOTE: Metrics are shared by all clients, and the cache
+        self._cache = WikiCache(metrics=metrics, **kwargs)
+        self._client_kwargs = dict(
+            load=load,
+            check_updates=check_updates,
+            policy=policy,
+            decoder=decoder,
+            response_ttl=response_ttl,
+            rate_limiter=rate_limiter,
+            profile=profile,
+            metrics=metrics,
+            prefetch=prefetch,
+        )
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix='wikipedia',
+        )
+
+    @property
+    def langs(self):
+        return list(self._clients)
+
+    def client(self, lang=None):
+        lang = lang or self.default_lang
+        if not lang:
+            raise ValueError('No language given')
+        with self._lock:
+            if not lang in self._clients:
+                self._clients[lang] = WikiClient(
+                    lang, cache=self._cache, **self._client_kwargs,
+                )
+            return self._clients[lang]
+
+    def close(self):
+        self._executor.shutdown()
+        for client in self._clients.values():
+            client._transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def route(self, page, lang=None):
+        # Return client for page's language; URLs are routed by their domain
+        if isinstance(page, str) and is_url(page):
+            lang, title = parse_url(page)
+        elif isinstance(page, WikiPage) and not lang:
+            lang = page.lang
+        return self.client(lang)
+
+    def page(self, page, lang=None, check_updates=None, profile=None):
+        return self.route(page, lang).page(page, check_updates, profile)
+
+    def pages(self, pages, lang=None, check_updates=None, profile=None):
+        # Get pages in batches, concurrently for each language
+        # NOTE: Pages are not yielded in the same order as given
+        pages_by_lang = {}
+        for page in pages:
+            client = self.route(page, lang)
+            pages_by_lang.setdefault(client.lang, []).append(page)
+        futures = [
+            self._executor.submit(list, self.client(lang).pages(lang_pages, check_updates, profile))
+            for lang, lang_pages in pages_by_lang.items()
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            yield from future.result()
+
+    def langlinks(self, page, langs=None, lang=None, check_updates=None):
+        # Return {lang: page} with the page in all (or given) languages, fetched concurrently
+        client = self.route(page, lang)
+        titles = client.langlinks(page)
+        if langs:
+            titles = {
+                link_lang: title for link_lang, title in titles.items()
+                if link_lang in langs
+            }
+        futures = {
+            self._executor.submit(self.client(link_lang).page, title, check_updates): link_lang
+            for link_lang, title in titles.items()
+        }
+        pages = {}
+        for future in concurrent.futures.as_completed(futures):
+            pages[futures[future]] = future.result()
+        return pages
@@ -0,0 +1,138 @@
+import logging
+import os
+import os.path
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # NOTE: FileTokenBucket is not available on Windows
+    fcntl = None
+
+
+log = logging.getLogger('wikipedia.ratelimit')
+
+
+# How long to wait before checking again for free concurrent request slot
+SLOT_POLL_INTERVAL = .01
+
+RATE_LIMIT_FN = 'ratelimit'
+
+
+class RateLimiter:
+
+    def acquire(self):
+        raise NotImplementedError()
+
+    def release(self):
+        raise NotImplementedError()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class TokenBucket(RateLimiter):
+
+    # Limit requests per second (with bursts of up to burst requests), and number of concurrent requests
+    # Shared by all threads of a process
+
+    def __init__(self, rate=None, burst=None, max_concurrent=None):
+        self.rate = rate
+        self.burst = burst or max(1, rate or 0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._slots = max_concurrent and threading.BoundedSemaphore(max_concurrent)
+
+    def _get_wait_time(self):
+        # Take token if available, or return time to wait for next one
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        if self._slots:
+            self._slots.acquire()
+        if not self.rate:
+            return
+        while True:
+            wait_time = self._get_wait_time()
+            if not wait_time:
+                return
+            time.sleep(wait_time)
+
+    def release(self):
+        if self._slots:
+            self._slots.release()
+
+
+class FileTokenBucket(TokenBucket):
+
+    # Same as TokenBucket, but shared by all processes using the same file,
+    # like all workers using the same cache_dir on a node
+    # NOTE: Bucket's state is kept in locked file; each concurrent request slot is a locked file,
+    #       so slots of killed processes are released by the OS
+
+    def __init__(self, fn=None, rate=None, burst=None, max_concurrent=None, *, cache_dir=None):
+        super().__init__(rate, burst)
+        if fcntl is None:
+            raise RuntimeError('FileTokenBucket requires fcntl module')
+        self.fn = fn or os.path.join(cache_dir, RATE_LIMIT_FN)
+        os.makedirs(os.path.dirname(self.fn) or '.', exist_ok=True)
+        self.max_concurrent = max_concurrent
+        self._local = threading.local()
+
+    def _get_wait_time(self):
+        with open(self.fn, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            state = f.read().split()
+            now = time.time()
+            if state:
+                tokens, updated = float(state[0]), float(state[1])
+                tokens = min(self.burst, tokens + max(0, now - updated) * self.rate)
+            else:
+                tokens = self.burst
+            wait_time = 0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait_time = (1 - tokens) / self.rate
+            f.seek(0)
+            f.truncate()
+            f.write(f'{tokens} {now}')
+            return wait_time
+
+    def _acquire_slot(self):
+        while True:
+            for slot in range(self.max_concurrent):
+                f = open(f'{self.fn}.{slot}', 'a')
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    f.close()
+                    continue
+                return f
+            time.sleep(SLOT_POLL_INTERVAL)
+
+    def acquire(self):
+        if self.max_concurrent:
+            slots = getattr(self._local, 'slots', [])
+            slots.append(self._acquire_slot())
+            self._local.slots = slots
+        super().acquire()
+
+    def release(self):
+        if self.max_concurrent:
+            # NOTE: Closing file releases the lock
+            self._local.slots.pop().close()
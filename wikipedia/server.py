@@ -0,0 +1,183 @@
+import http.server
+import json
+import logging
+import urllib.parse
+
+from .client import FETCH_PROFILES, get_props_params
+
+from .page import get_page_data
+
+from .parser.core import normalize_title
+
+from .transport import RequestError, get_request_key
+
+from .singleflight import SingleFlight
+
+
+log = logging.getLogger('wikipedia.server')
+
+
+# Local caching proxy, compatible with MediaWiki API, usage:
+#   python -m wikipedia serve --port 8080
+#   WikiClient.API_URL = 'http://127.0.0.1:8080/%s/w/api.php'
+# NOTE: Page lookups by page ids or titles are answered from WikiCache, missing pages
+#       and all other requests are forwarded upstream by clients of shared WikiClientPool
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+
+# Request params of page lookups (besides props' params) that can be answered from cache
+PAGE_LOOKUP_PARAMS = {
+    'action',
+    'format',
+    'formatversion',
+    'maxlag',
+    'redirects',
+    'pageids',
+    'titles',
+    'prop',
+}
+
+
+def get_lang(path):
+    # Return lang from /{lang}/w/api.php or /{lang}/api.php path
+    parts = [part for part in path.split('/') if part]
+    if len(parts) > 1 and not parts[0] in {'w', 'api.php'}:
+        return parts[0]
+
+
+def get_page_lookup(params):
+    # Return (page ids or titles, props) if request is page lookup, as sent by WikiClient
+    if params.get('action') != 'query' or not 'redirects' in params:
+        return
+    # NOTE: Cached pages are returned in formatversion=2 shape, legacy lookups are forwarded
+    if params.get('format', 'json') != 'json' or params.get('formatversion') != '2':
+        return
+    if ('pageids' in params) == ('titles' in params):
+        return
+    props = set(params.get('prop', '').split('|')) - {''}
+    if not props or not props <= set(FETCH_PROFILES['full']):
+        return
+    # NOTE: Props' params must be the same as used by WikiClient, so cached data matches
+    props_params = get_props_params(props)
+    props_params.pop('prop')
+    lookup_params = {
+        key: value for key, value in params.items()
+        if not key in PAGE_LOOKUP_PARAMS
+    }
+    if lookup_params != props_params:
+        return
+    items = (params.get('pageids') or params.get('titles')).split('|')
+    return items, props
+
+
+def get_error_data(error):
+    return {'error': {'code': 'internal_api_error', 'info': f'{type(error).__name__}: {error}'}}
+
+
+class ProxyRequestHandler(http.server.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        params = dict(urllib.parse.parse_qsl(url.query, keep_blank_values=True))
+        try:
+            status, data = self.server.proxy.handle(get_lang(url.path), params)
+            body = json.dumps(data).encode()
+        except Exception as e:
+            # NOTE: Client always gets JSON response, instead of dropped connection
+            log.exception('Error handling: %s', self.path)
+            status, data = 500, get_error_data(e)
+            body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        log.debug(format, *args)
+
+
+class WikiProxy:
+
+    def __init__(self, pool, check_updates=False):
+        self.pool = pool
+        self.check_updates = check_updates
+        self._flights = SingleFlight()
+
+    def handle(self, lang, params):
+        # Return (status, data)
+        try:
+            client = self.pool.client(lang)
+        except ValueError as e:
+            return 400, {'error': {'code': 'nolang', 'info': str(e)}}
+        # NOTE: Concurrent identical requests are coalesced
+        key = get_request_key(client._api_url, params)
+        try:
+            return 200, self._flights.do(key, self._query, client, params)
+        except RequestError as e:
+            log.warning('Upstream error: %s', e)
+            return 502, {'error': {'code': 'upstream', 'info': str(e)}}
+        except Exception as e:
+            log.exception('Error handling: %s', params)
+            return 500, get_error_data(e)
+
+    def _query(self, client, params):
+        lookup = get_page_lookup(params)
+        if lookup:
+            return self._lookup_pages(client, params, *lookup)
+        log.debug('Forwarding: %s', params)
+        # NOTE: Response format is as requested, not WikiClient's default
+        results = client._request(dict(params, formatversion=params.get('formatversion', '1')))
+        return results.data
+
+    def _lookup_pages(self, client, params, items, props):
+        # Cached pages, missing pages are fetched in batch by pages()
+        pages = list(client.pages(items, check_updates=self.check_updates, profile='|'.join(props)))
+        pages_by_id = {}
+        pages_data = {}
+        for i, page in enumerate(pages):
+            if page.page_id:
+                pages_by_id[str(page.page_id)] = page
+            # NOTE: Missing pages have no page ids
+            pages_data.setdefault(page.page_id or -1-i, get_page_data(page))
+        query = {}
+        if 'titles' in params:
+            normalized, redirects = self._get_resolved_titles(client, items, pages_by_id)
+            if normalized:
+                query['normalized'] = normalized
+            if redirects:
+                query['redirects'] = redirects
+        query['pages'] = list(pages_data.values())
+        return {
+            'batchcomplete': True,
+            'query': query,
+        }
+
+    def _get_resolved_titles(self, client, titles, pages_by_id):
+        # Return (normalized, redirects) mappings of requested titles to pages' titles
+        pages_titles = {page.title for page in pages_by_id.values()}
+        normalized = []
+        redirects = []
+        for title in dict.fromkeys(titles):
+            normalized_title = normalize_title(title)
+            if normalized_title != title:
+                normalized.append({'from': title, 'to': normalized_title})
+            if normalized_title in pages_titles:
+                continue
+            page = pages_by_id.get(str(client._cache.get_page_id(client.lang, normalized_title)))
+            if page:
+                redirects.append({'from': normalized_title, 'to': page.title})
+        return normalized, redirects
+
+    def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        server = http.server.ThreadingHTTPServer((host, port), ProxyRequestHandler)
+        server.proxy = self
+        log.info('Serving on: http://%s:%s/', host, port)
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
@@ -0,0 +1,49 @@
+import logging
+import threading
+
+
+log = logging.getLogger('wikipedia.singleflight')
+
+
+class Call:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+
+    # Concurrent calls with the same key are coalesced into one call,
+    # first caller runs the function, others wait for its result
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            is_running = call is not None
+            if not is_running:
+                call = Call()
+                self._calls[key] = call
+
+        if is_running:
+            log.debug('Waiting for: %s', key)
+            call.done.wait()
+            if call.error:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
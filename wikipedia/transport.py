@@ -0,0 +1,236 @@
+import datetime
+import email.utils
+import gzip
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+import urllib.parse
+
+import requests
+
+
+log = logging.getLogger('wikipedia.transport')
+
+
+# HTTP statuses of responses that should be retried
+RETRY_STATUSES = {
+    429,    # Too Many Requests
+    500,    # Internal Server Error
+    502,    # Bad Gateway
+    503,    # Service Unavailable
+    504,    # Gateway Timeout
+}
+
+# Exceptions on which request should be retried
+RETRY_EXCEPTIONS = (
+    requests.ConnectionError,
+    requests.Timeout,
+)
+
+# Request params not used in requests' keys
+IGNORED_KEY_PARAMS = {
+    'format',
+    'maxlag',
+}
+
+
+def get_request_key(api_url, params):
+    # Normalized request key: API URL (including lang) with sorted params
+    params = sorted(
+        (key, str(value)) for key, value in params.items()
+        if not key in IGNORED_KEY_PARAMS
+    )
+    key = f'{api_url}?{urllib.parse.urlencode(params)}'
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+class RequestError(Exception):
+
+    def __init__(self, message, api_url, params, response=None):
+        super().__init__(message)
+        # NOTE: params include continue values, so failed continuation can be resumed with:
+        #       client._request(error.params, error.api_url)
+        self.api_url = api_url
+        self.params = params
+        self.response = response
+
+
+class TransportPolicy:
+
+    def __init__(self, *,
+                 timeout=(10, 60), deadline=None,
+                 max_retries=5, backoff=1., max_backoff=60., jitter=.5,
+                 maxlag=5, pool_size=10,
+                ):
+        self.timeout = timeout          # Per request timeout in seconds, or (connect, read) timeouts
+        self.deadline = deadline        # Total time in seconds for request including all retries
+        self.max_retries = max_retries
+        self.backoff = backoff          # Delay before first retry, doubled with each following retry
+        self.max_backoff = max_backoff
+        self.jitter = jitter            # Up to this fraction of delay is added randomly
+        self.maxlag = maxlag            # https://www.mediawiki.org/wiki/Manual:Maxlag_parameter
+        self.pool_size = pool_size      # Number of connections kept in pool
+
+    def mount(self, session, pool_size=None):
+        # NOTE: Retries are handled by WikiClient, not by urllib3
+        adapter = requests.adapters.HTTPAdapter(
+            pool_maxsize=pool_size or self.pool_size,
+            max_retries=0,
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+    def update_params(self, params):
+        if self.maxlag is not None and not 'maxlag' in params:
+            params['maxlag'] = self.maxlag
+
+    def get_retry_after(self, response):
+        retry_after = response.headers.get('Retry-After')
+        if not retry_after:
+            return
+        if retry_after.isdigit():
+            return int(retry_after)
+        try:
+            retry_after = email.utils.parsedate_to_datetime(retry_after)
+        except (TypeError, ValueError, IndexError, OverflowError):
+            # NOTE: Malformed date raises ValueError, or TypeError before Python 3.10
+            log.warning('Invalid Retry-After: %r', retry_after)
+            return
+        if retry_after.tzinfo is None:
+            # NOTE: Dates with -0000 timezone are parsed as naive, but are in UTC
+            retry_after = retry_after.replace(tzinfo=datetime.timezone.utc)
+        return max(0, retry_after.timestamp() - time.time())
+
+    def get_error(self, response):
+        # Return reason if response should be retried
+        if response.status_code in RETRY_STATUSES:
+            return f'{response.status_code} {response.reason}'
+        if 'X-Database-Lag' in response.headers:
+            # NOTE: Only maxlag errors include this header
+            return f'maxlag {response.headers["X-Database-Lag"]}s'
+
+    def get_delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return retry_after
+        delay = min(self.max_backoff, self.backoff * 2**attempt)
+        return delay + random.uniform(0, delay*self.jitter)
+
+    def get_timeout(self, elapsed):
+        # Per request timeout, capped to time remaining until deadline
+        if self.deadline is None:
+            return self.timeout
+        remaining = self.deadline - elapsed
+        if self.timeout is None:
+            return remaining
+        if isinstance(self.timeout, tuple):
+            return tuple(min(timeout, remaining) for timeout in self.timeout)
+        return min(self.timeout, remaining)
+
+    def should_retry(self, attempt, elapsed, delay):
+        if attempt >= self.max_retries:
+            return False
+        if self.deadline is not None and elapsed + delay > self.deadline:
+            return False
+        return True
+
+
+class Transport:
+
+    def get(self, api_url, params, timeout=None) -> requests.Response:
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
+
+class SessionTransport(Transport):
+
+    def __init__(self, session=None):
+        self.session = session or requests.Session()
+
+    def get(self, api_url, params, timeout=None):
+        return self.session.get(
+            api_url,
+            params=params,
+            timeout=timeout,
+        )
+
+    def close(self):
+        self.session.close()
+
+
+class RecordingTransport(Transport):
+
+    # Record responses of given transport into archive: gzipped JSON lines keyed by normalized params
+
+    def __init__(self, fn, transport=None):
+        self.fn = fn
+        self.transport = transport or SessionTransport()
+        self._lock = threading.Lock()
+        self._archive = gzip.open(self.fn, 'at')
+
+    def get(self, api_url, params, timeout=None):
+        response = self.transport.get(api_url, params, timeout)
+        record = {
+            'key': get_request_key(api_url, params),
+            'url': response.url,
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': dict(response.headers),
+            'content': response.content.decode('utf-8', 'surrogateescape'),
+        }
+        with self._lock:
+            self._archive.write(json.dumps(record) + '\n')
+        return response
+
+    def close(self):
+        with self._lock:
+            self._archive.close()
+        self.transport.close()
+
+
+class ReplayError(Exception):
+    pass
+
+
+class ReplayTransport(Transport):
+
+    # Replay responses from archive recorded by RecordingTransport, without network access
+    # NOTE: Synthetic latency (in seconds) and bandwidth (in bytes per second) are simulated
+
+    def __init__(self, fn, latency=0., bandwidth=None):
+        self.fn = fn
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self._records = {}
+        with gzip.open(self.fn, 'rt') as f:
+            for line in f:
+                record = json.loads(line)
+                self._records[record['key']] = record
+
+    def get_response(self, record):
+        response = requests.Response()
+        response.status_code = record['status']
+        response.reason = record['reason']
+        response.headers = requests.structures.CaseInsensitiveDict(record['headers'])
+        # NOTE: Recorded content is already decoded
+        response.headers.pop('Content-Encoding', None)
+        response.url = record['url']
+        response.request = requests.Request('GET', record['url']).prepare()
+        response._content = record['content'].encode('utf-8', 'surrogateescape')
+        return response
+
+    def get(self, api_url, params, timeout=None):
+        record = self._records.get(get_request_key(api_url, params))
+        if not record:
+            raise ReplayError(f'Request not recorded: {api_url} {params}')
+        response = self.get_response(record)
+        delay = self.latency
+        if self.bandwidth:
+            delay += len(response.content) / self.bandwidth
+        if delay:
+            time.sleep(delay)
+        return response